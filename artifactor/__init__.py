@@ -121,10 +121,15 @@ This is how the artifact_path is returned. This hook can be removed, by running
 ``unregister_hook_callback`` with the name of the hook callback.
 
 """
+import base64
 import logging
 import os
 import re
 import sys
+import tempfile
+import threading
+from queue import Empty
+from queue import Queue
 
 from py.path import local
 from riggerlib import Rigger
@@ -176,9 +181,100 @@ class Artifactor(Rigger):
     def log_message(self, message):
         self.logger.debug(message)
 
+    def process_hook(self, hook_name, **kwargs):
+        if hook_name != BATCH_HOOK:
+            return super(Artifactor, self).process_hook(hook_name, **kwargs)
+        # The hooks of a batch are processed in order as a single task of the queue
+        for hook in kwargs["hooks"]:
+            try:
+                super(Artifactor, self).process_hook(hook["hook_name"], **hook["data"])
+            except Exception as e:
+                self.log_message(e)
+        return {}, {}
+
+
+BATCH_HOOK = "fire_hooks"
+
 
 class ArtifactorClient(RiggerClient):
-    pass
+    """Client which does not wait for the artifactor to receive the hooks.
+
+    The hooks are queued and sent in batches of up to ``BATCH_SIZE`` hooks from a background
+    thread. Hooks waiting for the task or its result are sent once the queue is empty, so the
+    artifactor receives all the hooks in the order they were fired.
+
+    Contents of ``filedump`` larger than ``SPOOL_SIZE`` are written into files in ``spool_dir``
+    and the artifactor just moves them to place, if the artifactor runs locally.
+    """
+
+    BATCH_SIZE = 100
+    SPOOL_SIZE = 64 * 1024
+
+    def __init__(self, address, port, spool_dir=None):
+        super(ArtifactorClient, self).__init__(address, port)
+        if address in {"127.0.0.1", "localhost"}:
+            self.spool_dir = local(spool_dir or log_path.join("artifactor_spool"))
+        else:
+            self.spool_dir = None
+        self._queue = Queue()
+        self._sender = None
+        self._sender_lock = threading.Lock()
+
+    def fire_hook(self, hook_name, grab_result=False, wait_for_task=False, **kwargs):
+        if grab_result or wait_for_task:
+            self.flush()
+            return super(ArtifactorClient, self).fire_hook(
+                hook_name, grab_result=grab_result, wait_for_task=wait_for_task, **kwargs)
+        if hook_name == "filedump":
+            kwargs = self._spool_contents(kwargs)
+        self._ensure_sender()
+        self._queue.put({"hook_name": hook_name, "data": kwargs})
+
+    def flush(self):
+        """Waits until all the queued hooks are sent."""
+        self._queue.join()
+
+    def terminate(self):
+        self.flush()
+        return super(ArtifactorClient, self).terminate()
+
+    def _ensure_sender(self):
+        with self._sender_lock:
+            if self._sender is None:
+                self._sender = threading.Thread(
+                    target=self._send_queued, name="artifactor_client_sender")
+                self._sender.daemon = True
+                self._sender.start()
+
+    def _send_queued(self):
+        while True:
+            hooks = [self._queue.get()]
+            while len(hooks) < self.BATCH_SIZE:
+                try:
+                    hooks.append(self._queue.get_nowait())
+                except Empty:
+                    break
+            try:
+                super(ArtifactorClient, self).fire_hook(BATCH_HOOK, hooks=hooks)
+            finally:
+                for _ in hooks:
+                    self._queue.task_done()
+
+    def _spool_contents(self, kwargs):
+        contents = kwargs.get("contents")
+        if (self.spool_dir is None or kwargs.get("dont_write") or contents is None or
+                len(contents) < self.SPOOL_SIZE):
+            return kwargs
+        if kwargs.get("contents_base64"):
+            contents = base64.b64decode(contents)
+        elif isinstance(contents, str):
+            contents = contents.encode("utf-8")
+        self.spool_dir.ensure(dir=True)
+        fd, filename = tempfile.mkstemp(dir=self.spool_dir.strpath)
+        with os.fdopen(fd, "wb") as f:
+            f.write(contents)
+        kwargs = dict(kwargs, contents=None, contents_base64=False, contents_file=filename)
+        return kwargs
 
 
 class ArtifactorBasePlugin(RiggerBasePlugin):
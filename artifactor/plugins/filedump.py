@@ -13,6 +13,7 @@ artifactor:
 import base64
 import os
 import re
+import shutil
 
 from artifactor import ArtifactorBasePlugin
 from cfme.utils import normalize_text
@@ -46,7 +47,7 @@ class Filedump(ArtifactorBasePlugin):
     def filedump(
         self,
         description,
-        contents,
+        contents=None,
         slaveid=None,
         mode="w",
         contents_base64=False,
@@ -58,6 +59,7 @@ class Filedump(ArtifactorBasePlugin):
         group_id=None,
         test_name=None,
         test_location=None,
+        contents_file=None,
     ):
         if not slaveid:
             slaveid = "Master"
@@ -94,10 +96,14 @@ class Filedump(ArtifactorBasePlugin):
         if not dont_write:
             if os.path.isfile(os_filename):
                 os.remove(os_filename)
-            with open(os_filename, mode) as f:
-                if contents_base64:
-                    contents = base64.b64decode(contents)
-                f.write(contents)
+            if contents_file is not None:
+                # Bulky contents spooled into a file by the client
+                shutil.move(contents_file, os_filename)
+            else:
+                with open(os_filename, mode) as f:
+                    if contents_base64:
+                        contents = base64.b64decode(contents)
+                    f.write(contents)
 
         return None, {"artifacts": {test_ident: {"files": artifacts}}}
 
@@ -34,6 +34,7 @@ class Logger(ArtifactorBasePlugin):
         self.register_plugin_hook("start_test", self.start_test)
         self.register_plugin_hook("finish_test", self.finish_test)
         self.register_plugin_hook("log_message", self.log_message)
+        self.register_plugin_hook("log_messages", self.log_messages)
 
     def configure(self):
         self.configured = True
@@ -93,3 +94,8 @@ class Logger(ArtifactorBasePlugin):
             handler = self.store[slaveid].handler
             if handler and record.levelno >= handler.level:
                 handler.handle(record)
+
+    @ArtifactorBasePlugin.check_configured
+    def log_messages(self, log_records, slaveid):
+        for log_record in log_records:
+            self.log_message(log_record, slaveid)
@@ -11,10 +11,13 @@ artifactor:
             enabled: True
             plugin: reporter
             only_failed: False #Only show faled tests in the report
+            build_interval: 30 #Minimal number of seconds between the reports built during a run
 """
 import csv
 import datetime
 import difflib
+import hashlib
+import json
 import math
 import os
 import re
@@ -36,6 +39,15 @@ _tests_tpl = {
     "_duration": 0,
 }
 
+COLORS = {
+    "passed": "success",
+    "failed": "warning",
+    "error": "danger",
+    "xpassed": "danger",
+    "xfailed": "success",
+    "skipped": "info",
+}
+
 # Regexp, that finds all URLs in a string
 # Does not cover all the cases, but rather only those we can
 URL = re.compile(r"https?://[^/\s]+(?:/[^/\s?]+)*/?(?:\?(?:[^&\s=]+(?:=[^&\s]+)?&?)*)?")
@@ -58,6 +70,15 @@ def overall_test_status(statuses):
 
 
 class ReporterBase(object):
+    """Builds the HTML report from the artifacts.
+
+    Every test is rendered into its own fragment file in ``FRAGMENT_DIR``, which is reused as long
+    as the artifacts of the test do not change, so rebuilding the report only processes the tests
+    which changed since the last build. The report streams the fragments into the page.
+    """
+
+    FRAGMENT_DIR = ".report_fragments"
+
     def _run_report(self, old_artifacts, artifact_dir, version=None, fw_version=None):
         template_data = self.process_data(old_artifacts, artifact_dir, version, fw_version)
 
@@ -65,20 +86,128 @@ class ReporterBase(object):
             template_data["tests"] = [
                 x for x in template_data["tests"] if x["outcomes"]["overall"] not in ["passed"]
             ]
+        template_data["fragments"] = self.read_fragments(template_data["tests"])
 
         self.render_report(template_data, "report", artifact_dir, "test_report.html")
 
+    @property
+    def template_env(self):
+        if not hasattr(self, "_template_env"):
+            self._template_env = Environment(loader=FileSystemLoader(template_path.strpath))
+        return self._template_env
+
+    @property
+    def processed_tests(self):
+        """Maps test names to the artifacts signature, test data and fragment of the tests."""
+        if not hasattr(self, "_processed_tests"):
+            self._processed_tests = {}
+        return self._processed_tests
+
     def render_report(self, report, filename, log_dir, template):
-        template_env = Environment(loader=FileSystemLoader(template_path.strpath))
-        data = template_env.get_template(template).render(**report)
+        stream = self.template_env.get_template(template).stream(**report)
 
         with open(os.path.join(log_dir, "{}.html".format(filename)), "w") as f:
-            f.write(data)
+            stream.dump(f)
         try:
             shutil.copytree(template_path.join("dist").strpath, os.path.join(log_dir, "dist"))
         except OSError:
             pass
 
+    def render_fragment(self, test_data, log_dir):
+        fragment_dir = os.path.join(log_dir, self.FRAGMENT_DIR)
+        if not os.path.isdir(fragment_dir):
+            os.makedirs(fragment_dir)
+        filename = os.path.join(
+            fragment_dir, "{}.html".format(hashlib.sha1(test_data["name"].encode()).hexdigest()))
+        test = dict(test_data)
+        if test.get("duration"):
+            test["duration"] = str(datetime.timedelta(seconds=math.ceil(test["duration"])))
+        self.template_env.get_template("test_report_test.html").stream(test=test).dump(filename)
+        return filename
+
+    def read_fragments(self, tests):
+        for test_data in tests:
+            with open(test_data["fragment"], "r") as f:
+                yield f.read()
+
+    def process_test(self, test_name, test, log_dir):
+        """Returns the data of the test for the report, reads the files the report includes."""
+        overall_status = test["statuses"]["overall"]
+        test_data = {
+            "name": test_name,
+            "outcomes": test["statuses"],
+            "slaveid": test.get("slaveid", "Unknown"),
+            "color": COLORS[overall_status],
+        }
+        if "composite" in test:
+            test_data["composite"] = test["composite"]
+
+        if "skipped" in test:
+            if test["skipped"].get("type") == "provider":
+                test_data["skip_provider"] = test["skipped"].get("reason")
+            if test["skipped"].get("type") == "blocker":
+                test_data["skip_blocker"] = test["skipped"].get("reason")
+
+        if "skip_blocker" in test_data:
+            # Fix the inconveniently long list of repeated blockers until we sort out sets
+            # in riggerlib somehow.
+            test_data["skip_blocker"] = sorted(set(test_data["skip_blocker"]))
+
+        if test.get("old", False):
+            test_data["old"] = True
+
+        if test.get("start_time"):
+            if test.get("finish_time"):
+                test_data["in_progress"] = False
+                test_data["duration"] = test["finish_time"] - test["start_time"]
+            else:
+                test_data["duration"] = time.time() - test["start_time"]
+                test_data["in_progress"] = True
+
+        # Set up destinations for the files
+        test_data["file_groups"] = []
+        test_data["qa_contact"] = []
+        processed_groups = {}
+        order = 0
+        for file_dict in test.get("files", []):
+            group = file_dict["group_id"]
+            if group not in processed_groups:
+                processed_groups[group] = (order, [])
+                order += 1
+            processed_groups[group][-1].append(file_dict)
+        # Current structure:
+        # {groupid: (group_order, [{filedict1}, {filedict2}])}
+        # Sorting by group_order
+        processed_groups = sorted(list(processed_groups.items()), key=lambda kv: kv[1][0])
+        # And now make it [(groupid, [{filedict1}, {filedict2}, ...])]
+        processed_groups = [(group_name, files) for group_name, (_, files) in processed_groups]
+        for group_name, file_dicts in processed_groups:
+            group_file_list = []
+            for file_dict in file_dicts:
+                if file_dict["file_type"] == "qa_contact":
+                    with open(file_dict["os_filename"], "r") as qafile:
+                        qareader = csv.reader(qafile, delimiter=",", quotechar='"')
+                        for qacontact in qareader:
+                            test_data["qa_contact"].append(qacontact)
+                    continue  # Do not store, handled a different way :)
+                elif file_dict["file_type"] == "short_tb":
+                    with open(file_dict["os_filename"], "r") as short_tb:
+                        test_data["short_tb"] = short_tb.read()
+                    continue
+                file_dict = dict(file_dict, filename=file_dict["os_filename"].replace(log_dir, ""))
+                group_file_list.append(file_dict)
+
+            test_data["file_groups"].append((group_name, group_file_list))
+        # Snd remove groups that are left empty because of eg. traceback or qa contact
+        test_data["file_groups"] = [
+            f_group for f_group in test_data["file_groups"] if len(f_group[1]) > 0
+        ]
+        if "short_tb" in test_data and test_data["short_tb"]:
+            urls = [url for url in URL.findall(test_data["short_tb"])]
+            if urls:
+                test_data["urls"] = urls
+        return test_data
+
     def process_data(self, artifacts, log_dir, version, fw_version, name_filter=None):
         tb_errors = []
         blocker_skip_count = 0
@@ -96,14 +225,6 @@ class ReporterBase(object):
             "xfailed": 0,
             "xpassed": 0,
         }
-        colors = {
-            "passed": "success",
-            "failed": "warning",
-            "error": "danger",
-            "xpassed": "danger",
-            "xfailed": "success",
-            "skipped": "info",
-        }
         # Iterate through the tests and process the counts and durations
         for test_name, test in artifacts.items():
             if not test.get("statuses"):
@@ -112,87 +233,30 @@ class ReporterBase(object):
             counts[overall_status] += 1
             if not test.get("old", False):
                 current_counts[overall_status] += 1
-            color = colors[overall_status]
             # This was removed previously but is needed as the overall is not generated
             # until the test finishes. So this is here as a shim.
             test["statuses"]["overall"] = overall_status
-            test_data = {
-                "name": test_name,
-                "outcomes": test["statuses"],
-                "slaveid": test.get("slaveid", "Unknown"),
-                "color": color,
-            }
-            if "composite" in test:
-                test_data["composite"] = test["composite"]
 
-            if "skipped" in test:
-                if test["skipped"].get("type") == "provider":
-                    provider_skip_count += 1
-                    test_data["skip_provider"] = test["skipped"].get("reason")
-                if test["skipped"].get("type") == "blocker":
-                    blocker_skip_count += 1
-                    test_data["skip_blocker"] = test["skipped"].get("reason")
+            # Only the tests whose artifacts changed are processed and rendered again
+            signature = json.dumps(test, sort_keys=True, default=str)
+            processed = self.processed_tests.get(test_name)
+            if processed is not None and processed[0] == signature:
+                test_data = processed[1]
+            else:
+                test_data = self.process_test(test_name, test, log_dir)
+                test_data["fragment"] = self.render_fragment(test_data, log_dir)
+                if not test_data.get("in_progress"):
+                    self.processed_tests[test_name] = (signature, test_data)
 
+            if "skip_provider" in test_data:
+                provider_skip_count += 1
             if "skip_blocker" in test_data:
-                # Fix the inconveniently long list of repeated blockers until we sort out sets
-                # in riggerlib somehow.
-                test_data["skip_blocker"] = sorted(set(test_data["skip_blocker"]))
-
-            if test.get("old", False):
-                test_data["old"] = True
-
-            if test.get("start_time"):
-                if test.get("finish_time"):
-                    test_data["in_progress"] = False
-                    test_data["duration"] = test["finish_time"] - test["start_time"]
-                else:
-                    test_data["duration"] = time.time() - test["start_time"]
-                    test_data["in_progress"] = True
-
-            # Set up destinations for the files
-            test_data["file_groups"] = []
-            test_data["qa_contact"] = []
-            processed_groups = {}
-            order = 0
-            for file_dict in test.get("files", []):
-                group = file_dict["group_id"]
-                if group not in processed_groups:
-                    processed_groups[group] = (order, [])
-                    order += 1
-                processed_groups[group][-1].append(file_dict)
-            # Current structure:
-            # {groupid: (group_order, [{filedict1}, {filedict2}])}
-            # Sorting by group_order
-            processed_groups = sorted(list(processed_groups.items()), key=lambda kv: kv[1][0])
-            # And now make it [(groupid, [{filedict1}, {filedict2}, ...])]
-            processed_groups = [(group_name, files) for group_name, (_, files) in processed_groups]
-            for group_name, file_dicts in processed_groups:
-                group_file_list = []
-                for file_dict in file_dicts:
-                    if file_dict["file_type"] == "qa_contact":
-                        with open(file_dict["os_filename"], "r") as qafile:
-                            qareader = csv.reader(qafile, delimiter=",", quotechar='"')
-                            for qacontact in qareader:
-                                test_data["qa_contact"].append(qacontact)
-                                if qacontact[0] not in template_data["qa"]:
-                                    template_data["qa"].append(qacontact[0])
-                        continue  # Do not store, handled a different way :)
-                    elif file_dict["file_type"] == "short_tb":
-                        with open(file_dict["os_filename"], "r") as short_tb:
-                            test_data["short_tb"] = short_tb.read()
-                        continue
-                    file_dict["filename"] = file_dict["os_filename"].replace(log_dir, "")
-                    group_file_list.append(file_dict)
-
-                test_data["file_groups"].append((group_name, group_file_list))
-            # Snd remove groups that are left empty because of eg. traceback or qa contact
-            test_data["file_groups"] = [
-                f_group for f_group in test_data["file_groups"] if len(f_group[1]) > 0
-            ]
-            if "short_tb" in test_data and test_data["short_tb"]:
-                urls = [url for url in URL.findall(test_data["short_tb"])]
-                if urls:
-                    test_data["urls"] = urls
+                blocker_skip_count += 1
+            for qacontact in test_data["qa_contact"]:
+                if qacontact[0] not in template_data["qa"]:
+                    template_data["qa"].append(qacontact[0])
+            if overall_status in {"failed", "error"} and test_data.get("short_tb"):
+                tb_errors.append((test_data["short_tb"], test_name))
             template_data["tests"].append(test_data)
         template_data["top10"] = self.top10(tb_errors)
         template_data["counts"] = counts
@@ -217,15 +281,18 @@ class ReporterBase(object):
 
         template_data["ndata"] = self.build_li(tests)
 
-        for test in template_data["tests"]:
-            if test.get("duration"):
-                test["duration"] = str(datetime.timedelta(seconds=math.ceil(test["duration"])))
-
         return template_data
 
     def top10(self, tb_errors):
-        sets = []
+        # The sets of similar tracebacks are kept between the builds, only new ones are sorted in
+        if not hasattr(self, "_tb_sets"):
+            self._tb_sets = []
+            self._tb_known = set()
+        sets = self._tb_sets
         for entry in tb_errors:
+            if entry in self._tb_known:
+                continue
+            self._tb_known.add(entry)
             for tset in sets:
                 if difflib.SequenceMatcher(a=entry[0][:10], b=tset[0][0][:10]).ratio() > 0.8:
                     if difflib.SequenceMatcher(a=entry[0][:20], b=tset[0][0][:20]).ratio() > 0.75:
@@ -238,7 +305,9 @@ class ReporterBase(object):
             else:
                 sets.append([entry])
 
-        return sorted(sets, key=len, reverse=True)[:10]
+        current = set(tb_errors)
+        current_sets = [[entry for entry in tset if entry in current] for tset in sets]
+        return sorted([tset for tset in current_sets if tset], key=len, reverse=True)[:10]
 
     def build_dict(self, path, container, contents):
         """
@@ -334,7 +403,7 @@ class Reporter(ArtifactorBasePlugin, ReporterBase):
     def plugin_initialize(self):
         self.register_plugin_hook("report_test", self.report_test)
         self.register_plugin_hook("finish_session", self.run_report)
-        self.register_plugin_hook("build_report", self.run_report)
+        self.register_plugin_hook("build_report", self.build_report)
         self.register_plugin_hook("start_test", self.start_test)
         self.register_plugin_hook("skip_test", self.skip_test)
         self.register_plugin_hook("finish_test", self.finish_test)
@@ -344,6 +413,8 @@ class Reporter(ArtifactorBasePlugin, ReporterBase):
 
     def configure(self):
         self.only_failed = self.data.get("only_failed", False)
+        self.build_interval = self.data.get("build_interval", 30)
+        self.last_build = 0
         self.configured = True
 
     @ArtifactorBasePlugin.check_configured
@@ -454,3 +525,10 @@ class Reporter(ArtifactorBasePlugin, ReporterBase):
     @ArtifactorBasePlugin.check_configured
     def run_report(self, old_artifacts, report_path, version=None, fw_version=None):
         self._run_report(old_artifacts, report_path, version, fw_version)
+        self.last_build = time.time()
+
+    @ArtifactorBasePlugin.check_configured
+    def build_report(self, old_artifacts, report_path, version=None, fw_version=None):
+        """Builds the report of a running session, at most once in ``build_interval`` seconds"""
+        if time.time() - self.last_build >= self.build_interval:
+            self.run_report(old_artifacts, report_path, version, fw_version)
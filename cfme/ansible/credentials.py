@@ -446,7 +446,7 @@ class Credential(BaseEntity, Taggable):
         wait_for(
             lambda: not self.exists,
             delay=10,
-            fail_func=credentials_list_page.browser.selenium.refresh,
+            fail_func=credentials_list_page.browser.refresh,
             timeout=300
         )
 
@@ -486,7 +486,7 @@ class CredentialsCollection(BaseCollection):
 
         wait_for(
             lambda: credential.exists,
-            fail_func=credentials_list_page.browser.selenium.refresh,
+            fail_func=credentials_list_page.browser.refresh,
             delay=5,
             timeout=300)
 
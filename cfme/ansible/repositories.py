@@ -200,7 +200,7 @@ class Repository(BaseEntity, Fillable, Taggable):
             lambda: not self.exists,
             delay=10,
             timeout=300,
-            fail_func=repo_list_page.browser.selenium.refresh)
+            fail_func=repo_list_page.browser.refresh)
 
     def refresh(self):
         """Perform a refresh to update the repository."""
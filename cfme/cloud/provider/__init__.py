@@ -248,6 +248,7 @@ class Discover(CFMENavigateStep):
 class Details(CFMENavigateStep):
     """Nav class for summary details view"""
     VIEW = CloudProviderDetailsView
+    URL_IDENTIFIES_OBJECT = True
     prerequisite = NavigateToSibling('All')
 
     def step(self, *args, **kwargs):
@@ -785,7 +785,7 @@ class BaseProvider(Taggable, Updateable, Navigatable, BaseEntity, CustomButtonEv
         host_stats = client.stats(*stats_to_match)
         method = None
         if ui:
-            self.browser.selenium.refresh()
+            self.browser.refresh()
             method = 'ui'
 
         if refresh_timer:
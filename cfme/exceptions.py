@@ -284,3 +284,14 @@ class RestLookupError(CFMEException):
 @property
 def displayed_not_implemented(cls):
     raise NotImplementedError("This view has no unique markers for is_displayed check")
+
+
+class RailsConsoleError(CFMEException):
+    """Raised if a Ruby snippet evaluated by :py:class:`cfme.utils.ssh.RailsConsole` fails"""
+    def __init__(self, code, error, message):
+        self.code = code
+        self.error = error
+        self.message = message
+
+    def __str__(self):
+        return '{}: {} (evaluating {!r})'.format(self.error, self.message, self.code)
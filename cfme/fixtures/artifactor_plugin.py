@@ -37,6 +37,7 @@ from cfme.utils.blockers import Blocker
 from cfme.utils.blockers import BZ
 from cfme.utils.conf import credentials
 from cfme.utils.conf import env
+from cfme.utils.log import artifactor_handler
 from cfme.utils.log import logger
 from cfme.utils.net import net_check
 from cfme.utils.net import random_port
@@ -75,6 +76,9 @@ class DummyClient(object):
     def terminate(self):
         return
 
+    def flush(self):
+        return
+
     def task_status(self):
         return
 
@@ -142,7 +146,6 @@ def pytest_configure(config):
         art_client.ready = True
     else:
         config._art_proc = None
-    from cfme.utils.log import artifactor_handler
     artifactor_handler.artifactor = art_client
     if store.slave_manager:
         artifactor_handler.slaveid = store.slaveid
@@ -159,6 +162,8 @@ def fire_art_hook(config, hook, **hook_args):
     if client is None:
         assert UNDER_TEST, 'missing artifactor is only valid for inprocess tests'
     else:
+        # the log records of the test have to reach the artifactor before the hook
+        artifactor_handler.flush()
         return client.fire_hook(hook, **hook_args)
 
 
@@ -303,6 +308,11 @@ lock = RLock()
 
 
 def shutdown(config):
+    client = getattr(config, '_art_client', None)
+    if client is not None:
+        # hooks are sent in background, don't lose the last ones
+        artifactor_handler.flush()
+        client.flush()
     app = find_appliance(config, require=False)
     if app is not None:
         with lock:
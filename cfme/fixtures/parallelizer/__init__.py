@@ -7,21 +7,29 @@ The Workflow
 - py.test config.option.appliances and the related --appliance cmdline flag are used to count
   the number of needed slaves
 - Slaves are started
-- Master runs collection, blocks until slaves report their collections
-- Slaves each run collection and submit them to the master, then block inside their runtest loop,
-  waiting for tests to run
-- Master diffs slave collections against its own; the test ids are verified to match
-  across all nodes
+- Master runs collection and writes the collection manifest
+  (:py:mod:`cfme.utils.collection_manifest`), blocks until slaves report their collections
+- Slaves each run collection of the modules listed in the manifest and submit the hash of their
+  collection to the master, then block inside their runtest loop, waiting for tests to run
+- Master compares slave collection hashes against its own; the test ids are verified to match
+  across all nodes, slaves report the differences if they don't
 - Master enters main runtest loop, uses a generator to build lists of test groups which are then
   sent to slaves, one group at a time
 - For each phase of each test, the slave serializes test reports, which are then unserialized on
   the master and handed to the normal pytest reporting hooks, which is able to deal with test
   reports arriving out of order
+- Reports and messages are sent by the slaves without waiting for the master, which handles them
+  in its reporting thread; only control events (collection, test requests, shutdown) are replied
+  to, so the slow reporting hooks don't stall the slaves or the test distribution
 - Before running the last test in a group, the slave will request more tests from the master
 
   - If more tests are received, they are run
   - If no tests are received, the slave will shut down after running its final test
 
+- With ``--parallel-scheduler duration``, the master orders test groups longest-first using
+  per-test durations from the run history (:py:mod:`cfme.utils.run_history`), hands each group
+  out in chunks, and lets idle slaves steal the tail of another slave's pending group
+
 - After all slaves are shut down, the master will do its end-of-session reporting as usual, and
   shut down
 
@@ -37,15 +45,18 @@ from collections import namedtuple
 from datetime import datetime
 from itertools import count
 from itertools import groupby
+from queue import Queue
+from threading import RLock
 from threading import Thread
 from time import sleep
 from time import time
 
 import attr
+import msgpack
 import pytest
 import zmq
 from _pytest import runner
-from deepdiff import DeepDiff
+from cached_property import cached_property
 
 from cfme.fixtures import terminalreporter
 from cfme.fixtures.parallelizer import remote
@@ -53,7 +64,9 @@ from cfme.fixtures.pytest_store import store
 from cfme.test_framework.appliance import PLUGIN_KEY as APPLIANCE_PLUGIN
 from cfme.utils import at_exit
 from cfme.utils import conf
+from cfme.utils.collection_manifest import CollectionManifest
 from cfme.utils.log import create_sublogger
+from cfme.utils.run_history import RunHistory
 
 # Initialize slaveid to None, indicating this as the master process
 # slaves will set this to a unique string when they're initialized
@@ -63,6 +76,24 @@ if not conf.runtime['env'].get('ts'):
     ts = str(time())
     conf.runtime['env']['ts'] = ts
 
+# duration assumed for tests that have never been timed, when nothing else is known
+DEFAULT_TEST_DURATION = 60.0
+# estimated runtime of a single chunk of tests sent to a slave by the duration scheduler
+DURATION_CHUNK_SECONDS = 600.0
+# least number of seconds between the checks of the slave processes
+AUDIT_INTERVAL = 1.0
+# events handled by the reporting thread, the slaves don't wait for them to be handled
+REPORT_EVENTS = {'message', 'runtest_logstart', 'runtest_logreport'}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('cfme')
+    group.addoption('--parallel-scheduler', dest='parallel_scheduler', default='modscope',
+                    choices=('modscope', 'duration'),
+                    help='How the parallelizer master hands test groups to slaves; '
+                         '"duration" packs groups longest-first based on previously recorded '
+                         'test durations and lets idle slaves steal pending tests')
+
 
 def pytest_addhooks(pluginmanager):
     from cfme.fixtures.parallelizer import hooks
@@ -117,10 +148,15 @@ class SlaveDetail(object):
     process = attr.ib(default=None, repr=False)
 
     provider_allocation = attr.ib(default=attr.Factory(list), repr=False)
+    # tests assigned to the slave by the duration scheduler, but not sent yet
+    pending = attr.ib(default=attr.Factory(deque), repr=False)
+    # sequence number of the last event received from the slave process
+    last_seq = attr.ib(default=0, repr=False)
 
     def start(self):
         if self.forbid_restart:
             return
+        self.last_seq = 0
         devnull = open(os.devnull, 'w')
         # worker output redirected to null; useful info comes via messages and logs
         self.process = subprocess.Popen([
@@ -139,6 +175,33 @@ class SlaveDetail(object):
             return self.process.poll()
 
 
+@attr.s
+class DurationHistory(object):
+    """Per-test duration estimates (all phases summed) based on the run history
+
+    Tests that were never timed are estimated with the median of the known durations.
+    """
+    known = attr.ib(default=attr.Factory(dict))
+
+    @classmethod
+    def from_run_history(cls, path):
+        with RunHistory(path) as history:
+            return cls(known=history.durations())
+
+    @cached_property
+    def default(self):
+        if not self.known:
+            return DEFAULT_TEST_DURATION
+        durations = sorted(self.known.values())
+        return durations[len(durations) // 2]
+
+    def estimate(self, nodeid):
+        return self.known.get(nodeid, self.default)
+
+    def group_estimate(self, tests):
+        return sum(self.estimate(nodeid) for nodeid in tests)
+
+
 class ParallelSession(object):
     def __init__(self, config, appliances):
         self.config = config
@@ -146,14 +209,22 @@ class ParallelSession(object):
         self.session_finished = False
         self.countfailures = 0
         self.collection = []
+        self.manifest = None
         self.sent_tests = 0
         self.log = create_sublogger('master')
         self.maxfail = config.getvalue("maxfail")
         self._failed_collection_errors = {}
         self.terminal = store.terminalreporter
+        self.terminal_lock = RLock()
         self.trdist = None
+        self.reports = Queue()
         self.slaves = {}
         self.test_groups = self._test_item_generator()
+        self.scheduler = config.getoption('parallel_scheduler')
+        if self.scheduler == 'duration':
+            self.durations = DurationHistory.from_run_history(config.getoption('run_history'))
+        else:
+            self.durations = DurationHistory()
 
         self._pool = []
 
@@ -216,6 +287,10 @@ class ParallelSession(object):
                     self.sent_tests -= num_failed_tests
                     msg += ' and redistributing {} tests'.format(num_failed_tests)
                     self.failed_slave_test_groups.append(failed_tests)
+                if slave.pending:
+                    # never sent, so these weren't counted in self.sent_tests
+                    self.failed_slave_test_groups.append(list(slave.pending))
+                    slave.pending.clear()
                 self.print_message(msg, purple=True)
 
         # If a slave was terminated for any reason, kill that slave
@@ -239,13 +314,10 @@ class ParallelSession(object):
     def send(self, slave, event_data):
         """Send data to slave.
 
-        ``event_data`` will be serialized as JSON, and so must be JSON serializable
+        ``event_data`` will be packed with msgpack, and so must contain only the basic types
 
         """
-        event_json = json.dumps(event_data)
-        if not isinstance(event_json, bytes):
-            event_json = event_json.encode('utf-8')
-        self.sock.send_multipart([slave.id, b'', event_json])
+        self.sock.send_multipart([slave.id, b'', msgpack.packb(event_data, use_bin_type=True)])
 
     def recv(self):
         # poll the zmq socket, populate the recv queue deque with responses
@@ -253,14 +325,43 @@ class ParallelSession(object):
         events = zmq.zmq_poll([(self.sock, zmq.POLLIN)], 50)
         if not events:
             return None, None, None
-        slaveid, _, event_json = self.sock.recv_multipart(flags=zmq.NOBLOCK)
-        event_data = json.loads(event_json)
+        slaveid, _, event_packed = self.sock.recv_multipart(flags=zmq.NOBLOCK)
+        event_data = msgpack.unpackb(event_packed, raw=False)
         event_name = event_data.pop('_event_name')
+        seq = event_data.pop('_seq', None)
         if slaveid not in self.slaves:
             self.log.error("message from terminated worker %s %s %s",
                            slaveid, event_name, event_data)
             return None, None, None
-        return self.slaves[slaveid], event_data, event_name
+        slave = self.slaves[slaveid]
+        if seq is not None:
+            if seq != slave.last_seq + 1:
+                self.log.warning('%s event %s has sequence number %s, expected %s',
+                                 slaveid, event_name, seq, slave.last_seq + 1)
+            slave.last_seq = seq
+        return slave, event_data, event_name
+
+    def _report_loop(self):
+        # runs in the reporting thread until None is queued
+        while True:
+            event = self.reports.get()
+            if event is None:
+                break
+            slaveid, event_data, event_name = event
+            try:
+                self.handle_report(slaveid, event_data, event_name)
+            except Exception:
+                self.log.exception('Exception when handling %s from %s', event_name, slaveid)
+
+    def handle_report(self, slaveid, event_data, event_name):
+        """Handles the events which the slaves don't wait for, see :py:data:`REPORT_EVENTS`"""
+        if event_name == 'message':
+            # messages are special, handle them immediately
+            self.print_message(event_data['message'], slaveid, **event_data['markup'])
+        elif event_name == 'runtest_logstart':
+            self.trdist.runtest_logstart(slaveid, event_data['nodeid'], event_data['location'])
+        elif event_name == 'runtest_logreport':
+            self.trdist.runtest_logreport(slaveid, unserialize_report(event_data['report']))
 
     def print_message(self, message, prefix='master', **markup):
         """Print a message from a node to the py.test console
@@ -280,8 +381,9 @@ class ParallelSession(object):
             else:
                 markup = {'cyan': True}
         stamp = datetime.now().strftime("%Y%m%d %H:%M:%S")
-        self.terminal.write_ensure_prefix(
-            '({})[{}] '.format(prefix, stamp), message, **markup)
+        with self.terminal_lock:
+            self.terminal.write_ensure_prefix(
+                '({})[{}] '.format(prefix, stamp), message, **markup)
 
     def ack(self, slave, event_name):
         """Acknowledge a slave's message"""
@@ -355,7 +457,10 @@ class ParallelSession(object):
         try:
             tests = list(self.failed_slave_test_groups.popleft())
         except IndexError:
-            tests = self.get(slave)
+            if self.scheduler == 'duration':
+                tests = self.get_balanced(slave)
+            else:
+                tests = self.get(slave)
         self.send(slave, tests)
         slave.tests.update(tests)
         collect_len = len(self.collection)
@@ -383,7 +488,7 @@ class ParallelSession(object):
         # If reporter() gave us a fake terminal reporter in __init__, the real
         # terminal reporter is registered by now
         self.terminal = store.terminalreporter
-        self.trdist = TerminalDistReporter(self.config, self.terminal)
+        self.trdist = TerminalDistReporter(self.config, self.terminal, self.terminal_lock)
         self.config.pluginmanager.register(self.trdist, "terminaldistreporter")
         self.session = session
 
@@ -400,6 +505,16 @@ class ParallelSession(object):
         """
         # Build master collection for slave diffing and distribution
         self.collection = [item.nodeid for item in self.session.items]
+        self.manifest = CollectionManifest.from_items(self.session.items)
+        manifest_path = self.config.cache.makedir('parallelize').join(
+            '{}.collection.json'.format(os.getpid()))
+        self.manifest.dump(manifest_path)
+        # the config is shared by all the slaves, the ones respawned later included
+        self.worker_config.update({
+            'args': self.manifest.slave_args(self.config.args, self.worker_config['options']),
+            'collection_manifest': str(manifest_path),
+            'collection_hash': self.manifest.hash,
+        })
 
         # Fire up the workers after master collection is complete
         # master and the first slave share an appliance, this is a workaround to prevent a slave
@@ -407,6 +522,13 @@ class ParallelSession(object):
         for slave in self.slaves.values():
             slave.start()
 
+        # reports are handed to the pytest hooks by this thread, so that the slow hooks don't
+        # hold up the dispatch of tests and control events
+        report_thread = Thread(target=self._report_loop, name='parallelizer-reports')
+        report_thread.daemon = True
+        report_thread.start()
+        last_audit = 0
+
         try:
             self.print_message("Waiting for {} slave collections".format(len(self.slaves)),
                 red=True)
@@ -416,7 +538,9 @@ class ParallelSession(object):
 
             while True:
                 # spawn/kill/replace slaves if needed
-                self._slave_audit()
+                if time() - last_audit >= AUDIT_INTERVAL:
+                    self._slave_audit()
+                    last_audit = time()
 
                 if not self.slaves:
                     # All slaves are killed or errored, we're done with tests
@@ -427,18 +551,19 @@ class ParallelSession(object):
                     break
 
                 slave, event_data, event_name = self.recv()
-                if event_name == 'message':
-                    message = event_data.pop('message')
-                    markup = event_data.pop('markup')
-                    # messages are special, handle them immediately
-                    self.print_message(message, slave, **markup)
-                    self.ack(slave, event_name)
+                if event_name in REPORT_EVENTS:
+                    if event_name == 'runtest_logreport':
+                        report = event_data['report']
+                        if report['when'] in ('call', 'teardown'):
+                            slave.tests.discard(report['nodeid'])
+                    self.reports.put((slave.id, event_data, event_name))
                 elif event_name == 'collectionfinish':
-                    slave_collection = event_data['node_ids']
                     # compare slave collection to the master, all test ids must be the same
-                    self.log.debug('diffing {} collection'.format(slave.id))
-                    diff_err = report_collection_diff(
-                        slave.id, self.collection, slave_collection)
+                    self.log.debug('comparing {} collection'.format(slave.id))
+                    diff_err = None
+                    if event_data['collection_hash'] != self.manifest.hash:
+                        # the slave diffs its collection against the manifest
+                        diff_err = event_data['diff']
                     if diff_err:
                         self.print_message(
                             'collection differs, respawning', slave.id,
@@ -452,18 +577,6 @@ class ParallelSession(object):
                 elif event_name == 'need_tests':
                     self.send_tests(slave)
                     self.log.info('starting master test distribution')
-                elif event_name == 'runtest_logstart':
-                    self.ack(slave, event_name)
-                    self.trdist.runtest_logstart(
-                        slave.id,
-                        event_data['nodeid'],
-                        event_data['location'])
-                elif event_name == 'runtest_logreport':
-                    self.ack(slave, event_name)
-                    report = unserialize_report(event_data['report'])
-                    if report.when in ('call', 'teardown'):
-                        slave.tests.discard(report.nodeid)
-                    self.trdist.runtest_logreport(slave.id, report)
                 elif event_name == 'internalerror':
                     self.ack(slave, event_name)
                     self.print_message(event_data['message'], slave, purple=True)
@@ -488,6 +601,9 @@ class ParallelSession(object):
             self.print_message(str(ex))
             raise
         finally:
+            # let the reporting thread handle all the received reports
+            self.reports.put(None)
+            report_thread.join()
             terminalreporter.enable()
 
         # Suppress other runtestloop calls
@@ -531,16 +647,17 @@ class ParallelSession(object):
                 self.log.info('sent tests with param {} {!r}'.format(id, tests))
                 yield tests
 
-    def get(self, slave):
-
+    def provs_of_tests(self, test_group):
         # we assume that there is only one provider of the same type and version
         # because there is no better way to group tests w/o provider initialization
-        def provs_of_tests(test_group):
-            found = set()
-            for test in test_group:
-                found.update(pv for pv in self.provs
-                             if '[' in test and pv in test)
-            return sorted(found)
+        found = set()
+        for test in test_group:
+            found.update(pv for pv in self.provs
+                         if '[' in test and pv in test)
+        return sorted(found)
+
+    def get(self, slave):
+        provs_of_tests = self.provs_of_tests
 
         if not self._pool:
             for test_group in self.test_groups:
@@ -550,6 +667,9 @@ class ParallelSession(object):
                 self.ratio = float(len(self.slaves)) / len(self.used_prov)
             else:
                 self.ratio = 0.0
+            if self.scheduler == 'duration':
+                # longest groups first, so the short ones fill the gaps at the end of the run
+                self._pool.sort(key=self.durations.group_estimate, reverse=True)
         if not self._pool:
             return []
         appliance_num_limit = 1
@@ -596,24 +716,48 @@ class ParallelSession(object):
         assert not self._pool, self._pool
         return []
 
+    def get_balanced(self, slave):
+        """Get the next chunk of tests for a slave when using the duration scheduler
 
-def report_collection_diff(slaveid, from_collection, to_collection):
-    """Report differences, if any exist, between master and a slave collection
-
-    Raises RuntimeError if collections differ
-
-    Note:
-
-        This function will sort functions before comparing them.
-
-    """
-    from_collection, to_collection = sorted(from_collection), sorted(to_collection)
-    if from_collection == to_collection:
-        # Well, that was easy.
-        return
+        The slave's own pending tests come first, then a new group from the pool (which
+        :py:meth:`get` orders longest-first); once the pool is exhausted, the slave steals
+        the tail of another slave's pending group.
+        """
+        if not slave.pending:
+            slave.pending.extend(self.get(slave) or self._steal(slave))
+
+        # always send at least one test, and as many as fit in one chunk
+        chunk = []
+        chunk_duration = 0.0
+        while slave.pending and (not chunk or chunk_duration < DURATION_CHUNK_SECONDS):
+            nodeid = slave.pending.popleft()
+            chunk.append(nodeid)
+            chunk_duration += self.durations.estimate(nodeid)
+        return chunk
+
+    def _steal(self, thief):
+        # only steal provider tests from slaves using a provider the thief already has,
+        # or adopt the provider if the thief has none allocated yet
+        candidates = []
+        for victim in self.slaves.values():
+            if victim is thief or not victim.pending:
+                continue
+            provs = self.provs_of_tests(victim.pending)
+            if provs and thief.provider_allocation and provs[0] not in thief.provider_allocation:
+                continue
+            candidates.append(victim)
+        if not candidates:
+            return []
 
-    deep = DeepDiff(from_collection, to_collection, ignore_order=True)
-    return f'{slaveid} diff:\n{deep}\n'
+        victim = max(candidates, key=lambda s: self.durations.group_estimate(s.pending))
+        provs = self.provs_of_tests(victim.pending)
+        if provs and not thief.provider_allocation:
+            thief.provider_allocation.append(provs[0])
+        # take the tail half, the victim is about to run the head
+        stolen = [victim.pending.pop() for _ in range((len(victim.pending) + 1) // 2)]
+        stolen.reverse()
+        self.print_message('stealing {} tests from {}'.format(len(stolen), victim.id), thief)
+        return stolen
 
 
 class TerminalDistReporter(object):
@@ -629,15 +773,18 @@ class TerminalDistReporter(object):
     slave ID. These hooks are called in :py:class:`ParallelSession`'s runtestloop hook.
 
     """
-    def __init__(self, config, terminal):
+    def __init__(self, config, terminal, lock=None):
         self.config = config
         self.tr = terminal
+        # the terminal is shared with the other threads of the parallel session
+        self.lock = lock or RLock()
         self.outcomes = {}
 
     def runtest_logstart(self, slaveid, nodeid, location):
         test = self.tr._locationline(nodeid, *location)
         prefix = '({}) {}'.format(slaveid, test)
-        self.tr.write_ensure_prefix(prefix, 'running', blue=True)
+        with self.lock:
+            self.tr.write_ensure_prefix(prefix, 'running', blue=True)
         self.config.hook.pytest_runtest_logstart(nodeid=nodeid, location=location)
 
     def runtest_logreport(self, slaveid, report):
@@ -675,7 +822,8 @@ class TerminalDistReporter(object):
         # This prevents reportings a test as 'PASSED' if its teardown phase fails, for example
         if report.when == 'teardown':
             word, markup = self.outcomes.pop(test)
-            self.tr.write_ensure_prefix(prefix, word, **markup)
+            with self.lock:
+                self.tr.write_ensure_prefix(prefix, word, **markup)
 
 
 Outcome = namedtuple('Outcome', ['word', 'markup'])
@@ -1,6 +1,7 @@
 import json
 import signal
 
+import msgpack
 import zmq
 from py.path import local
 
@@ -9,42 +10,65 @@ from cfme.fixtures.log import _format_nodeid
 from cfme.fixtures.log import _test_status
 from cfme.utils import log
 from cfme.utils.appliance import find_appliance
+from cfme.utils.collection_manifest import collection_hash
+from cfme.utils.collection_manifest import CollectionManifest
+from cfme.utils.collection_manifest import report_collection_diff
 
 SLAVEID = None
+# events the master replies to, the other events are sent without waiting for the master
+CONTROL_EVENTS = {'collectionfinish', 'need_tests', 'shutdown', 'internalerror'}
+# events queued for the master before sending blocks
+SEND_HWM = 1000
 
 
 class SlaveManager(object):
     """SlaveManager which coordinates with the master process for parallel testing"""
-    def __init__(self, config, slaveid, zmq_endpoint):
+    def __init__(self, config, slaveid, zmq_endpoint, manifest_path=None, manifest_hash=None):
         self.config = config
         self.session = None
         self.collection = None
+        self.manifest_path = manifest_path
+        self.manifest_hash = manifest_hash
         self.slaveid = conf.runtime['env']['slaveid'] = slaveid
         self.log = cfme.utils.log.logger
         conf.clear()
         # Override the logger in utils.log
 
         ctx = zmq.Context.instance()
-        self.sock = ctx.socket(zmq.REQ)
-        self.sock.set_hwm(1)
+        self.sock = ctx.socket(zmq.DEALER)
+        self.sock.set_hwm(SEND_HWM)
         self.sock.setsockopt_string(zmq.IDENTITY, '{}'.format(self.slaveid))
         self.sock.connect(zmq_endpoint)
+        # sequence number of the last sent event, lets the master detect lost events
+        self.seq = 0
 
         self.messages = {}
 
         self.quit_signaled = False
 
     def send_event(self, name, **kwargs):
+        """Sends the event to the master
+
+        Only :py:data:`CONTROL_EVENTS` wait for the reply of the master, which is returned unless
+        it is just an acknowledgement. Events are delivered in order, so the master has handled
+        all the previous events by the time it replies.
+        """
+        self.seq += 1
         kwargs['_event_name'] = name
+        kwargs['_seq'] = self.seq
         self.log.debug("sending {} {!r}".format(name, kwargs))
-        self.sock.send_json(kwargs)
-        recv = self.sock.recv_json()
+        # the empty frame keeps the envelope the master's ROUTER socket expects from REQ sockets
+        self.sock.send_multipart([b'', msgpack.packb(kwargs, use_bin_type=True)])
+        if name not in CONTROL_EVENTS:
+            return
+        _, reply = self.sock.recv_multipart()
+        recv = msgpack.unpackb(reply, raw=False)
         if recv == 'die':
             self.log.info('Slave instructed to die by master; shutting down')
             raise SystemExit()
         else:
             self.log.debug('received "{!r}" from master'.format(recv))
-            if recv != 'ack':
+            if not (isinstance(recv, str) and recv.startswith('ack')):
                 return recv
 
     def message(self, message, **kwargs):
@@ -54,14 +78,28 @@ class SlaveManager(object):
     def pytest_collection_finish(self, session):
         """pytest collection hook
 
-        - Sends collected tests to the master for comparison
+        - Sends the hash of collected tests to the master for comparison
+        - Sends the differences from the master collection manifest if the hashes don't match
 
         """
         self.log.debug('collection finished')
         self.session = session
         self.collection = {item.nodeid: item for item in session.items}
         terminalreporter.disable()
-        self.send_event("collectionfinish", node_ids=list(self.collection.keys()))
+        node_hash = collection_hash(self.collection)
+        if node_hash == self.manifest_hash:
+            self.send_event("collectionfinish", collection_hash=node_hash)
+        else:
+            self.send_event(
+                "collectionfinish", collection_hash=node_hash, diff=self._collection_diff())
+
+    def _collection_diff(self):
+        manifest = None
+        if self.manifest_path is not None:
+            manifest = CollectionManifest.load(self.manifest_path)
+        if manifest is None:
+            return '{} diff: collection manifest is not available\n'.format(self.slaveid)
+        return report_collection_diff(self.slaveid, manifest.node_ids, self.collection)
 
     def pytest_runtest_logstart(self, nodeid, location):
         """pytest runtest logstart hook
@@ -169,6 +207,8 @@ class SlaveManager(object):
 def serialize_report(rep):
     """
     Get a :py:class:`TestReport <pytest:_pytest.runner.TestReport>` ready to send to the master
+
+    The report is packed with msgpack, so it has to contain only the basic types
     """
     d = rep.__dict__.copy()
     if hasattr(rep.longrepr, 'toterminal'):
@@ -254,7 +294,10 @@ if __name__ == '__main__':
         conf.runtime["cfme_data"]["basic_info"]["appliance_template"] = template_name
         conf.runtime["cfme_data"]["basic_info"]["appliances_provider"] = provider_name
     pytest_config = _init_config(slave_options, slave_args)
-    slave_manager = SlaveManager(pytest_config, args.worker, config['zmq_endpoint'])
+    slave_manager = SlaveManager(
+        pytest_config, args.worker, config['zmq_endpoint'],
+        manifest_path=config.get('collection_manifest'),
+        manifest_hash=config.get('collection_hash'))
     pytest_config.pluginmanager.register(slave_manager, 'slave_manager')
     pytest_config.hook.pytest_cmdline_main(config=pytest_config)
     signal.signal(signal.SIGQUIT, slave_manager.handle_quit)
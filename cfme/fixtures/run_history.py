@@ -0,0 +1,44 @@
+"""Records test durations and outcomes in the persistent run history
+
+See :py:mod:`cfme.utils.run_history`. In parallel runs, only the master records results, as it
+receives the reports of every slave through the normal ``pytest_runtest_logreport`` hook.
+"""
+import pytest
+
+from cfme.fixtures.pytest_store import store
+from cfme.utils.run_history import DEFAULT_HISTORY_PATH
+from cfme.utils.run_history import RunHistory
+
+#: Commit the recorded results after this many finished tests
+COMMIT_INTERVAL = 20
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('cfme')
+    group.addoption('--run-history', dest='run_history', default=str(DEFAULT_HISTORY_PATH),
+                    help='Path of the database storing test durations and outcomes')
+    group.addoption('--no-run-history', dest='no_run_history', action='store_true',
+                    default=False, help='Do not record test durations and outcomes')
+
+
+@pytest.mark.trylast
+def pytest_configure(config):
+    if config.getoption('no_run_history') or store.parallelizer_role == 'slave':
+        return
+    config.pluginmanager.register(RunHistoryRecorder(config), 'run_history_recorder')
+
+
+class RunHistoryRecorder(object):
+    def __init__(self, config):
+        self.history = RunHistory(config.getoption('run_history'))
+        self.finished = 0
+
+    def pytest_runtest_logreport(self, report):
+        self.history.record(report)
+        if report.when == 'teardown':
+            self.finished += 1
+            if self.finished % COMMIT_INTERVAL == 0:
+                self.history.commit()
+
+    def pytest_unconfigure(self):
+        self.history.close()
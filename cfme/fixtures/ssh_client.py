@@ -19,4 +19,6 @@ def pytest_sessionfinish(session, exitstatus):
     for session in ssh._client_session:
         with diaper:
             session.close()
+    with diaper:
+        ssh._transport_pool.close_all()
     yield
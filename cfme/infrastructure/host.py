@@ -680,6 +680,7 @@ class All(CFMENavigateStep):
 @navigator.register(Host)
 class Details(CFMENavigateStep):
     VIEW = HostDetailsView
+    URL_IDENTIFIES_OBJECT = True
     prerequisite = NavigateToAttribute("parent", "All")
 
     def step(self, *args, **kwargs):
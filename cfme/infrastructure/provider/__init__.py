@@ -348,6 +348,7 @@ class Discover(CFMENavigateStep):
 @navigator.register(InfraProvider, 'Details')
 class Details(CFMENavigateStep):
     VIEW = InfraProviderDetailsView
+    URL_IDENTIFIES_OBJECT = True
     prerequisite = NavigateToSibling('All')
 
     def step(self, *args, **kwargs):
@@ -1,5 +1,7 @@
 from collections import defaultdict
+from copy import copy
 from distutils.version import LooseVersion
+from operator import itemgetter
 
 import attr
 import pytest
@@ -9,8 +11,10 @@ from cfme.markers.env import EnvironmentMarker
 from cfme.utils import conf
 from cfme.utils.log import logger
 from cfme.utils.providers import all_types
-from cfme.utils.providers import list_providers
+from cfme.utils.providers import get_crud
+from cfme.utils.providers import global_filters
 from cfme.utils.providers import ProviderFilter
+from cfme.utils.providers import providers_data
 from cfme.utils.pytest_shortcuts import fixture_filter
 from cfme.utils.version import Version
 
@@ -215,13 +219,102 @@ def all_required(miq_version, filters=None):
                 for ver in vers
             ])
 
-    nfilters = [DPFilter(classes=pf.classes, inverted=pf.inverted)
-                for pf in filters if isinstance(pf, ProviderFilter)]
-    for prov_filter in nfilters:
+    for prov_filter in _data_provider_filters(filters):
         dprovs = list(filter(prov_filter, dprovs))
     return dprovs
 
 
+def _data_provider_filters(filters):
+    return [DPFilter(classes=pf.classes, inverted=pf.inverted)
+            for pf in filters if isinstance(pf, ProviderFilter)]
+
+
+def _filters_signature(filters):
+    """Hashable signature of the filters, filters with the same attributes have the same one"""
+    return tuple(
+        (type(prov_filter).__name__, repr(sorted(vars(prov_filter).items())))
+        for prov_filter in filters)
+
+
+@attr.s
+class ProviderIndex(object):
+    """Providers available in the yamls and supported by the appliance series
+
+    The crud objects of all the providers from the yamls and the supported providers are created
+    only once, the filtered lists are cached by the signature of the filters. The available
+    providers are looked up by their (category, type, version).
+
+    Use :py:func:`provider_index` to get the index of the session.
+    """
+    series = attr.ib()
+    _available = attr.ib(init=False, repr=False, default=attr.Factory(dict))
+    _supported = attr.ib(init=False, repr=False, default=attr.Factory(dict))
+
+    @cached_property
+    def cruds(self):
+        return [get_crud(prov_key) for prov_key in providers_data]
+
+    @cached_property
+    def required(self):
+        return all_required(self.series)
+
+    def available(self, filters):
+        """Same as :py:func:`cfme.utils.providers.list_providers` with global filters
+
+        Returns:
+            (providers, exact, versionless) where ``exact`` maps (category, type, version) and
+            ``versionless`` maps (category, type) of providers without version to the lists of
+            (position, provider)
+        """
+        filters = list(filters) + list(global_filters.values())
+        key = _filters_signature(filters)
+        if key not in self._available:
+            providers = self.cruds
+            for prov_filter in filters:
+                providers = list(filter(prov_filter, providers))
+            exact = defaultdict(list)
+            versionless = defaultdict(list)
+            for position, a_prov in enumerate(providers):
+                try:
+                    if not a_prov.version:
+                        raise ValueError("provider {p} has no version".format(p=a_prov))
+                    exact[(a_prov.category, a_prov.type, a_prov.version)].append(
+                        (position, a_prov))
+                except (KeyError, ValueError):
+                    versionless[(a_prov.category, a_prov.type)].append((position, a_prov))
+            self._available[key] = (providers, exact, versionless)
+        return self._available[key]
+
+    def supported(self, filters):
+        """Same as :py:func:`all_required` of the series, the list must not be modified"""
+        nfilters = _data_provider_filters(filters)
+        key = _filters_signature(nfilters)
+        if key not in self._supported:
+            dprovs = self.required
+            for prov_filter in nfilters:
+                dprovs = list(filter(prov_filter, dprovs))
+            self._supported[key] = dprovs
+        return self._supported[key]
+
+    def matching(self, filters, provider):
+        """Available providers matching the supported (data) provider, in the yaml order"""
+        _, exact, versionless = self.available(filters)
+        matches = (exact.get((provider.category, provider.type_name, provider.version), []) +
+                   versionless.get((provider.category, provider.type_name), []))
+        return [a_prov for _, a_prov in sorted(matches, key=itemgetter(0))]
+
+
+# {series: ProviderIndex}, the yamls and the supportability don't change during the session
+_provider_indexes = {}
+
+
+def provider_index(series):
+    """Returns the :py:class:`ProviderIndex` of the appliance series"""
+    if series not in _provider_indexes:
+        _provider_indexes[series] = ProviderIndex(series)
+    return _provider_indexes[series]
+
+
 def providers(metafunc, filters=None, selector=ONE_PER_VERSION, fixture_name='provider'):
     """ Gets providers based on given (+ global) filters
 
@@ -248,33 +341,19 @@ def providers(metafunc, filters=None, selector=ONE_PER_VERSION, fixture_name='pr
         flags_filter = ProviderFilter(required_flags=test_flags)
         filters = filters + [flags_filter]
 
-    # available_providers are the ones "available" from the yamls after all of the global and
-    # local filters have been applied. It will be a list of crud objects.
-    available_providers = list_providers(filters)
-
+    # available providers are the ones "available" from the yamls after all of the global and
+    # local filters have been applied, they are crud objects looked up in the index.
     # supported_providers are the ones "supported" in the supportability.yaml file. It will
     # be a list of DataProvider objects and will be filtered based upon what the test has asked for
     holder = metafunc.config.pluginmanager.get_plugin('appliance-holder')
     series = holder.held_appliance.version.series()
-    supported_providers = all_required(series, filters)
+    index = provider_index(series)
+    supported_providers = index.supported(filters)
 
     def get_valid_providers(provider):
         # We now search through all the available providers looking for one that matches the
         # criteria. If we don't find one, we return None
-        prov_tuples = []
-        for a_prov in available_providers:
-            try:
-                if not a_prov.version:
-                    raise ValueError("provider {p} has no version".format(p=a_prov))
-                elif (a_prov.version == provider.version and
-                        a_prov.type == provider.type_name and
-                        a_prov.category == provider.category):
-                    prov_tuples.append((provider, a_prov))
-            except (KeyError, ValueError):
-                if (a_prov.type == provider.type_name and
-                        a_prov.category == provider.category):
-                    prov_tuples.append((provider, a_prov))
-        return prov_tuples
+        return [(provider, a_prov) for a_prov in index.matching(filters, provider)]
 
     # A small routine to check if we need to supply the idlist a provider type or
     # a real type/version
@@ -349,6 +428,8 @@ def providers(metafunc, filters=None, selector=ONE_PER_VERSION, fixture_name='pr
 
     # Now we iterate through the required providers and try to match them to the available ones
     for data_prov, real_prov in allowed_providers:
+        # the supported providers are shared by all the tests
+        data_prov = copy(data_prov)
         data_prov.key = real_prov.key
         argvalues.append(pytest.param(data_prov))
 
@@ -52,13 +52,18 @@ Note:
 
 """
 import inspect
+import time
 
+import attr
 import pytest
 
 from cfme.utils.log import logger
 
 MARKDECORATOR_TYPE = type(pytest.mark.skip)
 
+#: Number of the slowest uncollectif predicates reported in the uncollection stats
+REPORTED_PREDICATES = 5
+
 
 # work around https://github.com/pytest-dev/pytest/issues/2400
 def get_uncollect_function(marker_or_markdecorator):
@@ -68,14 +73,98 @@ def get_uncollect_function(marker_or_markdecorator):
         return list(marker_or_markdecorator)[0].args[0]
 
 
-def uncollectif(item):
+@attr.s
+class UncollectPredicate(object):
+    """ An uncollectif predicate with its argument names resolved once.
+
+    Results are memoized on the tuple of argument values, so a predicate which depends only on
+    e.g. the appliance version and the provider type is evaluated once per distinct combination.
+    """
+    func = attr.ib()
+    arg_names = attr.ib()
+    results = attr.ib(default=attr.Factory(dict))
+    calls = attr.ib(default=0)
+    evaluations = attr.ib(default=0)
+    duration = attr.ib(default=0.0)
+
+    @classmethod
+    def from_function(cls, func):
+        return cls(func, inspect.getfullargspec(func).args)
+
+    @property
+    def name(self):
+        code = getattr(self.func, '__code__', None)
+        if code is None:
+            return repr(self.func)
+        return '{}:{}'.format(code.co_filename, code.co_firstlineno)
+
+    @staticmethod
+    def memo_key(args):
+        """Returns the hashable key of the argument values, raises TypeError if there is none
+
+        :py:class:`DataProvider` is not hashable, it stands for the provider type and version, and
+        for the provider if it is matched to a real one.
+        """
+        from cfme.markers.env_markers.provider import DataProvider
+        key = tuple(
+            (DataProvider, arg.category, arg.type_name, arg.version, getattr(arg, 'key', None))
+            if isinstance(arg, DataProvider) else arg
+            for arg in args)
+        hash(key)
+        return key
+
+    def __call__(self, args):
+        self.calls += 1
+        try:
+            key = self.memo_key(args)
+        except TypeError:
+            # unhashable argument values, nothing to memoize on
+            key = None
+        else:
+            try:
+                return self.results[key]
+            except KeyError:
+                pass
+        start = time.time()
+        try:
+            retval = self.func(*args)
+        finally:
+            self.duration += time.time() - start
+            self.evaluations += 1
+        if key is not None:
+            self.results[key] = retval
+        return retval
+
+
+#: uncollectif predicates by the marker function
+_predicates = {}
+
+
+def get_predicate(func):
+    """ Returns the :py:class:`UncollectPredicate` of the marker function, None if not callable"""
+    try:
+        return _predicates[func]
+    except KeyError:
+        pass
+    try:
+        predicate = UncollectPredicate.from_function(func)
+    except TypeError:
+        predicate = None
+    _predicates[func] = predicate
+    return predicate
+
+
+def uncollectif(item, global_vars=None):
     """ Evaluates if an item should be uncollected
 
     Tests markers against a supplied lambda from the markers object to determine
     if the item should be uncollected or not.
-    """
-    from cfme.utils.appliance import find_appliance
 
+    Args:
+        item: py.test test item
+        global_vars: values available to all the predicates, the appliance is looked up
+            if not supplied
+    """
     from cfme.utils.pytest_shortcuts import extract_fixtures_values
     markers = item.get_marker('uncollectif')
     if not markers:
@@ -85,18 +174,14 @@ def uncollectif(item):
             item.name,
             mark.kwargs.get('reason', 'No reason given'))
         logger.debug(log_msg)
-        try:
-            arg_names = inspect.getargspec(get_uncollect_function(mark)).args
-        except TypeError:
+        predicate = get_predicate(get_uncollect_function(mark))
+        if predicate is None:
             logger.debug(log_msg)
             return not bool(mark.args[0]), mark.kwargs.get('reason', 'No reason given')
+        arg_names = predicate.arg_names
 
-        app = find_appliance(item, require=False)
-        if app:
-            global_vars = {'appliance': app}
-        else:
-            logger.info("while uncollecting %s - appliance not known", item)
-            global_vars = {}
+        if global_vars is None:
+            global_vars = appliance_vars(item)
 
         try:
             values = extract_fixtures_values(item)
@@ -114,7 +199,7 @@ def uncollectif(item):
             else:
                 raise Exception("Failed to uncollect {}, best guess a fixture wasn't "
                                 "ready".format(func_name))
-        retval = mark.args[0](*args)
+        retval = predicate(args)
         if retval:
             # shortcut
             return retval, mark.kwargs.get('reason', "No reason given")
@@ -125,29 +210,61 @@ def uncollectif(item):
         return False, None
 
 
+def appliance_vars(item):
+    """ Returns the values of the uncollectif predicates looked up from the appliance"""
+    from cfme.utils.appliance import find_appliance
+    app = find_appliance(item, require=False)
+    if app:
+        return {'appliance': app}
+    else:
+        logger.info("while uncollecting %s - appliance not known", item)
+        return {}
+
+
+def predicate_stats():
+    """ Returns the evaluated uncollectif predicates, the slowest first"""
+    return sorted((predicate for predicate in _predicates.values()
+                   if predicate is not None and predicate.calls),
+                  key=lambda predicate: predicate.duration, reverse=True)
+
+
 def pytest_collection_modifyitems(session, config, items):
     from cfme.fixtures.pytest_store import store
     len_collected = len(items)
 
     new_items = []
-
-    from cfme.utils.path import log_path
-    with log_path.join('uncollected.log').open('w') as f:
-        for item in items:
-            # First filter out all items who have the uncollect mark
-            uncollect_marker = item.get_marker('uncollect')
-            if uncollect_marker:
-                uncollect_reason = uncollect_marker.kwargs.get('reason', "No reason given")
-                f.write("{} - {}\n".format(item.name, uncollect_reason))
+    lines = []
+    global_vars = appliance_vars(session) if items else {}
+
+    for item in items:
+        # First filter out all items who have the uncollect mark
+        uncollect_marker = item.get_marker('uncollect')
+        if uncollect_marker:
+            uncollect_reason = uncollect_marker.kwargs.get('reason', "No reason given")
+            lines.append("{} - {}\n".format(item.name, uncollect_reason))
+        else:
+            uncollectif_result, uncollectif_reason = uncollectif(item, global_vars)
+            if uncollectif_result:
+                lines.append("{} - {}\n".format(item.name, uncollectif_reason))
             else:
-                uncollectif_result, uncollectif_reason = uncollectif(item)
-                if uncollectif_result:
-                    f.write("{} - {}\n".format(item.name, uncollectif_reason))
-                else:
-                    new_items.append(item)
+                new_items.append(item)
 
     items[:] = new_items
 
+    stats = predicate_stats()
+    from cfme.utils.path import log_path
+    with log_path.join('uncollected.log').open('w') as f:
+        f.writelines(lines)
+        if stats:
+            f.write("\nuncollectif predicates (calls, evaluations, seconds):\n")
+            f.writelines("{} - {}, {}, {:.3f}\n".format(
+                predicate.name, predicate.calls, predicate.evaluations, predicate.duration)
+                for predicate in stats)
+
     len_filtered = len(items)
     filtered_count = len_collected - len_filtered
     store.uncollection_stats['uncollectif'] = filtered_count
+    for predicate in stats[:REPORTED_PREDICATES]:
+        store.uncollection_stats['uncollectif {}'.format(predicate.name)] = (
+            '{:.3f}s, {} calls, {} evaluated'.format(
+                predicate.duration, predicate.calls, predicate.evaluations))
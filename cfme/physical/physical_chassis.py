@@ -113,7 +113,7 @@ class PhysicalChassis(BaseEntity, Updateable, Pretty, PolicyProfileAssignable, T
 
         # Refresh the browser
         if ui:
-            self.browser.selenium.refresh()
+            self.browser.refresh()
 
         # Verify that the stats retrieved from wrapanapi match those retrieved
         # from the UI
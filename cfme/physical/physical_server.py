@@ -243,7 +243,7 @@ class PhysicalServer(BaseEntity, Updateable, Pretty, PolicyProfileAssignable, Ta
 
         # Refresh the browser
         if ui:
-            self.browser.selenium.refresh()
+            self.browser.refresh()
 
         # Verify that the stats retrieved from wrapanapi match those retrieved
         # from the UI
@@ -156,7 +156,7 @@ class RedfishPhysicalRack(PhysicalRack):
 
         # Refresh the browser
         if ui:
-            self.browser.selenium.refresh()
+            self.browser.refresh()
 
         # Verify that the stats retrieved from wrapanapi match those retrieved
         # from the UI
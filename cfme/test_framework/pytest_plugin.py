@@ -76,6 +76,7 @@ pytest_plugins = (
     'cfme.fixtures.physical_switch',
     'cfme.fixtures.qa_contact',
     'cfme.fixtures.randomness',
+    'cfme.fixtures.run_history',
     'cfme.fixtures.rbac',
     'cfme.fixtures.sauce',
     'cfme.fixtures.screenshots',
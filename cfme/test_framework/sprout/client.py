@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
 import json
 import os
+import time
 
 import attr
 import requests
+from cached_property import cached_property
 from miq_version import LATEST_DOWN_STREAM
 
 from cfme.utils.appliance import IPAppliance
@@ -39,13 +41,52 @@ class SproutClient(object):
     _port = attr.ib(default=8000)
     _entry = attr.ib(default="appliances/api")
     _auth = attr.ib(default=None)
+    # keeps the connection to Sprout open between the calls
+    _session = attr.ib(init=False, repr=False, cmp=False, default=attr.Factory(requests.Session))
 
     @property
     def api_entry(self):
         return "{}://{}:{}/{}".format(self._proto, self._host, self._port, self._entry)
 
     def _post(self, **data):
-        return requests.post(self.api_entry, data=json.dumps(data))
+        return self._session.post(self.api_entry, data=json.dumps(data))
+
+    @cached_property
+    def available_methods(self):
+        result = self._session.get(self.api_entry).json()
+        return {method["name"] for method in result["result"]["available_methods"]}
+
+    @property
+    def long_polling(self):
+        """Whether Sprout can wait for the pool status changes, see :py:meth:`pool_status`"""
+        return "request_wait" in self.available_methods
+
+    def pool_status(self, request_id, revision=None):
+        """Returns the status of the appliance pool.
+
+        If the ``revision`` of a previously returned status is passed, Sprout waits a while for
+        the status to change before returning it. Older Sprout without :py:attr:`long_polling`
+        returns the status immediately.
+        """
+        if revision is not None and self.long_polling:
+            return self.call_method('request_wait', str(request_id), revision=revision)
+        return self.call_method('request_check', str(request_id))
+
+    def wait_for_pool(self, request_id, num_sec=900, message=None):
+        """Waits until the appliance pool is finished, returns the last status of the pool"""
+        status = {}
+
+        def _finished():
+            revision = status.get('revision')
+            status.update(self.pool_status(request_id, revision=revision))
+            if revision is not None and status.get('revision') == revision:
+                # Sprout answers right away when too many clients are waiting already
+                time.sleep(1)
+            return status['finished']
+
+        wait_for(_finished, num_sec=num_sec, delay=0 if self.long_polling else 1,
+                 message=message)
+        return status
 
     def _call_post(self, **data):
         """Protect from the Sprout being updated (error 502,503)"""
@@ -125,11 +166,10 @@ class SproutClient(object):
             count=count,
             **kwargs
         )
-        wait_for(
-            lambda: self.call_method('request_check', str(request_id))['finished'],
+        data = self.wait_for_pool(
+            request_id,
             num_sec=wait_time,
             message='provision {} appliance(s) from sprout'.format(count))
-        data = self.call_method('request_check', str(request_id))
         logger.debug(data)
         appliances = []
         for appliance in data['appliances']:
@@ -239,6 +239,7 @@ class SproutProvisioningRequest(object):
 class SproutManager(object):
     sprout_user_key = attr.ib(default=None)
     pool = attr.ib(init=False, default=None)
+    pool_revision = attr.ib(init=False, default=None, repr=False)
     lease_time = attr.ib(init=False, default=None, repr=False)
     timer = attr.ib(init=False, default=None, repr=False)
 
@@ -254,7 +255,7 @@ class SproutManager(object):
             result = wait_for(
                 self.check_fullfilled,
                 num_sec=provision_request.provision_timeout * 60,
-                delay=5,
+                delay=0 if self.client.long_polling else 5,
                 message="requesting appliances was fulfilled"
             )
         except Exception:
@@ -314,13 +315,15 @@ class SproutManager(object):
 
     def check_fullfilled(self):
         try:
-            result = self.request_check()
+            # waits for the pool status to change since the last check
+            result = self.client.pool_status(self.pool, revision=self.pool_revision)
         except SproutException as e:
             # TODO: ensure we only exit this way on sprout usage
             self.destroy_pool()
             log.error("sprout pool could not be fulfilled\n%s", str(e))
             pytest.exit(1)
 
+        self.pool_revision = result.get('revision')
         log.debug("fulfilled at %f %%", result['progress'])
         return result["finished"]
 
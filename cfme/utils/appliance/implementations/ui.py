@@ -5,6 +5,7 @@ import time
 from inspect import isclass
 from time import sleep
 
+import attr
 from cached_property import cached_property
 from jsmin import jsmin
 from navmazing import Navigate
@@ -14,6 +15,7 @@ from selenium.common.exceptions import InvalidElementStateException
 from selenium.common.exceptions import InvalidSwitchToTargetException
 from selenium.common.exceptions import NoSuchElementException
 from selenium.common.exceptions import StaleElementReferenceException
+from selenium.common.exceptions import TimeoutException
 from selenium.common.exceptions import UnexpectedAlertPresentException
 from selenium.common.exceptions import WebDriverException
 from widgetastic.browser import Browser
@@ -120,12 +122,54 @@ class MiqBrowserPlugin(DefaultPlugin):
         }
         ''')
 
+    # The page is polled in the browser and the callback is called once it is safe or after
+    # the number of seconds passed as the first argument, whichever comes first
+    ENSURE_PAGE_SAFE_ASYNC = jsmin('''\
+        var callback = arguments[arguments.length - 1];
+        var deadline = Date.now() + arguments[0] * 1000;
+
+        function isPageSafe() {%s}
+
+        function check() {
+            var safe = false;
+            try {
+                safe = isPageSafe();
+            } catch(err) {
+            }
+            if (safe || Date.now() >= deadline) {
+                callback(Boolean(safe));
+            } else {
+                setTimeout(check, 50);
+            }
+        }
+
+        check();
+        ''' % ENSURE_PAGE_SAFE)
+    # Longest wait of one async check, has to be shorter than the selenium script timeout
+    ASYNC_CHECK_WAIT = 5
+    # A safe page is not checked again by consecutive read-only GTL commands until it is changed,
+    # but not longer than this (seconds), as some changes (timers, raw selenium calls) are not
+    # tracked
+    SAFE_PAGE_TTL = 1.0
+    # Least delay between the keyboard input and the previous interaction with the page
+    KEYBOARD_INPUT_GAP = 0.3
+
     OBSERVED_FIELD_MARKERS = (
         'data-miq_observe',
         'data-miq_observe_date',
         'data-miq_observe_checkbox',
     )
     DEFAULT_WAIT = .8
+    # (token, items) of the GTL page, see ReportDataControllerMixin.entity_index
+    entity_index = None
+    # incremented by everything what may change the page, see page_changed
+    page_generation = 0
+    # (page_generation, time) of the last read-only check which found the page safe, reset by
+    # any other check, see ensure_page_safe_to_read
+    safe_page = None
+    # time of the last click or keyboard input
+    last_interaction = 0
+    async_checks = True
 
     @property
     def page_has_changes(self):
@@ -178,18 +222,64 @@ class MiqBrowserPlugin(DefaultPlugin):
             self.browser.selenium.switch_to.window(win)
             self.logger.debug('Switched back to the original window')
 
+    def page_changed(self):
+        """Makes the next :py:meth:`ensure_page_safe` check the page again."""
+        self.page_generation += 1
+
+    def _check_page_safe(self):
+        if self.async_checks:
+            try:
+                return bool(self.browser.selenium.execute_async_script(
+                    self.ENSURE_PAGE_SAFE_ASYNC, self.ASYNC_CHECK_WAIT))
+            except UnexpectedAlertPresentException:
+                raise
+            except TimeoutException:
+                # the script timeout is shorter than ASYNC_CHECK_WAIT, async checks are useless
+                self.logger.warning('async page checks timed out, falling back to polling')
+                self.async_checks = False
+            except WebDriverException:
+                # f.e. the page was unloaded during the check
+                pass
+        return bool(self.browser.execute_script(self.ENSURE_PAGE_SAFE, silent=True))
+
     def ensure_page_safe(self, timeout='20s'):
         # THIS ONE SHOULD ALWAYS USE JAVASCRIPT ONLY, NO OTHER SELENIUM INTERACTION
+        self.safe_page = None
+        self._wait_for_safe_page(timeout)
+
+    def ensure_page_safe_to_read(self, timeout='20s'):
+        """Like :py:meth:`ensure_page_safe`, for the read-only GTL commands.
+
+        The check is skipped if the previous check was also made for a read-only command, found
+        the page safe and nothing has changed the page since then.
+        """
+        generation = self.page_generation
+        if self.safe_page is not None:
+            safe_generation, safe_time = self.safe_page
+            if safe_generation == generation and time.time() - safe_time < self.SAFE_PAGE_TTL:
+                return
+        self._wait_for_safe_page(timeout, remember=True)
+
+    def _wait_for_safe_page(self, timeout, remember=False):
+        generation = self.page_generation
+
         def _check():
-            result = self.browser.execute_script(self.ENSURE_PAGE_SAFE, silent=True)
             # TODO: Logging
-            return bool(result)
+            if self._check_page_safe():
+                if remember:
+                    self.safe_page = (generation, time.time())
+                return True
+            return False
         wait_for(_check, timeout=timeout, delay=0.2, silent_failure=True, very_quiet=True)
 
     def after_keyboard_input(self, element, keyboard_input):
+        # the checks made during the input may have run before the page started to change
+        self.page_changed()
+        self.last_interaction = time.time()
+        self.entity_index = None
         observed_field_attr = None
-        for attr in self.OBSERVED_FIELD_MARKERS:
-            observed_field_attr = self.browser.get_attribute(attr, element)
+        for marker in self.OBSERVED_FIELD_MARKERS:
+            observed_field_attr = self.browser.get_attribute(marker, element)
             if observed_field_attr is not None:
                 break
         else:
@@ -217,10 +307,15 @@ class MiqBrowserPlugin(DefaultPlugin):
         # there is an issue in different dialogs
         # when cfme doesn't see that some input fields have been updated
         # this is temporary fix until we figure out real reason and fix it
-        sleep(0.3)
+        # the time spent since the last click or input counts towards the delay
+        delay = self.KEYBOARD_INPUT_GAP - (time.time() - self.last_interaction)
+        if delay > 0:
+            sleep(delay)
+        self.page_changed()
         self.make_document_focused()
 
     def before_click(self, element, locator):
+        self.page_changed()
         # this is necessary in order to handle unexpected alerts like "Abandon Changes"
         self.browser.page_dirty = self.page_has_changes
 
@@ -228,6 +323,10 @@ class MiqBrowserPlugin(DefaultPlugin):
         # page_dirty is set to None because otherwise if it was true, all next ensure_page_safe
         # calls would check alert presence which is enormously slow in selenium.
         self.browser.page_dirty = None
+        # the checks made during the click may have run before the page started to change
+        self.page_changed()
+        self.last_interaction = time.time()
+        self.entity_index = None
 
 
 class MiqBrowser(HandleModalsMixin, Browser):
@@ -254,6 +353,26 @@ class MiqBrowser(HandleModalsMixin, Browser):
     def appliance(self):
         return self.extra_objects['appliance']
 
+    @property
+    def url(self):
+        return Browser.url.fget(self)
+
+    @url.setter
+    def url(self, address):
+        Browser.url.fset(self, address)
+        self.plugin.page_changed()
+
+    def refresh(self):
+        result = super(MiqBrowser, self).refresh()
+        self.plugin.page_changed()
+        return result
+
+    def execute_script(self, script, *args, **kwargs):
+        # scripts which are not silent are expected to possibly change the page
+        if not kwargs.get('silent', False):
+            self.plugin.page_changed()
+        return super(MiqBrowser, self).execute_script(script, *args, **kwargs)
+
     def create_view(self, *args, **kwargs):
         timeout = kwargs.pop('wait', None)
         view = self.appliance.browser.create_view(*args, **kwargs)
@@ -266,6 +385,81 @@ class MiqBrowser(HandleModalsMixin, Browser):
         return self.appliance.version
 
 
+@attr.s
+class NavigationStat(object):
+    """Time spent by navigation to one destination."""
+    destination = attr.ib()
+    calls = attr.ib(default=0)
+    shortcuts = attr.ib(default=0)
+    total = attr.ib(default=0.0)
+    longest = attr.ib(default=0.0)
+
+    @property
+    def mean(self):
+        return self.total / self.calls if self.calls else 0.0
+
+
+@attr.s
+class NavigationCache(object):
+    """URLs reached by the navigation steps during the session.
+
+    Navigation to the same destination of the same object can then jump to the URL directly
+    instead of running all the prerequisites. Only the URLs of the steps which declare
+    ``URL_IDENTIFIES_OBJECT`` are learned. Also collects :py:class:`NavigationStat` of every
+    destination.
+    """
+    urls = attr.ib(default=attr.Factory(dict))
+    _stats = attr.ib(default=attr.Factory(dict))
+
+    @staticmethod
+    def identity(obj):
+        """Identifies the object by its repr and the reprs of its parents.
+
+        Most entities aren't hashable and their repr leaves out the parent, so e.g. same-named
+        tags of different categories only differ in the parents. The chain ends before the
+        appliance, which is the same for the whole cache.
+        """
+        identity = []
+        while not isclass(obj) and attr.has(type(obj)):
+            identity.append(repr(obj))
+            if getattr(attr.fields(type(obj)), 'parent', None) is None:
+                break
+            obj = obj.parent
+        else:
+            identity.append(obj if isclass(obj) else type(obj))
+        return tuple(identity)
+
+    @classmethod
+    def key(cls, step, args, kwargs):
+        return (step._name, cls.identity(step.obj), repr(args), repr(sorted(kwargs.items())))
+
+    def url(self, step, args, kwargs):
+        return self.urls.get(self.key(step, args, kwargs))
+
+    def learn(self, step, args, kwargs, url):
+        self.urls[self.key(step, args, kwargs)] = url
+
+    def forget(self, step, args, kwargs):
+        self.urls.pop(self.key(step, args, kwargs), None)
+
+    def record(self, step, duration, shortcut=False):
+        obj = step.obj if isclass(step.obj) else type(step.obj)
+        destination = '{}.{}'.format(obj.__name__, step._name)
+        stat = self._stats.setdefault(destination, NavigationStat(destination))
+        stat.calls += 1
+        stat.shortcuts += int(shortcut)
+        stat.total += duration
+        stat.longest = max(stat.longest, duration)
+
+    @property
+    def stats(self):
+        """:py:class:`NavigationStat` of every destination, the most time consuming first.
+
+        Time of a destination includes the time of its prerequisites.
+        """
+        return sorted(self._stats.values(), key=lambda stat: stat.total, reverse=True)
+
+
 def can_skip_badness_test(fn):
     """Decorator for setting a noop"""
     fn._can_skip_badness_test = True
@@ -274,6 +468,9 @@ def can_skip_badness_test(fn):
 
 class CFMENavigateStep(NavigateStep):
     VIEW = None
+    #: Whether the url reached by the step shows the destination of this very object, regardless
+    #: of the state of the session, so navigation can jump to it next time
+    URL_IDENTIFIES_OBJECT = False
 
     @cached_property
     def view(self):
@@ -537,6 +734,37 @@ class CFMENavigateStep(NavigateStep):
             force=str_force, duration=duration
         )
 
+    @property
+    def current_url(self):
+        try:
+            return self.appliance.browser.widgetastic.url
+        except WebDriverException:
+            return None
+
+    def go_by_shortcut(self, *args, **kwargs):
+        """Jumps to the url of the destination learned by the previous navigation.
+
+        Returns:
+            ``True`` if the destination view is displayed after the jump.
+        """
+        if self.VIEW is None or not self.URL_IDENTIFIES_OBJECT:
+            return False
+        nav_cache = self.appliance.browser.nav_cache
+        url = nav_cache.url(self, args, kwargs)
+        if url is None:
+            return False
+        self.log_message("Jumping to {}".format(url))
+        try:
+            self.appliance.browser.widgetastic.url = url
+            here = self.am_i_here()
+        except WebDriverException as e:
+            self.log_message("Exception raised [{}] whilst jumping".format(e), level="warning")
+            here = False
+        if not here:
+            self.log_message("Jump didn't reach the view, navigating by steps", level="warning")
+            nav_cache.forget(self, args, kwargs)
+        return here
+
     def go(self, _tries=0, *args, **kwargs):
         nav_args = {'use_resetter': True, 'wait_for_view': 10, 'force': False}
         self.log_message("Beginning Navigation...", level="info")
@@ -565,11 +793,17 @@ class CFMENavigateStep(NavigateStep):
         except Exception as e:
             self.log_message(
                 "Exception raised [{}] whilst checking if already here".format(e), level="error")
-        if not here or nav_args['force']:
+        nav_cache = self.appliance.browser.nav_cache
+        shortcut_used = False
+        step_url = None
+        if not here and not nav_args['force']:
+            shortcut_used = self.go_by_shortcut(*args, **kwargs)
+        if (not here and not shortcut_used) or nav_args['force']:
             if nav_args['force']:
                 force_used = True
             self.log_message("Prerequisite Needed")
             self.prerequisite_view = self.prerequisite()
+            prerequisite_url = self.current_url if self.URL_IDENTIFIES_OBJECT else None
             try:
                 self.check_for_badness(self.step, _tries, nav_args, *args, **kwargs)
             except (exceptions.CandidateNotFound, exceptions.ItemNotFound) as e:
@@ -579,6 +813,11 @@ class CFMENavigateStep(NavigateStep):
                 )
                 self.appliance.browser.widgetastic.refresh()
                 self.check_for_badness(self.step, _tries, nav_args, *args, **kwargs)
+            if self.URL_IDENTIFIES_OBJECT:
+                step_url = self.current_url
+                # the destination isn't identified by the url if the step didn't change it
+                if step_url == prerequisite_url:
+                    step_url = None
         if nav_args['use_resetter']:
             resetter_used = True
             self.check_for_badness(self.resetter, _tries, nav_args, *args, **kwargs)
@@ -592,6 +831,9 @@ class CFMENavigateStep(NavigateStep):
                 lambda: view.is_displayed, num_sec=nav_args['wait_for_view'],
                 message="Waiting for view [{}] to display".format(view.__class__.__name__)
             )
+            if step_url is not None:
+                nav_cache.learn(self, args, kwargs, step_url)
+        nav_cache.record(self, time.time() - start_time, shortcut=shortcut_used)
         self.log_message(
             self.construct_message(here, resetter_used, view, duration, waited, force_used),
             level="info"
@@ -612,6 +854,11 @@ class ViaUI(Implementation):
     def __str__(self):
         return 'UI'
 
+    @cached_property
+    def nav_cache(self):
+        """:py:class:`NavigationCache` of the appliance, kept when the browser is restarted."""
+        return NavigationCache()
+
     @cached_property
     def widgetastic(self):
         """This gives us a widgetastic browser."""
@@ -0,0 +1,94 @@
+"""Collection manifest shared by the parallelizer master with its slaves
+
+The master writes the manifest once its collection is finished. Slaves collect only the modules
+listed in it and compare the hash of their collection to the hash of the manifest. The node ids
+in the manifest are only loaded to report the differences when the hashes don't match.
+
+It lives outside of :py:mod:`cfme.fixtures.parallelizer`, as the slaves must not import the master
+plugin.
+"""
+import hashlib
+import json
+
+import attr
+
+# bump when the manifest format changes
+MANIFEST_VERSION = 1
+
+
+def collection_hash(node_ids):
+    """Hash of the collection, independent of the order and duplicates of the tests"""
+    digest = hashlib.sha256()
+    for nodeid in sorted(set(node_ids)):
+        digest.update(nodeid.encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def report_collection_diff(slaveid, from_collection, to_collection):
+    """Report differences, if any exist, between master and a slave collection
+
+    Returns None if the collections contain the same tests, the report otherwise.
+    """
+    from_collection, to_collection = set(from_collection), set(to_collection)
+    if from_collection == to_collection:
+        # Well, that was easy.
+        return
+
+    lines = ['{} diff:'.format(slaveid)]
+    lines.extend('- {}'.format(nodeid) for nodeid in sorted(from_collection - to_collection))
+    lines.extend('+ {}'.format(nodeid) for nodeid in sorted(to_collection - from_collection))
+    return '\n'.join(lines) + '\n'
+
+
+@attr.s
+class CollectionManifest(object):
+    """Node ids and modules of the master collection
+
+    Args:
+        node_ids: Ids of the collected tests, in the collection order
+        modules: Paths of the modules containing the collected tests, in the collection order
+        hash: :py:func:`collection_hash` of the node ids
+    """
+    node_ids = attr.ib()
+    modules = attr.ib()
+    hash = attr.ib()
+    version = attr.ib(default=MANIFEST_VERSION)
+
+    @classmethod
+    def from_items(cls, items):
+        node_ids = [item.nodeid for item in items]
+        modules = []
+        seen = set()
+        for item in items:
+            module = str(item.fspath)
+            if module not in seen:
+                seen.add(module)
+                modules.append(module)
+        return cls(node_ids=node_ids, modules=modules, hash=collection_hash(node_ids))
+
+    def dump(self, path):
+        with open(str(path), 'w') as f:
+            json.dump(attr.asdict(self), f)
+
+    @classmethod
+    def load(cls, path):
+        """Loads the manifest, returns None if it was written by a different version"""
+        with open(str(path)) as f:
+            data = json.load(f)
+        if data.get('version') != MANIFEST_VERSION:
+            return None
+        return cls(**data)
+
+    def slave_args(self, args, options):
+        """Collection args for the slaves
+
+        The manifest modules are used when they select the same tests as the master args. Node
+        ids and package names in the master args select something else than whole modules, the
+        master args are kept in that case.
+        """
+        if not self.modules or options.get('pyargs'):
+            return args
+        if any('::' in arg for arg in args):
+            return args
+        return self.modules
@@ -2,6 +2,8 @@
 """Library for event testing.
 
 """
+from collections import defaultdict
+from itertools import product
 from threading import Event as ThreadEvent
 from threading import Thread
 from time import sleep
@@ -106,6 +108,15 @@ class Event(object):
         else:
             return True
 
+    def index_key(self, name):
+        """ Returns value of attribute used as key in expected event index.
+
+        None stands for any value."""
+        attr = self.event_attrs.get(name)
+        if attr is None or attr.cmp_func or not attr.value:
+            return None
+        return attr.value
+
     def add_attrs(self, *attrs):
         """ Adds an EventAttr to event."""
         for attr in attrs:
@@ -123,9 +134,16 @@ class RestEventListener(Thread):
     """ EventListener accepts "expected" events, listens to db events and compares matched events
     with expected events. Runs callback function if expected events have it.
 
-    :var FILTER_ATTRS: List of filters used in REST API call
+    All new events are fetched by one REST API call per poll, with only the attributes compared by
+    expected events, and matched locally. The API is polled less often while nothing happens.
+
+    :var INDEX_ATTRS: Attributes of the expected events index
+    :var PORTION_SIZE: Maximal number of events fetched by one REST API call
     """
-    FILTER_ATTRS = ['event_type', 'target_type', 'target_id', 'source']
+    INDEX_ATTRS = ('event_type', 'target_type', 'target_id')
+    PORTION_SIZE = 1000
+    MIN_POLL_INTERVAL = 1
+    MAX_POLL_INTERVAL = 8
 
     def __init__(self, appliance):
         super(RestEventListener, self).__init__()
@@ -211,58 +229,95 @@ class RestEventListener(Thread):
 
         Processed events are ignored next time.
         """
-        while not self._stop_event.is_set():
-            sleep(1)
-            cur_last_record_id = self.get_max_record_id()
-            if not cur_last_record_id:
+        poll_interval = self.MIN_POLL_INTERVAL
+        while not self._stop_event.wait(poll_interval):
+            pending_events = self._pending_events()
+            if not pending_events:
+                # nothing to match, just skip events occurred so far
+                self._last_processed_id = self.get_max_record_id() or self._last_processed_id
                 continue
 
-            for exp_event in self._events_to_listen:
-
-                # Skip if event has occurred
-                if exp_event['first_event'] and len(exp_event['matched_events']):
-                    continue
+            index = self._index_expected_events(pending_events)
+            try:
+                event_entities = self.get_next_portion(pending_events)
+            except Exception:
+                logger.exception("An exception during obtaining events occurred.")
+                continue
 
-                matched_events = self.get_next_portion(exp_event['event'], cur_last_record_id)
+            if not event_entities:
+                poll_interval = min(poll_interval * 2, self.MAX_POLL_INTERVAL)
+                continue
+            poll_interval = self.MIN_POLL_INTERVAL
 
-                if not matched_events:
-                    continue
+            # Match events
+            try:
+                for event_entity in event_entities:
+                    got_event = Event(self._appliance).build_from_entity(event_entity)
+                    for exp_event in self._candidate_events(index, got_event):
+                        # Skip if event has occurred
+                        if exp_event['first_event'] and len(exp_event['matched_events']):
+                            continue
 
-                # Match events
-                try:
-                    for event_entity in matched_events:
-                        got_event = Event(self._appliance).build_from_entity(event_entity)
                         if exp_event['event'].matches(got_event):
                             if exp_event['callback']:
                                 exp_event['callback'](exp_event=exp_event['event'],
                                                       got_event=got_event)
                             exp_event['matched_events'].append(got_event)
-                except Exception:
-                    logger.exception("An exception during matching events occurred.")
-
-                if self._stop_event.is_set():
-                    break
-            self._last_processed_id = cur_last_record_id
-
-    def get_next_portion(self, evt, max_id=None):
-        """ Returns list with one or more events matched with expected event.
-
-        Returns None if there is no matched events."""
-        evt.process_id()
-
-        q = Q('id', '>', self._last_processed_id)  # ensure we get only new events
-        if max_id:
-            q &= Q('id', '<=', max_id)
-
-        used_filters = set(self.FILTER_ATTRS).intersection(set(evt.event_attrs))
-        for filter_attr in used_filters:
-            evt_attr = evt.event_attrs[filter_attr]
-            if evt_attr.value:
-                q &= Q(filter_attr, '=', evt_attr.value)
-        result = self.event_streams.filter(q)
 
-        if len(result):
-            return result
+                    if self._stop_event.is_set():
+                        break
+            except Exception:
+                logger.exception("An exception during matching events occurred.")
+
+    def _pending_events(self):
+        """ Returns expected events which can still match."""
+        return [evt for evt in self._events_to_listen
+                if not (evt['first_event'] and len(evt['matched_events']))]
+
+    def _index_expected_events(self, exp_events):
+        """ Maps values of INDEX_ATTRS to expected events, None stands for any value."""
+        index = defaultdict(list)
+        for exp_event in exp_events:
+            exp_event['event'].process_id()
+            key = tuple(exp_event['event'].index_key(name) for name in self.INDEX_ATTRS)
+            index[key].append(exp_event)
+        return index
+
+    def _candidate_events(self, index, got_event):
+        """ Returns expected events which may match got event in the order they were added."""
+        values = [got_event.index_key(name) for name in self.INDEX_ATTRS]
+        candidates = []
+        for key in product(*[(value, None) if value is not None else (None,)
+                             for value in values]):
+            candidates.extend(index.get(key, []))
+        order = {id(evt): i for i, evt in enumerate(self._events_to_listen)}
+        return sorted(candidates, key=lambda evt: order[id(evt)])
+
+    def get_next_portion(self, exp_events):
+        """ Returns list of all the new events as entities.
+
+        Events are fetched in pages of PORTION_SIZE sorted by id, with only the attributes used by
+        expected events. The returned events are not fetched next time."""
+        attributes = {'id'}
+        for exp_event in exp_events:
+            # target_name isn't event attribute, it is resolved to target_id
+            attributes.update(set(exp_event['event'].event_attrs) - {'target_name'})
+
+        entities = []
+        while True:
+            result = self.event_streams.query_string(**{
+                'filter[]': Q('id', '>', self._last_processed_id).as_filters,
+                'expand': 'resources',
+                'attributes': ','.join(sorted(attributes)),
+                'sort_by': 'id',
+                'sort_order': 'asc',
+                'limit': self.PORTION_SIZE})
+            # resources are complete, using them directly doesn't reload every entity
+            entities.extend(result.resources)
+            if result.resources:
+                self._last_processed_id = result.resources[-1]['_data']['id']
+            if len(result.resources) < self.PORTION_SIZE or self._stop_event.is_set():
+                return entities
 
     @property
     def got_events(self):
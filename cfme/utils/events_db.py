@@ -1,16 +1,20 @@
 # -*- coding: utf-8 -*-
 """Library for event testing.
 """
+from collections import defaultdict
 from collections import Iterable
 from contextlib import contextmanager
 from datetime import datetime
+from itertools import product
 from numbers import Number
 from threading import Event as ThreadEvent
 from threading import Thread
-from time import sleep
 
 from cached_property import cached_property
+from sqlalchemy.sql.expression import and_
 from sqlalchemy.sql.expression import func
+from sqlalchemy.sql.expression import or_
+from sqlalchemy.sql.expression import true
 
 from cfme.utils.log import create_sublogger
 
@@ -209,8 +213,8 @@ class Event(object):
         for attr_name, attr_type in self._tool.event_streams_attributes:
             self._default_attrs[attr_name] = EventAttr(**{attr_name: None, 'attr_type': attr_type})
 
-    def _parse_raw_event(self, evt):
-        for attr in self._default_attrs:
+    def _parse_raw_event(self, evt, attrs=None):
+        for attr in attrs or self._default_attrs:
             default_type = self._default_attrs[attr].type
             evt_value = getattr(evt, attr)
             evt_type = type(evt_value)
@@ -231,7 +235,22 @@ class Event(object):
         if not isinstance(evt, type(self)):
             raise ValueError("passed event doesn't belong to {}".format(type(self)))
 
+        if not self.resolve_target():
+            return False
+
         # checking only common attributes
+        common_attrs = set(self.event_attrs).intersection(set(evt.event_attrs))
+        for attr in common_attrs:
+            if not self.event_attrs[attr].match(evt.event_attrs[attr]):
+                return False
+        else:
+            return True
+
+    def resolve_target(self):
+        """
+        converts artificial target_name attribute to target_id.
+        returns False if the target isn't in db yet
+        """
         if 'target_name' in self.event_attrs and 'target_id' not in self.event_attrs:
             try:
                 target_id = self._tool.process_id(self.event_attrs['target_type'].value,
@@ -240,13 +259,45 @@ class Event(object):
             except ValueError:
                 # vm or host name isn't added to db yet. need to wait
                 return False
+        return True
 
-        common_attrs = set(self.event_attrs).intersection(set(evt.event_attrs))
-        for attr in common_attrs:
-            if not self.event_attrs[attr].match(evt.event_attrs[attr]):
-                return False
-        else:
-            return True
+    @property
+    def column_names(self):
+        """
+        names of event_streams columns compared by this event
+        """
+        return {name for name in self.event_attrs if name in self._default_attrs}
+
+    def sql_filter(self):
+        """
+        builds sql condition which db events have to satisfy to match this event.
+        attributes with cmp_func are left to :py:meth:`matches`.
+        returns None if no db event can match this event yet
+        """
+        if not self.resolve_target():
+            return None
+        conditions = []
+        for attr in self.event_attrs.values():
+            if attr.name not in self._default_attrs or attr.cmp_func:
+                continue
+            column = getattr(self._tool.event_streams, attr.name)
+            if attr.value is None:
+                conditions.append(column.is_(None))
+            elif not attr.value:
+                # see EventAttr.match, empty values don't match anything but None
+                return None
+            else:
+                conditions.append(column == attr.value)
+        return and_(true(), *conditions)
+
+    def index_key(self, name):
+        """
+        value of attribute used as key in expected event index, None matches any value
+        """
+        attr = self.event_attrs.get(name)
+        if attr is None or attr.cmp_func or not attr.value:
+            return None
+        return attr.value
 
     def add_attrs(self, *attrs):
         """
@@ -269,13 +320,14 @@ class Event(object):
             raise ValueError("incorrect parameters are passed {}".format(attrs))
         return self
 
-    def build_from_raw_event(self, evt):
+    def build_from_raw_event(self, evt, attrs=None):
         """
-        helper method which takes raw event from event_streams and prepares event object
+        helper method which takes raw event from event_streams and prepares event object.
+        attrs limits parsed attributes, it is required if evt is a row of some columns only
         """
         # checking is this param - raw event, populating fields by this data then
-        if self._is_raw_event(evt):
-            self._parse_raw_event(evt)
+        if attrs is not None or self._is_raw_event(evt):
+            self._parse_raw_event(evt, attrs)
         return self
 
 
@@ -283,7 +335,15 @@ class DbEventListener(Thread):
     """
      accepts "expected" events, listens to db events and compares showed up events with expected
      events. Runs callback function if expected events have it.
+
+     Only new events which can match one of expected events are fetched from db, the db is polled
+     less often while no such events show up.
     """
+    # attributes of expected events index, see :py:meth:`_index_expected_events`
+    INDEX_ATTRS = ('event_type', 'target_type', 'target_id')
+    MIN_POLL_INTERVAL = 0.2
+    MAX_POLL_INTERVAL = 3.2
+
     def __init__(self, appliance):
         super(DbEventListener, self).__init__()
         self._appliance = appliance
@@ -293,19 +353,16 @@ class DbEventListener(Thread):
         # last_id is used to ignore already arrived messages the database
         # When database is "cleared" the id of the last event is placed here. That is then used
         # in queries to prevent events of this id and earlier to get in.
-        self._last_processed_id = None
+        self._last_processed_id = 0
         self._stop_event = ThreadEvent()
 
     def set_last_record(self, evt=None):
         if evt:
             self._last_processed_id = evt.event_attrs['id'].value
         else:
-            try:
-                self._last_processed_id = self._tool.query(
-                    func.max(self._tool.event_streams.id)).one()
-            except IndexError:
-                # No events yet, so do nothing
-                pass
+            # No events yet, so start from the beginning
+            self._last_processed_id = self._tool.query(
+                func.max(self._tool.event_streams.id)).scalar() or 0
 
     def new_event(self, *attrs, **kwattrs):
         """
@@ -385,15 +442,20 @@ class DbEventListener(Thread):
         processes all new db events and compares them with expected events.
         processed events are ignored next time
         """
+        poll_interval = self.MIN_POLL_INTERVAL
         while not self._stop_event.is_set():
             events = self.get_next_portion()
             if len(events) == 0:
-                sleep(0.2)
+                self._stop_event.wait(poll_interval)
+                poll_interval = min(poll_interval * 2, self.MAX_POLL_INTERVAL)
                 continue
-            for got_event in events:
-                logger.debug("processing event id {}".format(got_event.id))
-                got_event = Event(event_tool=self._tool).build_from_raw_event(got_event)
-                for exp_event in self._events_to_listen:
+            poll_interval = self.MIN_POLL_INTERVAL
+            index = self._index_expected_events()
+            for raw_event in events:
+                logger.debug("processing event id {}".format(raw_event.id))
+                got_event = Event(event_tool=self._tool).build_from_raw_event(
+                    raw_event, attrs=raw_event._fields)
+                for exp_event in self._candidate_events(index, got_event):
                     if exp_event['first_event'] and len(exp_event['matched_events']) > 0:
                         continue
 
@@ -401,11 +463,35 @@ class DbEventListener(Thread):
                         if exp_event['callback']:
                             exp_event['callback'](exp_event=exp_event['event'], got_event=got_event)
                         exp_event['matched_events'].append(got_event)
-                self.set_last_record(got_event)
 
                 if self._stop_event.is_set():
                     break
 
+    def _pending_events(self):
+        # expected events which can still match
+        return [evt for evt in self._events_to_listen
+                if not (evt['first_event'] and evt['matched_events'])]
+
+    def _index_expected_events(self):
+        # maps values of INDEX_ATTRS to expected events, None stands for any value
+        index = defaultdict(list)
+        for evt in self._pending_events():
+            evt['event'].resolve_target()
+            key = tuple(evt['event'].index_key(name) for name in self.INDEX_ATTRS)
+            index[key].append(evt)
+        return index
+
+    def _candidate_events(self, index, got_event):
+        # expected events from the index whose key values equal the event's or are wildcards,
+        # in the order they were added to the listener
+        values = [got_event.index_key(name) for name in self.INDEX_ATTRS]
+        candidates = []
+        for key in product(*[(value, None) if value is not None else (None,)
+                             for value in values]):
+            candidates.extend(index.get(key, []))
+        order = {id(evt): i for i, evt in enumerate(self._events_to_listen)}
+        return sorted(candidates, key=lambda evt: order[id(evt)])
+
     @property
     def got_events(self):
         """
@@ -423,10 +509,34 @@ class DbEventListener(Thread):
         self._events_to_listen = []
 
     def get_next_portion(self):
+        """
+        returns new db events which can match one of expected events as rows of the compared
+        columns only. all new events are marked as processed
+        """
         logger.debug("obtaining next portion of events")
-        return self._tool.query(self._tool.event_streams)\
-            .filter(self._tool.event_streams.id > self._last_processed_id)\
-            .order_by(self._tool.event_streams.id).yield_per(100).all()
+        event_streams = self._tool.event_streams
+        max_id = self._tool.query(func.max(event_streams.id)).scalar()
+        if max_id is None or max_id <= self._last_processed_id:
+            return []
+
+        conditions = []
+        column_names = {'id'}
+        for evt in self._pending_events():
+            condition = evt['event'].sql_filter()
+            if condition is not None:
+                conditions.append(condition)
+                column_names.update(evt['event'].column_names)
+
+        events = []
+        if conditions:
+            columns = [getattr(event_streams, name) for name in sorted(column_names)]
+            events = self._tool.query(*columns)\
+                .filter(event_streams.id > self._last_processed_id,
+                        event_streams.id <= max_id,
+                        or_(*conditions))\
+                .order_by(event_streams.id).yield_per(100).all()
+        self._last_processed_id = max_id
+        return events
 
     def check_expected_events(self):
         return all([len(event['matched_events']) for event in self.got_events])
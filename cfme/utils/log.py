@@ -134,7 +134,12 @@ import inspect
 import logging
 import os
 import sys
+import threading
 import warnings
+from queue import Empty
+from queue import Full
+from queue import Queue
+from time import sleep
 from time import time
 from traceback import extract_tb
 from traceback import format_tb
@@ -451,21 +456,110 @@ def nth_frame_info(n):
 
 
 class ArtifactorHandler(logging.Handler):
-    """Logger handler that hands messages off to the artifactor"""
+    """Logger handler that hands messages off to the artifactor
+
+    Records are put into a bounded queue and a background thread sends them to the artifactor
+    as one ``log_messages`` hook every ``FLUSH_INTERVAL`` seconds, so logging never waits for the
+    artifactor. Records which do not fit into the queue are dropped and the number of the dropped
+    records, as well as of the records which failed to be sent, is logged to the artifactor with
+    the next batch.
+    """
 
     slaveid = artifactor = None
 
+    QUEUE_SIZE = 10000
+    FLUSH_INTERVAL = 0.5
+
+    def __init__(self, level=logging.NOTSET):
+        super(ArtifactorHandler, self).__init__(level)
+        self._queue = Queue(self.QUEUE_SIZE)
+        self._dropped = 0
+        self._failed = 0
+        self._flush_lock = threading.Lock()
+        self._sender = None
+        self._sender_lock = threading.Lock()
+
     def createLock(self):  # NOQA: false positive, base class override
-        # opt out of locking since artifactor hook calling is threadsave
+        # opt out of locking since queueing the records is threadsafe
         self.lock = None
 
+    def prepare(self, record):
+        """Returns the record as a dict which can be sent to the artifactor
+
+        The message is merged with its arguments and the exception is formatted, since neither
+        the arguments nor the traceback can be transported."""
+        log_record = dict(record.__dict__, msg=record.getMessage(), args=None, exc_info=None)
+        if record.exc_info and not record.exc_text:
+            log_record['exc_text'] = _exception_formatter.formatException(record.exc_info)
+        return log_record
+
     def emit(self, record):
         if self.artifactor:
-            self.artifactor.fire_hook(
-                'log_message',
-                log_record=record.__dict__,
-                slaveid=self.slaveid,
-            )
+            try:
+                self._queue.put_nowait(self.prepare(record))
+            except Full:
+                self._dropped += 1
+            except Exception:
+                self.handleError(record)
+            self._ensure_sender()
+
+    def flush(self):
+        """Sends all the queued records to the artifactor"""
+        with self._flush_lock:
+            log_records = []
+            while True:
+                try:
+                    log_records.append(self._queue.get_nowait())
+                except Empty:
+                    break
+            lost = len(log_records)
+            dropped, self._dropped = self._dropped, 0
+            if dropped:
+                log_records.append(self._warning_record(
+                    '{} log records were dropped, the artifactor queue was full'.format(dropped)))
+            failed, self._failed = self._failed, 0
+            if failed:
+                log_records.append(self._warning_record(
+                    '{} log records were lost, sending them to the artifactor failed'.format(
+                        failed)))
+            if log_records and self.artifactor:
+                try:
+                    self.artifactor.fire_hook(
+                        'log_messages',
+                        log_records=log_records,
+                        slaveid=self.slaveid,
+                    )
+                except Exception:
+                    # reported with the next batch, logging it would just queue another record
+                    self._dropped += dropped
+                    self._failed += failed + lost
+
+    @staticmethod
+    def _warning_record(msg):
+        return logging.makeLogRecord({
+            'name': 'cfme',
+            'levelno': logging.WARNING,
+            'levelname': logging.getLevelName(logging.WARNING),
+            'msg': msg,
+        }).__dict__
+
+    def _ensure_sender(self):
+        if self._sender is not None:
+            return
+        with self._sender_lock:
+            if self._sender is None:
+                self._sender = threading.Thread(
+                    target=self._send_queued, name="artifactor_log_sender")
+                self._sender.daemon = True
+                self._sender.start()
+
+    def _send_queued(self):
+        while True:
+            sleep(self.FLUSH_INTERVAL)
+            self.flush()
+
+
+_exception_formatter = logging.Formatter()
 
 
 logger, cfme_file_handler = setup_logger(logging.getLogger('cfme'))
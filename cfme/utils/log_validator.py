@@ -18,6 +18,24 @@ class FailPatternMatchError(Exception):
         return repr("Pattern '{p}': {m}".format(p=self.pattern, m=self.message))
 
 
+# unescaped numbered reference to a group, the groups are renumbered when patterns are combined
+_group_reference = re.compile(r'(?<!\\)(?:\\\\)*(?:\\[1-9]|\(\?\(\d)')
+
+
+def _any_pattern(patterns):
+    """Compiles the patterns into one regex which matches where any of them matches
+
+    Returns None if the patterns can't be combined, e.g. they use the same group names or refer
+    to groups by number.
+    """
+    if any(_group_reference.search(pattern) for pattern in patterns):
+        return None
+    try:
+        return re.compile('|'.join('(?:{})'.format(pattern) for pattern in patterns))
+    except re.error:
+        return None
+
+
 class LogValidator(object):
     """
     Log content validator class provides methods
@@ -37,6 +55,9 @@ class LogValidator(object):
 
     Note: If failures pattern matched in log; It will raise `FailPatternMatchError`
 
+    Only the lines added since the last check are read. They are first searched with one regex
+    combining all the patterns, the patterns are checked one by one on the matching lines only.
+
     Args:
         remote_filename: path to the remote log file
         skip_patterns: array of skip regex patterns
@@ -60,6 +81,9 @@ class LogValidator(object):
 
         self._remote_file_tail = SSHTail(remote_filename, **kwargs)
         self._matches = {key: 0 for key in self.matched_patterns}
+        self._compiled = {pattern: re.compile(pattern) for pattern in
+                          self.skip_patterns + self.failure_patterns + self.matched_patterns}
+        self._any_pattern = _any_pattern(self._compiled)
 
     def start_monitoring(self):
         """Start monitoring log before action"""
@@ -68,7 +92,7 @@ class LogValidator(object):
 
     def _check_skip_logs(self, line):
         for pattern in self.skip_patterns:
-            if re.search(pattern, line):
+            if self._compiled[pattern].search(line):
                 logger.info(
                     "Skip pattern %s was matched on line %s so skipping this line", pattern, line
                 )
@@ -77,13 +101,13 @@ class LogValidator(object):
 
     def _check_fail_logs(self, line):
         for pattern in self.failure_patterns:
-            if re.search(pattern, line):
+            if self._compiled[pattern].search(line):
                 logger.error("Failure pattern %s was matched on line %s", pattern, line)
                 raise FailPatternMatchError(pattern, "Expected failure pattern found in log.", line)
 
     def _check_match_logs(self, line):
         for pattern in self.matched_patterns:
-            if re.search(pattern, line):
+            if self._compiled[pattern].search(line):
                 logger.info("Expected pattern %s was matched on line %s", pattern, line)
                 self._matches[pattern] = self._matches[pattern] + 1
 
@@ -103,6 +127,8 @@ class LogValidator(object):
         """
 
         for line in self._remote_file_tail:
+            if self._any_pattern is not None and not self._any_pattern.search(line):
+                continue
             if self._check_skip_logs(line):
                 continue
             self._check_fail_logs(line)
@@ -3,11 +3,15 @@
 appliance.
 """
 import csv
+import mmap
 import os
 import re
 import subprocess
+from array import array
+from contextlib import closing
 from datetime import datetime
 from datetime import timedelta
+from multiprocessing import Pool
 from time import time
 
 import dateutil.parser as du_parser
@@ -35,6 +39,18 @@ miqmsg_args = re.compile(
 miqmsg_deq = re.compile(r'Dequeued\sin:\s\[([0-9\.]*)\]\sseconds')
 # Delivered in [ * ] seconds
 miqmsg_del = re.compile(r'Delivered\sin\s\[([0-9\.]*)\]\sseconds')
+# Byte patterns locating the interesting lines in raw chunks of the log, they start with a literal
+# so the regex engine can skip over everything else quickly
+miqmsg_marker = re.compile(br'MIQ\(')
+miqqueue_method = re.compile(br'MIQ\(MiqQueue\.(?:put|get_via_drb|delivered)\)')
+# Timestamp, pid, MiqQueue method and message id of a queue line in a single match
+miqqueue_msg = re.compile(
+    r'\[----\]\s[IWE],\s\[([0-9\-]+)T([0-9\:\.]+)\s#([0-9]+):[0-9a-z]+\].*'
+    r'MIQ\(MiqQueue\.(put|get_via_drb|delivered)\).*?Message\sid:\s\[([0-9]+)\]')
+
+# Size of the evm.log and top_output.log chunks parsed by each worker process
+EVM_CHUNK_SIZE = 64 * 1024 * 1024
+TOP_CHUNK_SIZE = 16 * 1024 * 1024
 
 # Worker related regular expressions:
 # MIQ(PriorityWorker) ID [15], PID [6461]
@@ -60,7 +76,33 @@ miq_top = re.compile(r'([0-9]+)\s+[0-9]+\s+[A-Za-z0-9]+\s+[0-9]+\s+[0-9\-]+\s+([
     r'([0-9\.mg]+)\s+([0-9\.mg]+)\s+[SRDZ]\s+([0-9\.]+)\s+([0-9\.]+)')
 
 
-def evm_to_messages(evm_file, filters):
+def evm_to_messages(evm_file, filters, processes=None, chunk_size=EVM_CHUNK_SIZE, pool=None):
+    """Parse the MiqQueue messages out of an evm.log file
+
+    The file is split into chunks on line boundaries, which are scanned for queue lines in a
+    pool of worker processes. The queue events of each chunk are then joined into messages in
+    file order, applying ``filters`` to each message as it is put on the queue.
+
+    Args:
+        evm_file: Path to the evm.log file
+        filters: dict mapping a suffix to a compiled regex; the suffix of the first regex that
+            matches the message args is appended to the message command
+        processes: Number of worker processes, defaults to the number of CPUs
+        chunk_size: Approximate size of the chunks in bytes
+        pool: Process pool to parse the chunks in instead of a new one
+    """
+    chunks = list(_file_chunks(evm_file, chunk_size))
+    return evm_chunks_to_messages(
+        _parallel_chunk_results(_parse_evm_chunk, chunks, processes, pool), filters)
+
+
+def evm_chunks_to_messages(chunk_results, filters):
+    """Joins the queue events of the parsed evm.log chunks into messages
+
+    Args:
+        chunk_results: Results of :py:func:`_parse_evm_chunk` in file order
+        filters: See :py:func:`evm_to_messages`
+    """
     test_start = ''
     test_end = ''
     line_count = 0
@@ -68,107 +110,166 @@ def evm_to_messages(evm_file, filters):
     msg_cmds = {}
 
     runningtime = time()
-    evmlogfile = open(evm_file, 'r')
-    evm_log_line = evmlogfile.readline()
-    while evm_log_line:
-        line_count += 1
-        evm_log_line = evm_log_line.strip()
-
-        miqmsg_result = miqmsg.search(evm_log_line)
-        if miqmsg_result:
-
+    for first_ts, events, chunk_lines in chunk_results:
+        if test_start == '' and first_ts:
             # Obtains the first timestamp in the log file
-            if test_start == '':
-                ts, pid = get_msg_timestamp_pid(evm_log_line)
-                test_start = ts
+            test_start = first_ts
+
+        for event in events:
+            kind, msg_id = event[0], event[1]
+            if kind == 'error':
+                logger.error('Could not obtain message id, line #: %s', line_count + msg_id)
 
             # A message was first put on the queue, this starts its queuing time
-            if (miqmsg_result.group(1) == 'MiqQueue.put'):
-
-                msg_cmd = get_msg_cmd(evm_log_line)
-                msg_id = get_msg_id(evm_log_line)
-                if msg_id:
-                    ts, pid = get_msg_timestamp_pid(evm_log_line)
-                    test_end = ts
-                    messages[msg_id] = MiqMsgStat()
-                    messages[msg_id].msg_id = msg_id
-                    messages[msg_id].msg_id = '\'' + msg_id + '\''
-                    messages[msg_id].msg_cmd = msg_cmd
-                    messages[msg_id].pid_put = pid
-                    messages[msg_id].puttime = ts
-                    msg_args = get_msg_args(evm_log_line)
-                    if msg_args is False:
-                        logger.debug('Could not obtain message args line #: %s', line_count)
-                    else:
-                        messages[msg_id].msg_args = msg_args
-                else:
-                    logger.error('Could not obtain message id, line #: %s', line_count)
-
-            elif (miqmsg_result.group(1) == 'MiqQueue.get_via_drb'):
-                msg_id = get_msg_id(evm_log_line)
-                if msg_id:
-                    if msg_id in messages:
-                        ts, pid = get_msg_timestamp_pid(evm_log_line)
-                        test_end = ts
-                        messages[msg_id].pid_get = pid
-                        messages[msg_id].gettime = ts
-                        messages[msg_id].deq_time = get_msg_deq(evm_log_line)
-                    else:
-                        logger.error('Message ID not in dictionary: %s', msg_id)
+            elif kind == 'put':
+                ts, pid, msg_cmd, msg_args = event[2:]
+                test_end = ts
+                msg = messages[msg_id] = MiqMsgStat()
+                msg.msg_id = '\'' + msg_id + '\''
+                msg.pid_put = pid
+                msg.puttime = ts
+                if msg_args is False:
+                    logger.debug('Could not obtain message args, message id: %s', msg_id)
                 else:
-                    logger.error('Could not obtain message id, line #: %s', line_count)
-
-            elif (miqmsg_result.group(1) == 'MiqQueue.delivered'):
-                msg_id = get_msg_id(evm_log_line)
-                if msg_id:
-                    ts, pid = get_msg_timestamp_pid(evm_log_line)
-                    test_end = ts
-                    if msg_id in messages:
-                        messages[msg_id].del_time = get_msg_del(evm_log_line)
-                        messages[msg_id].total_time = messages[msg_id].deq_time + \
-                            messages[msg_id].del_time
-                    else:
-                        logger.error('Message ID not in dictionary: %s', msg_id)
-                else:
-                    logger.error('Could not obtain message id, line #: %s', line_count)
-
-        if (line_count % 100000) == 0:
-            timediff = time() - runningtime
-            runningtime = time()
-            logger.info('Count {} : Parsed 100000 lines in %s', line_count, timediff)
-
-        evm_log_line = evmlogfile.readline()
-
-    # I tried to avoid two loops but this reduced the complexity of filtering on messages.
-    # By filtering over messages, we can better display what is occuring under the covers, as a
-    # daily rollup is picked up off the queue different than a hourly rollup, etc
-    for msg in sorted(messages.keys()):
-        msg_args = messages[msg].msg_args
-        # Determine if the pattern matches and append to the command if it does
-        for p_filter in filters:
-            results = filters[p_filter].search(msg_args.strip())
-            if results:
-                messages[msg].msg_cmd = '{}{}'.format(messages[msg].msg_cmd, p_filter)
-                break
-        msg_cmd = messages[msg].msg_cmd
-        if msg_cmd not in msg_cmds:
-            msg_cmds[msg_cmd] = {}
-            msg_cmds[msg_cmd]['total'] = []
-            msg_cmds[msg_cmd]['queue'] = []
-            msg_cmds[msg_cmd]['execute'] = []
-        if messages[msg].total_time != 0:
-            msg_cmds[msg_cmd]['total'].append(round(messages[msg].total_time, 2))
-            msg_cmds[msg_cmd]['queue'].append(round(messages[msg].deq_time, 2))
-            msg_cmds[msg_cmd]['execute'].append(round(messages[msg].del_time, 2))
+                    msg.msg_args = msg_args
+                # Determine if the pattern matches and append to the command if it does
+                # By filtering over messages, we can better display what is occuring under the
+                # covers, as a daily rollup is picked up off the queue different than a hourly
+                # rollup, etc
+                for p_filter in filters:
+                    if filters[p_filter].search(msg.msg_args.strip()):
+                        msg_cmd = '{}{}'.format(msg_cmd, p_filter)
+                        break
+                msg.msg_cmd = msg_cmd
+                msg_cmds.setdefault(msg_cmd, {'total': [], 'queue': [], 'execute': []})
+
+            elif msg_id not in messages:
+                if kind == 'delivered':
+                    test_end = event[2]
+                logger.error('Message ID not in dictionary: %s', msg_id)
+
+            elif kind == 'get_via_drb':
+                ts, pid, deq_time = event[2:]
+                test_end = ts
+                msg = messages[msg_id]
+                msg.pid_get = pid
+                msg.gettime = ts
+                msg.deq_time = deq_time
+
+            elif kind == 'delivered':
+                ts, del_time = event[2:]
+                test_end = ts
+                msg = messages[msg_id]
+                msg.del_time = del_time
+                msg.total_time = msg.deq_time + msg.del_time
+                if msg.total_time != 0:
+                    msg_cmd = msg_cmds[msg.msg_cmd]
+                    msg_cmd['total'].append(round(msg.total_time, 2))
+                    msg_cmd['queue'].append(round(msg.deq_time, 2))
+                    msg_cmd['execute'].append(round(msg.del_time, 2))
+
+        line_count += chunk_lines
+        timediff = time() - runningtime
+        runningtime = time()
+        logger.info('Count %s : Parsed %s lines in %s', line_count, chunk_lines, timediff)
 
     return messages, msg_cmds, test_start, test_end, line_count
 
 
+def _file_chunks(file_name, chunk_size, boundary=b'\n'):
+    # Splits the file into (file_name, start, end) byte ranges, each range ends right after the
+    # newline of the first boundary found past chunk_size bytes
+    size = os.path.getsize(file_name)
+    if not size:
+        return
+    with open(file_name, 'rb') as f:
+        with closing(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)) as mm:
+            start = 0
+            while start < size:
+                end = mm.find(boundary, min(start + chunk_size, size - 1))
+                end = size if end == -1 else end + 1
+                yield file_name, start, end
+                start = end
+
+
+def _read_chunk(file_name, start, end):
+    with open(file_name, 'rb') as f:
+        with closing(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)) as mm:
+            return mm[start:end]
+
+
+def _parallel_chunk_results(parse_chunk, chunks, processes, pool=None):
+    # Yields the results of parse_chunk in file order, only a few chunks are held at once
+    if pool is not None:
+        for result in pool.imap(parse_chunk, chunks):
+            yield result
+        return
+    if len(chunks) <= 1 or processes == 1:
+        for chunk in chunks:
+            yield parse_chunk(chunk)
+        return
+    with Pool(processes) as pool:
+        for result in pool.imap(parse_chunk, chunks):
+            yield result
+
+
+def _parse_evm_chunk(chunk):
+    """Extracts the MiqQueue events from a byte range of an evm.log file
+
+    The raw chunk is scanned for the queue methods only, and just the matching lines are decoded
+    and matched against the per field regular expressions.
+
+    Returns:
+        Tuple of the first MIQ timestamp in the chunk, a list of queue events and the number of
+        lines in the chunk. Events are tuples starting with the kind and the message id, an
+        ``error`` event carries the line number within the chunk instead of the message id.
+    """
+    data = _read_chunk(*chunk)
+
+    first_ts = ''
+    for miq_result in miqmsg_marker.finditer(data):
+        miqmsg_result = miqmsg.search(_line_at(data, miq_result.start()))
+        if miqmsg_result:
+            first_ts, _ = get_msg_timestamp_pid(miqmsg_result.group(0))
+            break
+
+    events = []
+    for method_result in miqqueue_method.finditer(data):
+        evm_log_line = _line_at(data, method_result.start())
+        queue_result = miqqueue_msg.search(evm_log_line)
+        if not queue_result:
+            events.append(('error', data.count(b'\n', 0, method_result.start()) + 1))
+            continue
+        date, clock, pid, kind, msg_id = queue_result.groups()
+        ts = '{} {}'.format(date, clock)
+        if kind == 'put':
+            events.append((kind, msg_id, ts, pid, get_msg_cmd(evm_log_line),
+                           get_msg_args(evm_log_line)))
+        elif kind == 'get_via_drb':
+            events.append((kind, msg_id, ts, pid, get_msg_deq(evm_log_line)))
+        else:
+            events.append((kind, msg_id, ts, get_msg_del(evm_log_line)))
+
+    line_count = data.count(b'\n')
+    if data and not data.endswith(b'\n'):
+        line_count += 1
+    return first_ts, events, line_count
+
+
+def _line_at(data, pos):
+    # Decoded, stripped line of the bytes data containing the position pos
+    line_start = data.rfind(b'\n', 0, pos) + 1
+    line_end = data.find(b'\n', pos)
+    if line_end == -1:
+        line_end = len(data)
+    return data[line_start:line_end].decode('utf-8', 'replace').strip()
+
+
 def evm_to_workers(evm_file):
     # Use grep to reduce # of lines to sort through
     p = subprocess.Popen(['grep', 'Interrupt\\|MIQ([A-Za-z]*) ID\\|"evm_worker_uptime_exceeded\\|'
             '"evm_worker_memory_exceeded\\|"evm_worker_stop\\|Worker exiting.', evm_file],
-            stdout=subprocess.PIPE)
+            stdout=subprocess.PIPE, universal_newlines=True)
     greppedevmlog, err = p.communicate()
     greppedevmlog = greppedevmlog.strip()
 
@@ -484,75 +585,109 @@ def line_chart_render(title, xtitle, ytitle, x_labels, lines, fname, stacked=Fal
     line_chart.render_to_file(str(fname))
 
 
-def messages_to_hourly_buckets(messages, test_start, test_end):
+def messages_to_columns(messages):
+    """Groups the message timings by command into :py:class:`MiqMsgColumns`
+
+    Returns:
+        Tuple of a dict mapping each command to its columns, and the list of ``(date, hour)``
+        keys that the hour indexes in the columns refer to.
+    """
+    columns = {}
+    # index of each 'YYYY-MM-DD HH' timestamp prefix
+    hour_index = {}
+
+    for msg in messages.values():
+        cmd_columns = columns.get(msg.msg_cmd)
+        if cmd_columns is None:
+            cmd_columns = columns[msg.msg_cmd] = MiqMsgColumns(msg.msg_cmd)
+        put_hour = msg.puttime[:13]
+        if put_hour not in hour_index:
+            hour_index[put_hour] = len(hour_index)
+        get_hour = msg.gettime[:13]
+        if get_hour not in hour_index:
+            hour_index[get_hour] = len(hour_index)
+        cmd_columns.put_hours.append(hour_index[put_hour])
+        cmd_columns.get_hours.append(hour_index[get_hour])
+        cmd_columns.deq_times.append(msg.deq_time)
+        cmd_columns.del_times.append(msg.del_time)
+        cmd_columns.total_times.append(msg.total_time)
+
+    hours = [(hour[:10], hour[11:13]) for hour in sorted(hour_index, key=hour_index.get)]
+    return columns, hours
+
+
+def _hourly_aggregates(hour_indexes, values, hour_count):
+    # Count, sum, min and max of the values in each hour; the minimum ignores zero timings and
+    # stays zero for hours without any nonzero timing
+    # Import here to allow perf to install numpy separately
+    import numpy
+
+    counts = numpy.bincount(hour_indexes, minlength=hour_count)
+    sums = numpy.bincount(hour_indexes, weights=values, minlength=hour_count)
+    maxs = numpy.zeros(hour_count)
+    numpy.maximum.at(maxs, hour_indexes, values)
+    mins = numpy.full(hour_count, numpy.inf)
+    nonzero = values != 0
+    numpy.minimum.at(mins, hour_indexes[nonzero], values[nonzero])
+    mins[numpy.isinf(mins)] = 0.0
+    return counts, sums, mins, maxs
+
+
+def messages_to_hourly_buckets(messages, test_start, test_end, msg_columns=None):
+    """Aggregates the message timings into :py:class:`MiqMsgBucket` per command, date and hour
+
+    Args:
+        msg_columns: The ``(columns, hours)`` tuple returned by :py:func:`messages_to_columns`,
+            computed from ``messages`` if not supplied
+    """
+    # Import here to allow perf to install numpy separately
+    import numpy
+
     hr_bkt = {}
+    columns, hours = msg_columns or messages_to_columns(messages)
     # Hour buckets look like: hr_bkt[msg_cmd][msg_date][msg_hour] = MiqMsgBucket()
-    for msg in messages:
+    for msg_cmd, cmd_columns in columns.items():
+        hr_bkt[msg_cmd] = provision_hour_buckets(test_start, test_end)
+        deq_times = numpy.array(cmd_columns.deq_times)
+        del_times = numpy.array(cmd_columns.del_times)
+
         # put on queue, deals with queuing:
-        msg_cmd = messages[msg].msg_cmd
-        putdate = messages[msg].puttime[:10]
-        puthour = messages[msg].puttime[11:13]
-        if msg_cmd not in hr_bkt:
-            hr_bkt[msg_cmd] = provision_hour_buckets(test_start, test_end)
-
-        hr_bkt[msg_cmd][putdate][puthour].total_put += 1
-        hr_bkt[msg_cmd][putdate][puthour].sum_deq += messages[msg].deq_time
-        if (hr_bkt[msg_cmd][putdate][puthour].min_deq == 0 or
-                hr_bkt[msg_cmd][putdate][puthour].min_deq > messages[msg].deq_time):
-            hr_bkt[msg_cmd][putdate][puthour].min_deq = messages[msg].deq_time
-        if (hr_bkt[msg_cmd][putdate][puthour].max_deq == 0 or
-                hr_bkt[msg_cmd][putdate][puthour].max_deq < messages[msg].deq_time):
-            hr_bkt[msg_cmd][putdate][puthour].max_deq = messages[msg].deq_time
-        hr_bkt[msg_cmd][putdate][puthour].avg_deq = \
-            hr_bkt[msg_cmd][putdate][puthour].sum_deq / hr_bkt[msg_cmd][putdate][puthour].total_put
+        counts, sums, mins, maxs = _hourly_aggregates(
+            numpy.array(cmd_columns.put_hours), deq_times, len(hours))
+        for hour in numpy.flatnonzero(counts):
+            putdate, puthour = hours[hour]
+            bucket = hr_bkt[msg_cmd][putdate][puthour]
+            bucket.total_put = int(counts[hour])
+            bucket.sum_deq = float(sums[hour])
+            bucket.min_deq = float(mins[hour])
+            bucket.max_deq = float(maxs[hour])
+            bucket.avg_deq = bucket.sum_deq / bucket.total_put
 
         # Get time is when the message is delivered
-        getdate = messages[msg].gettime[:10]
-        gethour = messages[msg].gettime[11:13]
-
-        hr_bkt[msg_cmd][getdate][gethour].total_get += 1
-        hr_bkt[msg_cmd][getdate][gethour].sum_del += messages[msg].del_time
-        if (hr_bkt[msg_cmd][getdate][gethour].min_del == 0 or
-                hr_bkt[msg_cmd][getdate][gethour].min_del > messages[msg].del_time):
-            hr_bkt[msg_cmd][getdate][gethour].min_del = messages[msg].del_time
-        if (hr_bkt[msg_cmd][getdate][gethour].max_del == 0 or
-                hr_bkt[msg_cmd][getdate][gethour].max_del < messages[msg].del_time):
-            hr_bkt[msg_cmd][getdate][gethour].max_del = messages[msg].del_time
-
-        hr_bkt[msg_cmd][getdate][gethour].avg_del = \
-            hr_bkt[msg_cmd][getdate][gethour].sum_del / hr_bkt[msg_cmd][getdate][gethour].total_get
+        counts, sums, mins, maxs = _hourly_aggregates(
+            numpy.array(cmd_columns.get_hours), del_times, len(hours))
+        for hour in numpy.flatnonzero(counts):
+            getdate, gethour = hours[hour]
+            bucket = hr_bkt[msg_cmd][getdate][gethour]
+            bucket.total_get = int(counts[hour])
+            bucket.sum_del = float(sums[hour])
+            bucket.min_del = float(mins[hour])
+            bucket.max_del = float(maxs[hour])
+            bucket.avg_del = bucket.sum_del / bucket.total_get
     return hr_bkt
 
 
-def messages_to_statistics_csv(messages, statistics_file_name):
-    all_statistics = []
-    for msg_id in messages:
-        msg = messages[msg_id]
-
-        added = False
-        if len(all_statistics) > 0:
-            for msg_statistics in all_statistics:
-                if msg_statistics.cmd == msg.msg_cmd:
-
-                    if msg.del_time > 0:
-                        msg_statistics.delivertimes.append(float(msg.del_time))
-                        msg_statistics.gets += 1
-                    msg_statistics.dequeuetimes.append(float(msg.deq_time))
-                    msg_statistics.totaltimes.append(float(msg.total_time))
-                    msg_statistics.puts += 1
-                    added = True
-                    break
-
-        if not added:
-            msg_statistics = MiqMsgLists()
-            msg_statistics.cmd = msg.msg_cmd
-            if msg.del_time > 0:
-                msg_statistics.delivertimes.append(float(msg.del_time))
-                msg_statistics.gets = 1
-            msg_statistics.dequeuetimes.append(float(msg.deq_time))
-            msg_statistics.totaltimes.append(float(msg.total_time))
-            msg_statistics.puts = 1
-            all_statistics.append(msg_statistics)
+def messages_to_statistics_csv(messages, statistics_file_name, msg_columns=None):
+    """Writes the per command message timing statistics into a csv file
+
+    Args:
+        msg_columns: The ``(columns, hours)`` tuple returned by :py:func:`messages_to_columns`,
+            computed from ``messages`` if not supplied
+    """
+    # Import here to allow perf to install numpy separately
+    import numpy
+
+    columns, _ = msg_columns or messages_to_columns(messages)
 
     csvdata_path = log_path.join('csv_output', statistics_file_name)
     outputfile = csvdata_path.open('w', ensure=True)
@@ -568,22 +703,24 @@ def messages_to_statistics_csv(messages, statistics_file_name):
 
         csvfile.writerow(headers)
 
-        # Import here to allow perf to install numpy separately
-        import numpy
-
         # Contents of CSV
-        for msg_statistics in sorted(all_statistics, key=lambda x: x.cmd):
-            if msg_statistics.gets > 1:
+        for cmd in sorted(columns):
+            dequeuetimes = numpy.array(columns[cmd].deq_times)
+            delivertimes = numpy.array(columns[cmd].del_times)
+            delivertimes = delivertimes[delivertimes > 0]
+            totaltimes = numpy.array(columns[cmd].total_times)
+            puts, gets = len(dequeuetimes), len(delivertimes)
+            if gets > 1:
                 logger.debug('Samples/Avg/90th/Std: %s: %s : %s : %s,Cmd: %s',
-                    str(len(msg_statistics.totaltimes)).rjust(7),
-                    str(round(numpy.average(msg_statistics.totaltimes), 3)).rjust(7),
-                    str(round(numpy.percentile(msg_statistics.totaltimes, 90), 3)).rjust(7),
-                    str(round(numpy.std(msg_statistics.totaltimes), 3)).rjust(7),
-                    msg_statistics.cmd)
-            stats = [msg_statistics.cmd, msg_statistics.puts, msg_statistics.gets]
-            stats.extend(generate_statistics(msg_statistics.dequeuetimes, 3))
-            stats.extend(generate_statistics(msg_statistics.delivertimes, 3))
-            stats.extend(generate_statistics(msg_statistics.totaltimes, 3))
+                    str(len(totaltimes)).rjust(7),
+                    str(round(numpy.average(totaltimes), 3)).rjust(7),
+                    str(round(numpy.percentile(totaltimes, 90), 3)).rjust(7),
+                    str(round(numpy.std(totaltimes), 3)).rjust(7),
+                    cmd)
+            stats = [cmd, puts, gets]
+            stats.extend(generate_statistics(dequeuetimes, 3))
+            stats.extend(generate_statistics(delivertimes, 3))
+            stats.extend(generate_statistics(totaltimes, 3))
             csvfile.writerow(stats)
     finally:
         outputfile.close()
@@ -623,185 +760,185 @@ def provision_hour_buckets(test_start, test_end, init=True):
 
 
 def top_to_appliance(top_file):
-    # Find first miqtop log line
-    miqtop_time, timezone_offset = get_first_miqtop(top_file)
+    top_app, top_workers, line_count = top_to_appliance_and_workers(top_file, {})
+    return top_app, line_count
 
-    runningtime = time()
-    grep_pattern = r'^top\s\-\s\\|^miqtop\:\\|^Cpu(s)\:\\|^Mem\:\\|^Swap\:'
-    # Use grep to reduce # of lines to sort through
-    p = subprocess.Popen(['grep', grep_pattern, top_file], stdout=subprocess.PIPE)
-    greppedtop, err = p.communicate()
-    timediff = time() - runningtime
-    logger.info('Grepped top_output for CPU/Mem/Swap & time data in %s', timediff)
 
-    top_lines = greppedtop.strip().split('\n')
-    line_count = 0
+def top_to_workers(workers, top_file):
+    top_app, top_workers, line_count = top_to_appliance_and_workers(top_file, workers)
+    return top_workers, line_count
+
+
+def top_to_appliance_and_workers(top_file, workers, processes=None, chunk_size=TOP_CHUNK_SIZE,
+                                 pool=None, chunk_results=None):
+    """Parse the appliance and per worker CPU/memory series out of a top_output.log file
+
+    The file is split into chunks on ``top -`` snapshot boundaries, which are parsed in a pool of
+    worker processes. The dates of the snapshots are then resolved in file order, as top only
+    logs the time and the date comes from the preceding (or, at first, the following) miqtop line.
+
+    Args:
+        top_file: Path to the top_output.log file
+        workers: dict of :py:class:`MiqWorker` keyed by worker id, the processes of which are
+            collected into the worker series
+        processes: Number of worker processes, defaults to the number of CPUs
+        chunk_size: Approximate size of the chunks in bytes
+        pool: Process pool to parse the chunks in instead of a new one
+        chunk_results: Results of :py:func:`_parse_top_chunk` for :py:func:`top_chunks` of the
+            file, already submitted to a pool, in file order
+
+    Returns:
+        Tuple of the appliance series, the worker series keyed by worker id and the number of
+        parsed lines
+    """
+    workers_by_pid = {}
+    for worker in workers.values():
+        workers_by_pid.setdefault(worker.pid, []).append(worker)
+
+    if chunk_results is None:
+        chunk_results = _parallel_chunk_results(
+            _parse_top_chunk, top_chunks(top_file, workers, chunk_size), processes, pool)
+    results = list(chunk_results)
+    line_count = sum(chunk_lines for events, chunk_lines in results)
+
+    # This is very ugly because miqtop does include the date but top does not
+    # Also pids can be duplicated, so careful attention to detail on when a pid starts and ends
+    for events, chunk_lines in results:
+        first_miqtop = next((event for event in events if event[0] == 'miqtop'), None)
+        if first_miqtop:
+            break
+    else:
+        raise ValueError('No miqtop line found in {}'.format(top_file))
+    kind, miqtop_time, timezone_offset = first_miqtop
 
     top_keys = ['datetimes', 'cpuus', 'cpusy', 'cpuni', 'cpuid', 'cpuwa', 'cpuhi', 'cpusi', 'cpust',
         'memtot', 'memuse', 'memfre', 'buffer', 'swatot', 'swause', 'swafre', 'cached']
     top_app = dict((key, []) for key in top_keys)
+    top_workers = {}
 
     cur_time = None
     miqtop_ahead = True
-    runningtime = time()
-    for top_line in top_lines:
-        line_count += 1
-        if 'top - ' in top_line:
-            # top - 11:00:43
-            cur_hour = int(top_line[6:8])
-            cur_min = int(top_line[9:11])
-            cur_sec = int(top_line[12:14])
-            if miqtop_ahead:
-                # Have not found miqtop date/time yet so we must rely on miqtop date/time "ahead"
-                if cur_hour <= miqtop_time.hour:
-                    cur_time = miqtop_time.replace(hour=cur_hour, minute=cur_min, second=cur_sec) \
-                        - timedelta(hours=timezone_offset)
-                else:
-                    # miqtop_time is ahead by date
+    for events, chunk_lines in results:
+        for event in events:
+            kind = event[0]
+            if kind == 'top':
+                # top - 11:00:43
+                cur_hour, cur_min, cur_sec = event[1:]
+                if miqtop_ahead and cur_hour > miqtop_time.hour:
+                    # Have not found miqtop date/time yet so we must rely on miqtop date/time
+                    # "ahead", which is ahead by date
                     logger.info('miqtop_time is ahead by one day')
                     cur_time = miqtop_time - timedelta(days=1)
-                    cur_time = cur_time.replace(hour=cur_hour, minute=cur_min, second=cur_sec) \
-                        - timedelta(hours=timezone_offset)
-            else:
-                cur_time = miqtop_time.replace(hour=cur_hour, minute=cur_min, second=cur_sec) \
+                else:
+                    cur_time = miqtop_time
+                cur_time = cur_time.replace(hour=cur_hour, minute=cur_min, second=cur_sec) \
                     - timedelta(hours=timezone_offset)
-        elif 'miqtop: ' in top_line:
-            miqtop_ahead = False
+            elif kind == 'miqtop':
+                miqtop_ahead = False
+                kind, miqtop_time, timezone_offset = event
+            elif kind == 'cpu':
+                top_app['datetimes'].append(str(cur_time))
+                for key, value in zip(top_keys[1:9], event[1:]):
+                    top_app[key].append(value)
+            elif kind == 'mem':
+                for key, value in zip(top_keys[9:13], event[1:]):
+                    top_app[key].append(value)
+            elif kind == 'swap':
+                for key, value in zip(top_keys[13:17], event[1:]):
+                    top_app[key].append(value)
+            elif kind == 'proc':
+                top_pid, top_virt, top_res, top_share, top_cpu_per, top_mem_per = event[1:]
+                for worker in workers_by_pid[top_pid]:
+                    if cur_time > worker.start_ts and \
+                            (worker.end_ts == '' or cur_time < worker.end_ts):
+                        w_id = worker.worker_id
+                        if w_id not in top_workers:
+                            top_workers[w_id] = {}
+                            top_workers[w_id]['datetimes'] = []
+                            top_workers[w_id]['virt'] = []
+                            top_workers[w_id]['res'] = []
+                            top_workers[w_id]['share'] = []
+                            top_workers[w_id]['cpu_per'] = []
+                            top_workers[w_id]['mem_per'] = []
+                        top_workers[w_id]['datetimes'].append(str(cur_time))
+                        top_workers[w_id]['virt'].append(top_virt)
+                        top_workers[w_id]['res'].append(top_res)
+                        top_workers[w_id]['share'].append(top_share)
+                        top_workers[w_id]['cpu_per'].append(top_cpu_per)
+                        top_workers[w_id]['mem_per'].append(top_mem_per)
+                        break
+            else:
+                logger.error('Issue with %s regex: %s', kind, event[1])
+    return top_app, top_workers, line_count
+
+
+def top_chunks(top_file, workers, chunk_size=TOP_CHUNK_SIZE):
+    """Splits the top_output.log file into chunks for :py:func:`_parse_top_chunk`"""
+    pids = frozenset(worker.pid for worker in workers.values())
+    return [chunk + (pids,)
+            for chunk in _file_chunks(top_file, chunk_size, boundary=b'\ntop - ')]
+
+
+def _parse_top_chunk(chunk):
+    """Extracts the snapshot events from a byte range of a top_output.log file
+
+    Returns:
+        Tuple of the list of events in file order and the number of lines in the chunk. Events
+        are tuples starting with their kind: ``top`` (hour, minute, second), ``miqtop`` (time,
+        timezone offset), ``cpu``/``mem``/``swap`` (values) and ``proc`` (pid, virt, res, share,
+        cpu %, mem %) for the processes of the given pids.
+    """
+    top_file, start, end, pids = chunk
+    data = _read_chunk(top_file, start, end).decode('utf-8', 'replace')
+
+    events = []
+    lines = data.splitlines()
+    for top_line in lines:
+        if top_line.startswith('top - '):
+            events.append(('top', int(top_line[6:8]), int(top_line[9:11]), int(top_line[12:14])))
+        elif top_line.startswith('miqtop:'):
             # miqtop: .* is-> Mon Jan 26 08:57:39 EST 2015 -0500
             str_start = top_line.index('is->')
             miqtop_time = du_parser.parse(top_line[str_start:], fuzzy=True, ignoretz=True)
             # Time logged in top is the system's time which is ahead/behind by the timezone offset
             timezone_offset = int(top_line[str_start + 34:str_start + 37])
             miqtop_time = miqtop_time - timedelta(hours=timezone_offset)
-        elif 'Cpu(s): ' in top_line:
+            events.append(('miqtop', miqtop_time, timezone_offset))
+        elif top_line.startswith('Cpu(s):'):
             miq_cpu_result = miq_cpu.search(top_line)
             if miq_cpu_result:
-                top_app['datetimes'].append(str(cur_time))
-                top_app['cpuus'].append(float(miq_cpu_result.group(1).strip()))
-                top_app['cpusy'].append(float(miq_cpu_result.group(2).strip()))
-                top_app['cpuni'].append(float(miq_cpu_result.group(3).strip()))
-                top_app['cpuid'].append(float(miq_cpu_result.group(4).strip()))
-                top_app['cpuwa'].append(float(miq_cpu_result.group(5).strip()))
-                top_app['cpuhi'].append(float(miq_cpu_result.group(6).strip()))
-                top_app['cpusi'].append(float(miq_cpu_result.group(7).strip()))
-                top_app['cpust'].append(float(miq_cpu_result.group(8).strip()))
+                events.append(('cpu',) + tuple(
+                    float(value.strip()) for value in miq_cpu_result.groups()))
             else:
-                logger.error('Issue with miq_cpu regex: %s', top_line)
-        elif 'Mem: ' in top_line:
+                events.append(('miq_cpu', top_line))
+        elif top_line.startswith('Mem:'):
             miq_mem_result = miq_mem.search(top_line)
             if miq_mem_result:
-                top_app['memtot'].append(round(float(miq_mem_result.group(1).strip()) / 1024, 2))
-                top_app['memuse'].append(round(float(miq_mem_result.group(2).strip()) / 1024, 2))
-                top_app['memfre'].append(round(float(miq_mem_result.group(3).strip()) / 1024, 2))
-                top_app['buffer'].append(round(float(miq_mem_result.group(4).strip()) / 1024, 2))
+                events.append(('mem',) + tuple(
+                    round(float(value.strip()) / 1024, 2) for value in miq_mem_result.groups()))
             else:
-                logger.error('Issue with miq_mem regex: %s', top_line)
-        elif 'Swap: ' in top_line:
+                events.append(('miq_mem', top_line))
+        elif top_line.startswith('Swap:'):
             miq_swap_result = miq_swap.search(top_line)
             if miq_swap_result:
-                top_app['swatot'].append(round(float(miq_swap_result.group(1).strip()) / 1024, 2))
-                top_app['swause'].append(round(float(miq_swap_result.group(2).strip()) / 1024, 2))
-                top_app['swafre'].append(round(float(miq_swap_result.group(3).strip()) / 1024, 2))
-                top_app['cached'].append(round(float(miq_swap_result.group(4).strip()) / 1024, 2))
+                events.append(('swap',) + tuple(
+                    round(float(value.strip()) / 1024, 2) for value in miq_swap_result.groups()))
             else:
-                logger.error('Issue with miq_swap regex: %s', top_line)
-        else:
-            logger.error('Issue with grepping of top file:%s', top_line)
-        if (line_count % 20000) == 0:
-            timediff = time() - runningtime
-            runningtime = time()
-            logger.info('Count {} : Parsed 20000 lines in %s', line_count, timediff)
-    return top_app, len(top_lines)
-
-
-def top_to_workers(workers, top_file):
-    # Find first miqtop log line
-    miqtop_time, timezone_offset = get_first_miqtop(top_file)
-
-    runningtime = time()
-    grep_pids = ''
-    for wkr in workers:
-        grep_pids = r'{}^{}\s\\|'.format(grep_pids, workers[wkr].pid)
-    grep_pattern = r'{}^top\s\-\s\\|^miqtop\:'.format(grep_pids)
-    # Use grep to reduce # of lines to sort through
-    p = subprocess.Popen(['grep', grep_pattern, top_file], stdout=subprocess.PIPE)
-    greppedtop, err = p.communicate()
-    timediff = time() - runningtime
-    logger.info('Grepped top_output for pids & time data in %s', timediff)
-
-    # This is very ugly because miqtop does include the date but top does not
-    # Also pids can be duplicated, so careful attention to detail on when a pid starts and ends
-    top_lines = greppedtop.strip().split('\n')
-    line_count = 0
-    top_workers = {}
-    cur_time = None
-    miqtop_ahead = True
-    runningtime = time()
-    for top_line in top_lines:
-        line_count += 1
-        if 'top - ' in top_line:
-            # top - 11:00:43
-            cur_hour = int(top_line[6:8])
-            cur_min = int(top_line[9:11])
-            cur_sec = int(top_line[12:14])
-            if miqtop_ahead:
-                # Have not found miqtop time yet so we must rely on miqtop time "ahead"
-                if cur_hour <= miqtop_time.hour:
-                    cur_time = miqtop_time.replace(hour=cur_hour, minute=cur_min, second=cur_sec) \
-                        - timedelta(hours=timezone_offset)
-                else:
-                    # miqtop_time is ahead by date
-                    logger.info('miqtop_time is ahead by one day')
-                    cur_time = miqtop_time - timedelta(days=1)
-                    cur_time = cur_time.replace(hour=cur_hour, minute=cur_min, second=cur_sec) \
-                        - timedelta(hours=timezone_offset)
-            else:
-                cur_time = miqtop_time.replace(hour=cur_hour, minute=cur_min, second=cur_sec) \
-                    - timedelta(hours=timezone_offset)
-        elif 'miqtop: ' in top_line:
-            miqtop_ahead = False
-            # miqtop: .* is-> Mon Jan 26 08:57:39 EST 2015 -0500
-            str_start = top_line.index('is->')
-            miqtop_time = du_parser.parse(top_line[str_start:], fuzzy=True, ignoretz=True)
-            # Time logged in top is the system's time which is ahead/behind by the timezone offset
-            timezone_offset = int(top_line[str_start + 34:str_start + 37])
-            miqtop_time = miqtop_time - timedelta(hours=timezone_offset)
-        else:
-            top_results = miq_top.search(top_line)
+                events.append(('miq_swap', top_line))
+        elif top_line[:1].isdigit() and top_line.split(None, 1)[0] in pids:
+            top_results = miq_top.match(top_line)
             if top_results:
-                top_pid = top_results.group(1)
-                top_virt = convert_top_mem_to_mib(top_results.group(2))
-                top_res = convert_top_mem_to_mib(top_results.group(3))
-                top_share = convert_top_mem_to_mib(top_results.group(4))
-                top_cpu_per = float(top_results.group(5))
-                top_mem_per = float(top_results.group(6))
-                for worker in workers:
-                    if workers[worker].pid == top_pid:
-                        if cur_time > workers[worker].start_ts and \
-                                (workers[worker].end_ts == '' or cur_time < workers[worker].end_ts):
-                            w_id = workers[worker].worker_id
-                            if w_id not in top_workers:
-                                top_workers[w_id] = {}
-                                top_workers[w_id]['datetimes'] = []
-                                top_workers[w_id]['virt'] = []
-                                top_workers[w_id]['res'] = []
-                                top_workers[w_id]['share'] = []
-                                top_workers[w_id]['cpu_per'] = []
-                                top_workers[w_id]['mem_per'] = []
-                            top_workers[w_id]['datetimes'].append(str(cur_time))
-                            top_workers[w_id]['virt'].append(top_virt)
-                            top_workers[w_id]['res'].append(top_res)
-                            top_workers[w_id]['share'].append(top_share)
-                            top_workers[w_id]['cpu_per'].append(top_cpu_per)
-                            top_workers[w_id]['mem_per'].append(top_mem_per)
-                            break
+                events.append((
+                    'proc',
+                    top_results.group(1),
+                    convert_top_mem_to_mib(top_results.group(2)),
+                    convert_top_mem_to_mib(top_results.group(3)),
+                    convert_top_mem_to_mib(top_results.group(4)),
+                    float(top_results.group(5)),
+                    float(top_results.group(6))))
             else:
-                logger.error('Issue with miq_top regex or grepping of top file:%s', top_line)
-        if (line_count % 20000) == 0:
-            timediff = time() - runningtime
-            runningtime = time()
-            logger.info('Count %s : Parsed 20000 lines in %s', line_count, timediff)
-    return top_workers, len(top_lines)
+                events.append(('miq_top', top_line))
+    return events, len(lines)
 
 
 def perf_process_evm(evm_file, top_file):
@@ -814,46 +951,55 @@ def perf_process_evm(evm_file, top_file):
         '-EmsOpenstack': re.compile(r'\[\[\"EmsOpenstack\"\,\s[0-9]*\]\]')
     }
 
-    starttime = time()
-    initialtime = starttime
-
-    logger.info('----------- Parsing evm log file for messages -----------')
-    messages, msg_cmds, test_start, test_end, msg_lc = evm_to_messages(evm_file, msg_filters)
-    timediff = time() - starttime
-    logger.info('----------- Completed Parsing evm log file -----------')
-    logger.info('Parsed %s lines of evm log file for messages in %s', msg_lc, timediff)
-    logger.info('Total # of Messages: %d', len(messages))
-    logger.info('Total # of Commands: %d', len(msg_cmds))
-    logger.info('Start Time: %s', test_start)
-    logger.info('End Time: %s', test_end)
-
-    logger.info('----------- Parsing evm log file for workers -----------')
-    starttime = time()
-    workers, wkr_mem_exc, wkr_upt_exc, wkr_stp, wkr_int, wkr_ext, wkr_lc = evm_to_workers(evm_file)
-    timediff = time() - starttime
-    logger.info('----------- Completed Parsing evm log for workers -----------')
-    logger.info('Parsed %s lines of evm log file for workers in %s', wkr_lc, timediff)
-    logger.info('Total # of Workers: %d', len(workers))
-    logger.info('# Workers Memory Exceeded: %s', wkr_mem_exc)
-    logger.info('# Workers Uptime Exceeded: %s', wkr_upt_exc)
-    logger.info('# Workers Exited: %s', wkr_ext)
-    logger.info('# Workers Stopped: %s', wkr_stp)
-    logger.info('# Workers Interrupted: %s', wkr_int)
-
-    logger.info('----------- Parsing top_output log file for Appliance Metrics -----------')
-    starttime = time()
-    top_appliance, tp_lc = top_to_appliance(top_file)
-    timediff = time() - starttime
-    logger.info('----------- Completed Parsing top_output log -----------')
-    logger.info('Parsed %s lines of top_output file for Appliance Metrics in %s', tp_lc,
-        timediff)
-
-    logger.info('----------- Parsing top_output log file for worker CPU/Mem -----------')
-    starttime = time()
-    top_workers, tp_lc = top_to_workers(workers, top_file)
-    timediff = time() - starttime
-    logger.info('----------- Completed Parsing top_output log -----------')
-    logger.info('Parsed %s lines of top_output file for workers in %s', tp_lc, timediff)
+    initialtime = time()
+
+    # A single process pool is created here, in the main thread, rather than one per parsing
+    # thread. Other threads may still run when it forks (e.g. the artifactor senders), the chunk
+    # parsers only read the file and don't log. The evm log chunks are queued to the pool first,
+    # so they are parsed while the workers are grepped out of the evm log. The top_output chunks,
+    # which depend on the workers, are queued right after that, before the evm results are
+    # joined into messages, so the pool parses them while the main thread joins.
+    with Pool() as pool:
+        logger.info('----------- Parsing evm log file for messages -----------')
+        starttime = time()
+        message_chunks = pool.imap(_parse_evm_chunk, list(_file_chunks(evm_file, EVM_CHUNK_SIZE)))
+
+        logger.info('----------- Parsing evm log file for workers -----------')
+        workers_starttime = time()
+        workers, wkr_mem_exc, wkr_upt_exc, wkr_stp, wkr_int, wkr_ext, wkr_lc = \
+            evm_to_workers(evm_file)
+        timediff = time() - workers_starttime
+        logger.info('----------- Completed Parsing evm log for workers -----------')
+        logger.info('Parsed %s lines of evm log file for workers in %s', wkr_lc, timediff)
+        logger.info('Total # of Workers: %d', len(workers))
+        logger.info('# Workers Memory Exceeded: %s', wkr_mem_exc)
+        logger.info('# Workers Uptime Exceeded: %s', wkr_upt_exc)
+        logger.info('# Workers Exited: %s', wkr_ext)
+        logger.info('# Workers Stopped: %s', wkr_stp)
+        logger.info('# Workers Interrupted: %s', wkr_int)
+
+        logger.info('----------- Parsing top_output log file for Appliance and Worker Metrics '
+            '-----------')
+        top_starttime = time()
+        top_results = pool.imap(_parse_top_chunk, top_chunks(top_file, workers))
+
+        messages, msg_cmds, test_start, test_end, msg_lc = evm_chunks_to_messages(
+            message_chunks, msg_filters)
+        timediff = time() - starttime
+        logger.info('----------- Completed Parsing evm log file -----------')
+        logger.info('Parsed %s lines of evm log file for messages in %s', msg_lc, timediff)
+        logger.info('Total # of Messages: %d', len(messages))
+        logger.info('Total # of Commands: %d', len(msg_cmds))
+        logger.info('Start Time: %s', test_start)
+        logger.info('End Time: %s', test_end)
+
+        top_appliance, top_workers, tp_lc = top_to_appliance_and_workers(
+            top_file, workers, chunk_results=top_results)
+        timediff = time() - top_starttime
+        logger.info('----------- Completed Parsing top_output log -----------')
+        logger.info('Parsed %s lines of top_output file for Appliance and Worker Metrics in %s',
+            tp_lc, timediff)
+    logger.info('Parsed evm and top_output log files in %s', time() - initialtime)
 
     charts_dir = log_path.join('charts')
     if not os.path.exists(str(charts_dir)):
@@ -868,7 +1014,8 @@ def perf_process_evm(evm_file, top_file):
 
     logger.info('----------- Generating Hourly Buckets -----------')
     starttime = time()
-    hr_bkt = messages_to_hourly_buckets(messages, test_start, test_end)
+    msg_columns = messages_to_columns(messages)
+    hr_bkt = messages_to_hourly_buckets(messages, test_start, test_end, msg_columns)
     timediff = time() - starttime
     logger.info('Generated Hourly Buckets in: %s', timediff)
 
@@ -898,7 +1045,7 @@ def perf_process_evm(evm_file, top_file):
 
     logger.info('----------- Generating Message Statistics -----------')
     starttime = time()
-    messages_to_statistics_csv(messages, 'queue-statistics.csv')
+    messages_to_statistics_csv(messages, 'queue-statistics.csv', msg_columns)
     timediff = time() - starttime
     logger.info('Generated Message Statistics in: %s', timediff)
 
@@ -1038,10 +1185,11 @@ def perf_process_evm(evm_file, top_file):
 
 
 class MiqMsgStat(object):
+    __slots__ = ('msg_id', 'msg_cmd', 'msg_args', 'pid_put', 'pid_get', 'puttime', 'gettime',
+        'deq_time', 'del_time', 'total_time')
+    headers = list(__slots__)
 
     def __init__(self):
-        self.headers = ['msg_id', 'msg_cmd', 'msg_args', 'pid_put', 'pid_get', 'puttime', 'gettime',
-            'deq_time', 'del_time', 'total_time']
         self.msg_id = ''
         self.msg_cmd = ''
         self.msg_args = ''
@@ -1063,21 +1211,31 @@ class MiqMsgStat(object):
             str(self.del_time) + ' : ' + str(self.total_time)
 
 
-class MiqMsgLists(object):
+class MiqMsgColumns(object):
+    """Timings of all messages of one command, stored column-wise in typed arrays
 
-    def __init__(self):
-        self.cmd = ''
-        self.puts = 0
-        self.gets = 0
-        self.dequeuetimes = []
-        self.delivertimes = []
-        self.totaltimes = []
+    The put and get times are stored as indexes of their hour, see :py:func:`messages_to_columns`.
+    """
+    __slots__ = ('cmd', 'put_hours', 'get_hours', 'deq_times', 'del_times', 'total_times')
+
+    def __init__(self, cmd):
+        self.cmd = cmd
+        self.put_hours = array('l')
+        self.get_hours = array('l')
+        self.deq_times = array('d')
+        self.del_times = array('d')
+        self.total_times = array('d')
+
+    def __len__(self):
+        return len(self.deq_times)
 
 
 class MiqMsgBucket(object):
+    __slots__ = ('date', 'hour', 'total_put', 'total_get', 'sum_deq', 'min_deq', 'max_deq',
+        'avg_deq', 'sum_del', 'min_del', 'max_del', 'avg_del')
+    headers = list(__slots__)
+
     def __init__(self):
-        self.headers = ['date', 'hour', 'total_put', 'total_get', 'sum_deq', 'min_deq', 'max_deq',
-            'avg_deq', 'sum_del', 'min_del', 'max_del', 'avg_del']
         self.date = ''
         self.hour = ''
         self.total_put = 0
@@ -1103,9 +1261,10 @@ class MiqMsgBucket(object):
 
 
 class MiqWorker(object):
+    __slots__ = ('worker_id', 'worker_type', 'pid', 'start_ts', 'end_ts', 'terminated')
+    headers = list(__slots__)
 
     def __init__(self):
-        self.headers = ['worker_id', 'worker_type', 'pid', 'start_ts', 'end_ts', 'terminated']
         self.worker_id = 0
         self.worker_type = ''
         self.pid = ''
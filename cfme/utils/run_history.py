@@ -0,0 +1,183 @@
+"""Persistent history of test durations and outcomes
+
+Every finished test is stored as one row per session in a local SQLite database, holding
+the setup, call and teardown durations together with the final outcome. The query methods
+aggregate over the most recent sessions, so test ordering and reports can use real timings.
+
+Usage:
+
+.. code-block:: python
+
+    from cfme.utils.run_history import RunHistory
+
+    with RunHistory() as history:
+        durations = history.durations()
+        for stats in history.slowest(10):
+            print(stats.nodeid, stats.mean_duration)
+
+"""
+import sqlite3
+from datetime import datetime
+
+import attr
+
+from cfme.utils.path import log_path
+
+#: Default location of the history database, ``cfme_tests/log/run_history.sqlite``
+DEFAULT_HISTORY_PATH = log_path.join('run_history.sqlite')
+
+#: How many of the most recent sessions are aggregated by the queries by default
+DEFAULT_DEPTH = 5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    nodeid TEXT NOT NULL,
+    session TEXT NOT NULL,
+    finished TEXT NOT NULL,
+    setup REAL NOT NULL DEFAULT 0,
+    call REAL NOT NULL DEFAULT 0,
+    teardown REAL NOT NULL DEFAULT 0,
+    outcome TEXT NOT NULL,
+    PRIMARY KEY (nodeid, session)
+);
+CREATE INDEX IF NOT EXISTS results_by_finished ON results (nodeid, finished);
+"""
+
+# the last ``depth`` results of each test, ranked by finish time
+_RECENT = """
+SELECT * FROM (
+    SELECT *, ROW_NUMBER() OVER (PARTITION BY nodeid ORDER BY finished DESC) AS age
+    FROM results
+) WHERE age <= ?
+"""
+
+_STATS = """
+SELECT nodeid,
+       COUNT(*),
+       SUM(outcome = 'passed'),
+       SUM(outcome = 'failed'),
+       SUM(outcome = 'error'),
+       SUM(outcome = 'skipped'),
+       AVG(setup),
+       AVG(call),
+       AVG(teardown),
+       MAX(CASE WHEN age = 1 THEN outcome END)
+FROM ({recent})
+GROUP BY nodeid
+"""
+
+
+@attr.s(frozen=True)
+class TestStats(object):
+    """Aggregated history of one test over the most recent sessions"""
+    __test__ = False
+
+    nodeid = attr.ib()
+    runs = attr.ib()
+    passed = attr.ib()
+    failed = attr.ib()
+    error = attr.ib()
+    skipped = attr.ib()
+    mean_setup = attr.ib()
+    mean_call = attr.ib()
+    mean_teardown = attr.ib()
+    last_outcome = attr.ib()
+
+    @property
+    def mean_duration(self):
+        return self.mean_setup + self.mean_call + self.mean_teardown
+
+    @property
+    def failure_rate(self):
+        return float(self.failed + self.error) / self.runs
+
+
+def final_outcome(phases):
+    """Get the outcome of a whole test from the outcomes of its phases
+
+    Args:
+        phases: dict mapping the phase (``setup``, ``call``, ``teardown``) to its outcome
+    """
+    if phases.get('setup') == 'failed':
+        return 'error'
+    if 'failed' in phases.values():
+        return 'failed'
+    if 'skipped' in phases.values():
+        return 'skipped'
+    return 'passed'
+
+
+class RunHistory(object):
+    """SQLite backed store of test results
+
+    Args:
+        path: Path of the database file, created if it does not exist
+        session: Identifier of the current session; the results recorded under it replace
+            any earlier results of the same session
+    """
+    def __init__(self, path=None, session=None):
+        self.path = str(path or DEFAULT_HISTORY_PATH)
+        self.session = session or datetime.utcnow().isoformat()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._pending = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+
+    def record(self, report):
+        """Record one phase of a test from its pytest report
+
+        The test is written to the database once its teardown report arrives.
+        """
+        phases = self._pending.setdefault(report.nodeid, {'durations': {}, 'outcomes': {}})
+        phases['durations'][report.when] = report.duration
+        phases['outcomes'][report.when] = report.outcome
+        if report.when == 'teardown':
+            del self._pending[report.nodeid]
+            self.add_result(
+                report.nodeid, final_outcome(phases['outcomes']), **phases['durations'])
+
+    def add_result(self, nodeid, outcome, setup=0.0, call=0.0, teardown=0.0):
+        """Store the result of a whole test in the current session"""
+        self._conn.execute(
+            'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (nodeid, self.session, datetime.utcnow().isoformat(), setup, call, teardown, outcome))
+
+    def commit(self):
+        self._conn.commit()
+
+    def stats(self, depth=DEFAULT_DEPTH):
+        """Get :py:class:`TestStats` of every recorded test, keyed by nodeid
+
+        Args:
+            depth: Number of the most recent results of each test to aggregate
+        """
+        query = _STATS.format(recent=_RECENT)
+        return {row[0]: TestStats(*row) for row in self._conn.execute(query, (depth,))}
+
+    def durations(self, depth=DEFAULT_DEPTH):
+        """Get the mean duration (all phases summed) of every recorded test, keyed by nodeid"""
+        query = 'SELECT nodeid, AVG(setup + call + teardown) FROM ({}) GROUP BY nodeid'.format(
+            _RECENT)
+        return dict(self._conn.execute(query, (depth,)))
+
+    def slowest(self, limit=10, depth=DEFAULT_DEPTH):
+        """Get the :py:class:`TestStats` of the tests with the longest mean duration"""
+        return sorted(
+            self.stats(depth).values(), key=lambda s: s.mean_duration, reverse=True)[:limit]
+
+    def unstable(self, depth=DEFAULT_DEPTH):
+        """Get the :py:class:`TestStats` of tests that both passed and failed recently"""
+        return [
+            s for s in self.stats(depth).values()
+            if s.passed and (s.failed or s.error)]
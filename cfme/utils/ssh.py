@@ -1,10 +1,14 @@
 # -*- coding: utf-8 -*-
+import hashlib
+import json
 import re
 import socket
 import sys
+from collections import defaultdict
 from functools import total_ordering
 from os import path as os_path
 from subprocess import check_call
+from threading import Lock
 
 import attr
 import fauxfactory
@@ -14,6 +18,7 @@ import paramiko
 from cached_property import cached_property
 from scp import SCPClient
 
+from cfme.exceptions import RailsConsoleError
 from cfme.fixtures.pytest_store import store
 from cfme.utils import conf
 from cfme.utils import ports
@@ -30,6 +35,30 @@ from cfme.utils.wait import wait_for
 # in seconds (float)
 RUNCMD_TIMEOUT = 1200.0
 
+# How long to wait for the rails console server to boot, in seconds
+RAILS_BOOT_TIMEOUT = 600.0
+
+# Prefix of the rails console server responses, other output of rails is ignored
+RAILS_CONSOLE_MARKER = '__cfme_rails_console__'
+
+# Reads one JSON request per line, evaluates its code and writes back a JSON response
+RAILS_CONSOLE_SERVER = '''
+require 'json'
+require 'timeout'
+STDOUT.sync = true
+STDIN.each_line do |line|
+  begin
+    request = JSON.parse(line)
+    value = Timeout.timeout(request['timeout']) { eval(request['code'], TOPLEVEL_BINDING) }
+    # serialized here, so a result which can't be serialized is reported as an error
+    response = {'result' => value.as_json}.to_json
+  rescue Exception => e
+    response = {'error' => e.class.name, 'message' => e.message.to_s.scrub}.to_json
+  end
+  STDOUT.puts('%s' + response)
+end
+''' % RAILS_CONSOLE_MARKER
+
 
 @attr.s(frozen=True, cmp=False)
 @total_ordering
@@ -107,12 +136,84 @@ _ssh_pubkey_file = project_path.join('.generated_ssh_key.pub')
 _client_session = list()
 
 
+class SSHTransportPool(object):
+    """Authenticated transports shared by :py:class:`SSHClient` instances
+
+    Transports are keyed on hostname, port, username, credentials and host key checking. Every
+    command opens its own channel on the transport, so the clients of one host don't pay for a
+    handshake each and can run commands in parallel. Transports which are not active anymore are
+    replaced on next connect. The clients using a transport are counted, only the last one to
+    close it really closes the transport.
+    """
+    def __init__(self):
+        self._transports = {}
+        self._users = {}
+        self._locks = defaultdict(Lock)
+        self._lock = Lock()
+
+    def lock(self, key):
+        """Lock to hold while connecting a transport for the key"""
+        with self._lock:
+            return self._locks[key]
+
+    def acquire(self, key):
+        """Returns active transport for the key, counting the caller as its user, or None"""
+        with self._lock:
+            transport = self._transports.get(key)
+            if transport is not None and not transport.is_active():
+                del self._transports[key]
+                self._users.pop(transport, None)
+                transport = None
+            if transport is not None:
+                self._users[transport] = self._users.get(transport, 0) + 1
+            return transport
+
+    def put(self, key, transport):
+        """Pools the transport under the key, counting the caller as its user"""
+        with self._lock:
+            self._transports[key] = transport
+            self._users[transport] = self._users.get(transport, 0) + 1
+
+    def release(self, transport, close=False):
+        """Stops counting the caller as a user of the transport
+
+        Args:
+            close: Whether to close the transport if the caller was its last user
+        """
+        with self._lock:
+            users = self._users.get(transport, 0) - 1
+            if users > 0:
+                self._users[transport] = users
+                return
+            self._users.pop(transport, None)
+            if not close:
+                return
+            for key, pooled in list(self._transports.items()):
+                if pooled is transport:
+                    del self._transports[key]
+        transport.close()
+
+    def close_all(self):
+        with self._lock:
+            transports = list(self._transports.values())
+            self._transports.clear()
+            self._users.clear()
+        for transport in transports:
+            transport.close()
+
+
+_transport_pool = SSHTransportPool()
+
+
 class SSHClient(paramiko.SSHClient):
     """paramiko.SSHClient wrapper
 
     Allows copying/overriding and use as a context manager
     Constructor kwargs are handed directly to paramiko.SSHClient.connect()
 
+    Clients connecting to the same host, port, user and credentials share one transport from
+    :py:class:`SSHTransportPool`, :py:meth:`close` closes it once no other client uses it.
+
     Args:
         container: If specified, then it is assumed that the VM hosts a container of CFME. The
             param then contains the name of the container.
@@ -162,6 +263,11 @@ class SSHClient(paramiko.SSHClient):
     def is_container(self):
         return self._container is not None and not self.is_pod
 
+    @cached_property
+    def rails_console(self):
+        """The :py:class:`RailsConsole` of this client, booted on first use"""
+        return RailsConsole(self)
+
     @cached_property
     def vmdb_version(self):
         res = self.run_command('cat /var/www/miq/vmdb/VERSION')
@@ -199,7 +305,8 @@ class SSHClient(paramiko.SSHClient):
         pass
 
     def __del__(self):
-        self.close()
+        # the transport may be shared with other clients, so it is not closed
+        self.release()
 
     def _check_port(self):
         hostname = self._connect_kwargs['hostname']
@@ -211,11 +318,43 @@ class SSHClient(paramiko.SSHClient):
         if sent > 0:
             logger.debug('scp progress for %r: %s of %s ', filename, sent, size)
 
+    @property
+    def _pool_key(self):
+        return (self._connect_kwargs['hostname'], self._connect_kwargs.get('port'),
+                self._connect_kwargs.get('username'), self._credentials_fingerprint,
+                self.strict_host_key_checking)
+
+    @property
+    def _credentials_fingerprint(self):
+        # clients authenticating differently must not share a transport
+        pkey = self._connect_kwargs.get('pkey')
+        key_filename = self._connect_kwargs.get('key_filename')
+        if isinstance(key_filename, list):
+            key_filename = tuple(key_filename)
+        credentials = repr((self._connect_kwargs.get('password'),
+                            pkey.get_fingerprint() if pkey is not None else None,
+                            key_filename))
+        return hashlib.sha256(credentials.encode('utf-8')).hexdigest()
+
     def close(self):
-        super().close()
+        """Stops using the transport, closes it if no other client uses it"""
+        self._drop_transport(close=True)
+        if getattr(self, '_agent', None) is not None:
+            self._agent.close()
+            self._agent = None
+
+    def release(self):
+        """Stops using the transport without closing it"""
+        self._drop_transport(close=False)
+
+    def _drop_transport(self, close):
+        transport = getattr(self, '_transport', None)
+        self._transport = None
+        if transport is not None:
+            _transport_pool.release(transport, close=close)
         try:
             _client_session.remove(self)
-        except (AttributeError, ValueError):
+        except ValueError:
             pass
 
     @property
@@ -228,29 +367,53 @@ class SSHClient(paramiko.SSHClient):
         """See paramiko.SSHClient.connect"""
         if hostname and hostname != self._connect_kwargs['hostname']:
             self._connect_kwargs['hostname'] = hostname
-            self.close()
+            self.release()
 
+        conn = None
         if not self.connected:
+            if self._transport is not None:
+                # the transport died, stop counting on it
+                _transport_pool.release(self._transport)
+                self._transport = None
             self._connect_kwargs.update(kwargs)
-            wait_for(self._check_port, handle_exception=True, timeout='2m', delay=5)
-            try:
-                conn = super().connect(**self._connect_kwargs)
-            except paramiko.ssh_exception.BadHostKeyException:
-                if self.strict_host_key_checking:
-                    raise
-
-                hk = self.get_host_keys()
-                del hk[self._connect_kwargs['hostname']]
-                conn = super().connect(**self._connect_kwargs)
-                logger.warning('Host key for host %s changed. Using the new one as '
-                               'strict_host_key_checking is disabled.',
-                               self._connect_kwargs['hostname'])
-        else:
-            conn = None
+            key = self._pool_key
+            with _transport_pool.lock(key):
+                self._transport = _transport_pool.acquire(key)
+                if self._transport is None:
+                    conn = self._connect_transport()
+                    _transport_pool.put(key, self._transport)
 
         self._after_connect()
         return conn
 
+    def _connect_transport(self):
+        try:
+            return self._connect_checking_host_key()
+        except (paramiko.ssh_exception.AuthenticationException,
+                paramiko.ssh_exception.BadHostKeyException):
+            raise
+        except (socket.error, paramiko.ssh_exception.SSHException):
+            # the port is checked only when connecting fails, e.g. the host is rebooting
+            logger.info('SSH connection to %s failed, waiting for the port',
+                        self._connect_kwargs['hostname'])
+            wait_for(self._check_port, handle_exception=True, timeout='2m', delay=5)
+            return self._connect_checking_host_key()
+
+    def _connect_checking_host_key(self):
+        try:
+            return super().connect(**self._connect_kwargs)
+        except paramiko.ssh_exception.BadHostKeyException:
+            if self.strict_host_key_checking:
+                raise
+
+            hk = self.get_host_keys()
+            del hk[self._connect_kwargs['hostname']]
+            conn = super().connect(**self._connect_kwargs)
+            logger.warning('Host key for host %s changed. Using the new one as '
+                           'strict_host_key_checking is disabled.',
+                           self._connect_kwargs['hostname'])
+            return conn
+
     def _after_connect(self):
         if self.is_pod:
             # checking whether already logged into openshift
@@ -357,13 +520,13 @@ class SSHClient(paramiko.SSHClient):
                 return
             self._system_host_keys.load(filename)
 
-    def _run_command(self, command, timeout=RUNCMD_TIMEOUT, ensure_host=False,
-                     ensure_user=False, container=None):
-        if isinstance(command, dict):
-            command = VersionPicker(command).pick(self.vmdb_version)
-        original_command = command
+    def _wrap_command(self, command, ensure_host=False, ensure_user=False, container=None):
+        """Wraps the command to run in the container or pod and as root
+
+        Returns:
+            A tuple of the command to run and whether it uses sudo
+        """
         uses_sudo = False
-        logger.info("Running command %r", command)
         container = container or self._container
         if self.is_pod and not ensure_host:
             # This command will be executed in the context of the host provider
@@ -380,6 +543,15 @@ class SSHClient(paramiko.SSHClient):
             # We need sudo
             command = 'sudo -i bash -c {command}'.format(command=quote(command))
             uses_sudo = True
+        return command, uses_sudo
+
+    def _run_command(self, command, timeout=RUNCMD_TIMEOUT, ensure_host=False,
+                     ensure_user=False, container=None):
+        if isinstance(command, dict):
+            command = VersionPicker(command).pick(self.vmdb_version)
+        original_command = command
+        logger.info("Running command %r", command)
+        command, uses_sudo = self._wrap_command(command, ensure_host, ensure_user, container)
 
         if command != original_command:
             logger.info("> Actually running command %r", command)
@@ -782,11 +954,118 @@ class SSHClient(paramiko.SSHClient):
         return {"servers": servers, "workers": workers}
 
 
+class RailsConsole(object):
+    """Long-lived rails runner evaluating Ruby snippets sent over an ssh channel
+
+    Rails boots once, on first use, instead of once per ``rails runner`` or ``rails c`` command.
+    Snippets are evaluated in the same top level binding, like in the console, and their values
+    are returned converted by ``as_json``.
+
+    Usage:
+
+    .. code-block:: python
+
+        console = appliance.ssh_client.rails_console
+        zone_names = console.eval('Zone.pluck(:name)')
+        count, _ = console.eval_batch(['Vm.count', 'MiqQueue.delete_all'])
+
+    Args:
+        ssh_client: :py:class:`SSHClient` to run the console with
+    """
+    def __init__(self, ssh_client):
+        self.ssh_client = ssh_client
+        self._channel = None
+        self._stdout = None
+        self._lock = Lock()
+
+    @property
+    def running(self):
+        return (self._channel is not None and not self._channel.closed and
+                not self._channel.exit_status_ready())
+
+    def start(self):
+        """Boots the console unless it is running already"""
+        with self._lock:
+            if self.running:
+                return
+            command, uses_sudo = self.ssh_client._wrap_command(
+                'cd /var/www/miq/vmdb; bin/rails runner {}'.format(quote(RAILS_CONSOLE_SERVER)))
+            logger.info('Starting rails console on %r', self.ssh_client)
+            self._channel = self.ssh_client.get_transport().open_session()
+            if uses_sudo:
+                # We need a pseudo-tty for sudo, requests must not be echoed or cut into lines by it
+                self._channel.get_pty()
+                command = 'stty -echo -icanon; ' + command
+            self._channel.exec_command(command)
+            self._stdout = self._channel.makefile('r')
+            self._exchange(['nil'], RAILS_BOOT_TIMEOUT)
+
+    def stop(self):
+        if self._channel is not None:
+            self._channel.close()
+        self._channel = self._stdout = None
+
+    def eval(self, code, timeout=RUNCMD_TIMEOUT):
+        """Evaluates the Ruby code and returns its value
+
+        Args:
+            code: The Ruby code.
+            timeout: Timeout after which the evaluation fails, None for no timeout.
+        Raises:
+            :py:class:`cfme.exceptions.RailsConsoleError` if the evaluation fails
+        """
+        return self.eval_batch([code], timeout=timeout)[0]
+
+    def eval_batch(self, codes, timeout=RUNCMD_TIMEOUT):
+        """Evaluates the Ruby snippets one after another and returns their values
+
+        All the snippets are sent at once. The timeout applies to each of them and the first
+        failure is raised after all of them were evaluated. See :py:meth:`eval`.
+        """
+        self.start()
+        with self._lock:
+            results = self._exchange(codes, timeout)
+        for code, result in zip(codes, results):
+            if 'error' in result:
+                raise RailsConsoleError(code, result['error'], result['message'])
+        return [result['result'] for result in results]
+
+    def _exchange(self, codes, timeout):
+        logger.info('Evaluating %d snippet(s) in rails console: %r', len(codes), codes)
+        self._channel.sendall(''.join(
+            json.dumps({'code': code, 'timeout': timeout}) + '\n' for code in codes))
+        # leave the console some time to report its own timeout
+        self._channel.settimeout(float(timeout) + 30 if timeout else None)
+        results = []
+        try:
+            while len(results) < len(codes):
+                line = self._stdout.readline()
+                if not line:
+                    raise RailsConsoleError(codes[len(results)], 'EOFError',
+                                            'rails console exited')
+                if line.startswith(RAILS_CONSOLE_MARKER):
+                    results.append(json.loads(line[len(RAILS_CONSOLE_MARKER):]))
+                else:
+                    logger.debug('rails console: %s', line.rstrip())
+        except (socket.timeout, RailsConsoleError):
+            # the console is out of sync with the requests now
+            self.stop()
+            raise
+        return results
+
+
 class SSHTail(SSHClient):
+    """Reads lines added to a remote file since the last read
 
-    def __init__(self, remote_filename, **connect_kwargs):
+    New content is read in blocks of ``block_size`` bytes from the stored offset over an SFTP
+    session opened for the read. A line is only returned once it is complete and the offset only
+    moves past the lines which were handed over, so a reader stopping early gets the rest next
+    time. The offset starts from the beginning again if the file got shorter, e.g. it was rotated.
+    """
+    def __init__(self, remote_filename, block_size=1024 * 1024, **connect_kwargs):
         super().__init__(stream_output=False, **connect_kwargs)
         self._remote_filename = remote_filename
+        self._block_size = block_size
         self._sftp_client = None
         self._remote_file_size = None
 
@@ -795,16 +1074,45 @@ class SSHTail(SSHClient):
             yield line.rstrip()
 
     def raw_lines(self):
+        for block in self._new_blocks():
+            for line in block.splitlines(True):
+                self._remote_file_size += len(line)
+                yield line.decode('utf-8', 'replace')
+
+    def raw_blocks(self):
+        """Yields new complete lines joined to blocks of text"""
+        for block in self._new_blocks():
+            self._remote_file_size += len(block)
+            yield block.decode('utf-8', 'replace')
+
+    def _new_blocks(self):
+        # Yields blocks of complete lines past the offset, the callers move the offset
         with self as sshtail:
             fstat = sshtail._sftp_client.stat(self._remote_filename)
-            if self._remote_file_size is not None:
-                if self._remote_file_size < fstat.st_size:
-                    remote_file = self._sftp_client.open(self._remote_filename, 'r')
-                    remote_file.seek(self._remote_file_size, 0)
-                    while (remote_file.tell() < fstat.st_size):
-                        line = remote_file.readline()  # Note the  missing rstrip() here!
-                        yield line
-            self._remote_file_size = fstat.st_size
+            if self._remote_file_size is None:
+                self._remote_file_size = fstat.st_size
+                return
+            if fstat.st_size < self._remote_file_size:
+                logger.info('%s got shorter, reading it from the beginning',
+                            self._remote_filename)
+                self._remote_file_size = 0
+            position = self._remote_file_size
+            if position >= fstat.st_size:
+                return
+            with self._sftp_client.open(self._remote_filename, 'rb') as remote_file:
+                remote_file.seek(position, 0)
+                remote_file.prefetch(fstat.st_size - position)
+                partial_line = b''
+                while position < fstat.st_size:
+                    data = remote_file.read(min(self._block_size, fstat.st_size - position))
+                    if not data:
+                        break
+                    position += len(data)
+                    data = partial_line + data
+                    end = data.rfind(b'\n') + 1
+                    partial_line = data[end:]
+                    if end:
+                        yield data[:end]
 
     def raw_string(self):
         return ''.join(self)
@@ -815,7 +1123,19 @@ class SSHTail(SSHClient):
         return self
 
     def __exit__(self, *args, **kwargs):
-        self._sftp_client.close()
+        # The sftp session is not kept between reads, every channel counts against the MaxSessions
+        # of the transport shared with the other clients of the host
+        self._close_sftp()
+
+    def _close_sftp(self):
+        if self._sftp_client is not None:
+            self._sftp_client.close()
+            self._sftp_client = None
+
+    def close(self):
+        self._close_sftp()
+        # the transport is shared with the other clients of the host, it is not closed
+        self.release()
 
     def set_initial_file_end(self):
         with self as sshtail:
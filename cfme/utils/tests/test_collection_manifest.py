@@ -0,0 +1,46 @@
+import attr
+
+from cfme.utils.collection_manifest import collection_hash
+from cfme.utils.collection_manifest import CollectionManifest
+from cfme.utils.collection_manifest import report_collection_diff
+
+
+@attr.s
+class FakeItem(object):
+    nodeid = attr.ib()
+    fspath = attr.ib()
+
+
+ITEMS = [
+    FakeItem('cfme/tests/test_a.py::test_a', '/tree/cfme/tests/test_a.py'),
+    FakeItem('cfme/tests/test_b.py::test_b[x]', '/tree/cfme/tests/test_b.py'),
+    FakeItem('cfme/tests/test_a.py::test_c', '/tree/cfme/tests/test_a.py'),
+]
+
+
+def test_hash_ignores_order():
+    node_ids = [item.nodeid for item in ITEMS]
+    assert collection_hash(node_ids) == collection_hash(reversed(node_ids))
+    assert collection_hash(node_ids) != collection_hash(node_ids[1:])
+
+
+def test_manifest_roundtrip(tmpdir):
+    manifest = CollectionManifest.from_items(ITEMS)
+    assert manifest.modules == ['/tree/cfme/tests/test_a.py', '/tree/cfme/tests/test_b.py']
+    path = tmpdir.join('collection.json')
+    manifest.dump(path)
+    assert CollectionManifest.load(path) == manifest
+
+
+def test_slave_args():
+    manifest = CollectionManifest.from_items(ITEMS)
+    assert manifest.slave_args(['cfme/tests'], {}) == manifest.modules
+    assert manifest.slave_args(['cfme/tests/test_a.py::test_a'], {}) == [
+        'cfme/tests/test_a.py::test_a']
+    assert manifest.slave_args(['cfme.tests'], {'pyargs': True}) == ['cfme.tests']
+
+
+def test_report_collection_diff():
+    assert report_collection_diff('slave00', ['a', 'b'], ['b', 'a']) is None
+    assert report_collection_diff('slave00', ['a', 'b'], ['b', 'c']) == (
+        'slave00 diff:\n- a\n+ c\n')
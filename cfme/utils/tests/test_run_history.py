@@ -0,0 +1,64 @@
+import attr
+import pytest
+
+from cfme.utils.run_history import final_outcome
+from cfme.utils.run_history import RunHistory
+
+
+@attr.s
+class FakeReport(object):
+    nodeid = attr.ib()
+    when = attr.ib()
+    outcome = attr.ib()
+    duration = attr.ib()
+
+
+@pytest.fixture
+def history_path(tmpdir):
+    return tmpdir.join('history.sqlite')
+
+
+def record_test(history, nodeid, setup=1.0, call=2.0, teardown=0.5, call_outcome='passed'):
+    history.record(FakeReport(nodeid, 'setup', 'passed', setup))
+    history.record(FakeReport(nodeid, 'call', call_outcome, call))
+    history.record(FakeReport(nodeid, 'teardown', 'passed', teardown))
+
+
+@pytest.mark.parametrize(('phases', 'outcome'), [
+    ({'setup': 'passed', 'call': 'passed', 'teardown': 'passed'}, 'passed'),
+    ({'setup': 'failed', 'teardown': 'passed'}, 'error'),
+    ({'setup': 'passed', 'call': 'failed', 'teardown': 'passed'}, 'failed'),
+    ({'setup': 'skipped', 'teardown': 'passed'}, 'skipped'),
+])
+def test_final_outcome(phases, outcome):
+    assert final_outcome(phases) == outcome
+
+
+def test_record_and_query(history_path):
+    with RunHistory(history_path, session='1') as history:
+        record_test(history, 'test_a.py::test_a', call=10.0)
+        record_test(history, 'test_a.py::test_b', call_outcome='failed')
+    with RunHistory(history_path, session='2') as history:
+        record_test(history, 'test_a.py::test_a', call=20.0)
+        record_test(history, 'test_a.py::test_b')
+
+    with RunHistory(history_path) as history:
+        assert history.durations() == {
+            'test_a.py::test_a': pytest.approx(16.5),
+            'test_a.py::test_b': pytest.approx(3.5),
+        }
+        stats = history.stats()['test_a.py::test_b']
+        assert (stats.runs, stats.passed, stats.failed) == (2, 1, 1)
+        assert stats.last_outcome == 'passed'
+        assert [s.nodeid for s in history.slowest(1)] == ['test_a.py::test_a']
+        assert [s.nodeid for s in history.unstable()] == ['test_a.py::test_b']
+
+
+def test_depth_limits_aggregation(history_path):
+    for session, call in enumerate([100.0, 1.0, 1.0]):
+        with RunHistory(history_path, session=str(session)) as history:
+            record_test(history, 'test_a.py::test_a', setup=0.0, call=call, teardown=0.0)
+
+    with RunHistory(history_path) as history:
+        assert history.durations(depth=2) == {'test_a.py::test_a': pytest.approx(1.0)}
+        assert history.durations(depth=3) == {'test_a.py::test_a': pytest.approx(34.0)}
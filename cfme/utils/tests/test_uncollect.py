@@ -0,0 +1,55 @@
+from cfme.markers.env_markers.provider import DataProvider
+from cfme.markers.uncollect import get_predicate
+from cfme.markers.uncollect import predicate_stats
+
+
+def test_predicate_memoizes_data_providers():
+    calls = []
+
+    def predicate(appliance, provider):
+        calls.append(provider)
+        return provider.type_name == 'rhevm'
+
+    uncollect = get_predicate(predicate)
+    assert uncollect.arg_names == ['appliance', 'provider']
+    assert uncollect(['appliance', DataProvider('infra', 'rhevm', '4.2')])
+    assert uncollect(['appliance', DataProvider('infra', 'rhevm', '4.2')])
+    assert not uncollect(['appliance', DataProvider('infra', 'virtualcenter', '6.5')])
+    assert len(calls) == 2
+    assert (uncollect.calls, uncollect.evaluations) == (3, 2)
+
+
+def test_predicate_keeps_real_providers_apart():
+    def predicate(provider):
+        return provider.key == 'rhv42'
+
+    uncollect = get_predicate(predicate)
+    provider = DataProvider('infra', 'rhevm', '4.2')
+    provider.key = 'rhv42'
+    other_provider = DataProvider('infra', 'rhevm', '4.2')
+    other_provider.key = 'rhv42-ci'
+    assert uncollect([provider])
+    assert not uncollect([other_provider])
+    assert uncollect.evaluations == 2
+
+
+def test_predicate_evaluates_unhashable_values():
+    uncollect = get_predicate(lambda names: 'skip' in names)
+    assert uncollect([['skip']])
+    assert not uncollect([['keep']])
+    assert uncollect.evaluations == 2
+    assert not uncollect.results
+
+
+def test_non_callable_has_no_predicate():
+    assert get_predicate(True) is None
+
+
+def test_predicate_stats_slowest_first():
+    fast = get_predicate(lambda x: False)
+    slow = get_predicate(lambda y: False)
+    fast([1])
+    slow([1])
+    fast.duration, slow.duration = 0.1, 1.0
+    stats = [predicate for predicate in predicate_stats() if predicate in (fast, slow)]
+    assert stats == [slow, fast]
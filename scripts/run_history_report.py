@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""Report the slowest and the unstable tests from the recorded run history.
+
+The history is recorded by test runs into ``log/run_history.sqlite`` by default, see
+``cfme.utils.run_history``."""
+import argparse
+
+from tabulate import tabulate
+
+from cfme.utils.run_history import DEFAULT_DEPTH
+from cfme.utils.run_history import DEFAULT_HISTORY_PATH
+from cfme.utils.run_history import RunHistory
+
+
+def stats_table(stats):
+    return tabulate(
+        [(s.nodeid, s.runs, '{:.1f}'.format(s.mean_setup), '{:.1f}'.format(s.mean_call),
+          '{:.1f}'.format(s.mean_teardown), '{:.0%}'.format(s.failure_rate), s.last_outcome)
+         for s in stats],
+        headers=['Test', 'Runs', 'Setup [s]', 'Call [s]', 'Teardown [s]', 'Failures', 'Last'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-f', '--history-file', action='store', default=str(DEFAULT_HISTORY_PATH))
+    parser.add_argument('-d', '--depth', action='store', type=int, default=DEFAULT_DEPTH,
+                        help='Number of the most recent results of each test to aggregate')
+    parser.add_argument('-n', '--limit', action='store', type=int, default=20,
+                        help='Number of the slowest tests to list')
+    args = parser.parse_args()
+
+    with RunHistory(args.history_file) as history:
+        print('Slowest tests:')
+        print(stats_table(history.slowest(args.limit, depth=args.depth)))
+        print('\nTests that both passed and failed recently:')
+        print(stats_table(history.unstable(depth=args.depth)))
@@ -2,9 +2,12 @@
 import inspect
 import json
 import re
+import time
 from celery import chain
 from celery.result import AsyncResult
 from datetime import datetime
+from threading import BoundedSemaphore
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction
 from django.http import HttpResponse
@@ -19,6 +22,12 @@ from appliances.tasks.service_ops import (appliance_power_on, disconnect_direct_
                                         appliance_power_off, appliance_suspend, connect_direct_lun)
 from sprout.log import create_logger
 
+# Long-polling requests occupy a server thread, so they need to be kept short
+REQUEST_WAIT_TIMEOUT = 20
+REQUEST_WAIT_POLL = 0.5
+# Waiting requests of this process, the pollers above the limit are answered immediately
+request_wait_slots = BoundedSemaphore(settings.REQUEST_WAIT_SLOTS)
+
 
 def json_response(data):
     return HttpResponse(json.dumps(data), content_type="application/json")
@@ -249,18 +258,31 @@ def request_check(user, request_id):
     request = AppliancePool.objects.get(id=request_id)
     if user != request.owner and not user.is_staff:
         raise Exception("This pool belongs to a different user!")
-    return {
-        "fulfilled": request.fulfilled,
-        "finished": request.finished,
-        "preconfigured": request.preconfigured,
-        "yum_update": request.yum_update,
-        "progress": int(round(request.percent_finished * 100)),
-        "appliances": [
-            appliance.serialized
-            for appliance
-            in request.appliances
-        ],
-    }
+    return request.status
+
+
+@jsonapi.authenticated_method
+def request_wait(user, request_id, revision=None, timeout=REQUEST_WAIT_TIMEOUT):
+    """Return status of the appliance pool once it changes
+
+    Waits up to ``timeout`` seconds until ``revision`` of the status returned by ``request_check``
+    or ``request_wait`` changes, then returns the status as ``request_check`` does. Without
+    ``revision`` or when too many requests are waiting already, the current status is returned
+    immediately.
+    """
+    request = AppliancePool.objects.get(id=request_id)
+    if user != request.owner and not user.is_staff:
+        raise Exception("This pool belongs to a different user!")
+    if revision is not None and request_wait_slots.acquire(blocking=False):
+        try:
+            deadline = time.time() + min(timeout, REQUEST_WAIT_TIMEOUT)
+            while (AppliancePool.status_revision(request.id) == revision and
+                    time.time() < deadline):
+                time.sleep(REQUEST_WAIT_POLL)
+        finally:
+            request_wait_slots.release()
+        request.reload()
+    return request.status
 
 
 @jsonapi.authenticated_method
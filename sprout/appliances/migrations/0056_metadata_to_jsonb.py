@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import django.contrib.postgres.fields.jsonb
+import django.core.serializers.json
+import yaml
+from django.db import migrations
+
+METADATA_MODELS = [
+    'appliance', 'appliancepool', 'delayedprovisiontask', 'group', 'groupshepherd', 'provider',
+    'template']
+
+
+def yaml_to_json_metadata(apps, schema_editor):
+    for model_name in METADATA_MODELS:
+        Model = apps.get_model("appliances", model_name)  # noqa
+        objects = list(Model.objects.using(schema_editor.connection.alias).all())
+        for o in objects:
+            o.object_metadata = yaml.safe_load(o.object_meta_data) or {}
+        Model.objects.using(schema_editor.connection.alias).bulk_update(
+            objects, ['object_metadata'], batch_size=500)
+
+
+def json_to_yaml_metadata(apps, schema_editor):
+    for model_name in METADATA_MODELS:
+        Model = apps.get_model("appliances", model_name)  # noqa
+        objects = list(Model.objects.using(schema_editor.connection.alias).all())
+        for o in objects:
+            o.object_meta_data = yaml.safe_dump(o.object_metadata)
+        Model.objects.using(schema_editor.connection.alias).bulk_update(
+            objects, ['object_meta_data'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appliances', '0055_migration_to_django225'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name=model_name,
+            name='object_metadata',
+            field=django.contrib.postgres.fields.jsonb.JSONField(
+                default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder),
+        )
+        for model_name in METADATA_MODELS
+    ] + [
+        migrations.RunPython(yaml_to_json_metadata, json_to_yaml_metadata),
+    ] + [
+        migrations.RemoveField(
+            model_name=model_name,
+            name='object_meta_data',
+        )
+        for model_name in METADATA_MODELS
+    ]
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 import base64
+import json
 import re
-import yaml
 import pickle   # NOQA
 
 import wrapanapi
@@ -11,12 +11,16 @@ from wrapanapi.exceptions import VMInstanceNotFound
 from cached_property import cached_property
 from celery import chain
 from contextlib import contextmanager
+from copy import deepcopy
 from datetime import timedelta, date
+from uuid import uuid4
 from django.contrib.auth.models import User, Group as DjangoGroup
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import models, transaction
-from django.db.models import Q
-from django.db.models.signals import pre_save
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, models, transaction
+from django.db.models import Count, Q
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 from django.contrib.postgres.fields import JSONField
@@ -61,7 +65,7 @@ def apply_if_not_none(o, meth, *args, **kwargs):
 class MetadataMixin(models.Model):
     class Meta:
         abstract = True
-    object_meta_data = models.TextField(default=yaml.safe_dump({}))
+    object_metadata = JSONField(default=dict, encoder=DjangoJSONEncoder)
     created_on = models.DateTimeField(default=timezone.now, editable=False)
     modified_on = models.DateTimeField(default=timezone.now)
 
@@ -80,33 +84,50 @@ class MetadataMixin(models.Model):
         new_self = type(self).objects.get(pk=self.pk)
         self.__dict__.update(new_self.__dict__)
 
-    @property
-    @contextmanager
-    def metadata_lock(self):
-        with critical_section("metadata-({})[{}]".format(type(self).__name__, str(self.pk))):
-            yield
-
     @property
     def metadata(self):
-        return yaml.safe_load(self.object_meta_data)
+        return deepcopy(self.object_metadata)
 
     @metadata.setter
     def metadata(self, value):
         if not isinstance(value, dict):
             raise TypeError("You can store only dict in metadata!")
-        self.object_meta_data = yaml.safe_dump(value)
+        self.object_metadata = deepcopy(value)
 
     @property
     @contextmanager
     def edit_metadata(self):
-        with transaction.atomic():
-            with self.metadata_lock:
-                o = type(self).objects.get(pk=self.pk)
-                metadata = o.metadata
-                yield metadata
-                o.metadata = metadata
-                o.save()
-        self.reload()
+        """Yields the current metadata of the object to edit.
+
+        Only the keys set or deleted in the block are written, see :py:meth:`update_metadata`.
+        """
+        original = type(self).objects.values_list('object_metadata', flat=True).get(pk=self.pk)
+        metadata = deepcopy(original)
+        yield metadata
+        self.update_metadata(
+            {key: value for key, value in metadata.items()
+             if key not in original or original[key] != value},
+            [key for key in original if key not in metadata])
+
+    def update_metadata(self, values=None, delete_keys=()):
+        """Sets and deletes the metadata keys in the database with one atomic update.
+
+        Other keys are kept as they are in the database, so concurrent edits of different keys
+        don't overwrite each other and no lock is needed.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE {table} SET object_metadata = (object_metadata - %s::text[]) || %s::jsonb, '
+                'modified_on = %s WHERE {pk} = %s RETURNING object_metadata'.format(
+                    table=connection.ops.quote_name(self._meta.db_table),
+                    pk=connection.ops.quote_name(self._meta.pk.column)),
+                [list(delete_keys), json.dumps(values or {}, cls=DjangoJSONEncoder),
+                 timezone.now(), self.pk])
+            row = cursor.fetchone()
+        if row is None:
+            raise type(self).DoesNotExist('{} {} does not exist'.format(
+                type(self).__name__, self.pk))
+        self.object_metadata = row[0]
 
     @property
     def logger(self):
@@ -197,15 +218,58 @@ class Provider(MetadataMixin):
         else:
             return get_mgmt(self.id)
 
+    # Appliances which are being provisioned, relative to Appliance
+    PROVISIONING_FILTER = Q(ready=False, marked_for_deletion=False, ip_address=None)
+
+    @classmethod
+    def snapshot_capacity(cls, providers):
+        """Counts the appliances and preparing templates of all the providers at once.
+
+        The slot and load properties of the passed instances then use the counts instead of
+        querying them on every access, so sorting or summing over many providers stays cheap.
+        Returns the providers as a list.
+        """
+        providers = list(providers)
+        counts = {
+            provider.id: {'provisioning': 0, 'managing': 0, 'templates_preparing': 0}
+            for provider in providers}
+        appliance_counts = Appliance.objects\
+            .filter(template__provider__in=counts.keys())\
+            .values('template__provider')\
+            .annotate(
+                managing=Count('id'),
+                provisioning=Count('id', filter=cls.PROVISIONING_FILTER))\
+            .order_by()
+        for row in appliance_counts:
+            counts[row['template__provider']].update(
+                managing=row['managing'], provisioning=row['provisioning'])
+        template_counts = Template.objects\
+            .filter(provider__in=counts.keys(), ready=False)\
+            .values('provider')\
+            .annotate(templates_preparing=Count('id'))\
+            .order_by()
+        for row in template_counts:
+            counts[row['provider']]['templates_preparing'] = row['templates_preparing']
+        for provider in providers:
+            provider._capacity = counts[provider.id]
+        return providers
+
+    def _count(self, key, queryset):
+        capacity = getattr(self, '_capacity', None)
+        if capacity is not None:
+            return capacity[key]
+        return queryset.count()
+
     @property
     def num_currently_provisioning(self):
-        return len(
-            Appliance.objects.filter(
-                ready=False, marked_for_deletion=False, template__provider=self, ip_address=None))
+        return self._count(
+            'provisioning',
+            Appliance.objects.filter(self.PROVISIONING_FILTER, template__provider=self))
 
     @property
     def num_templates_preparing(self):
-        return len(Template.objects.filter(provider=self, ready=False))
+        return self._count(
+            'templates_preparing', Template.objects.filter(provider=self, ready=False))
 
     @property
     def remaining_configuring_slots(self):
@@ -225,7 +289,7 @@ class Provider(MetadataMixin):
 
     @property
     def num_currently_managing(self):
-        return len(Appliance.objects.filter(template__provider=self))
+        return self._count('managing', Appliance.objects.filter(template__provider=self))
 
     @property
     def currently_managed_appliances(self):
@@ -499,9 +563,55 @@ class GroupShepherd(MetadataMixin):
     unconfigured_template_pool_size = models.IntegerField(default=0,
         help_text="How many appliances to keep spinned for quick taking - unconfigured ones.")
 
+    # Demand planning, see predicted_demand
+    DEMAND_HISTORY_DAYS = 14
+    DEMAND_LEAD_TIME = timedelta(hours=1)
+    DEMAND_CACHE_TIMEOUT = 600
+    DEMAND_LIMIT = 20
+    # Provisioning slots left to the pools when spinning appliances for the predicted demand
+    DEMAND_RESERVED_SLOTS = 1
+
     class Meta:
         ordering = ['template_group', 'user_group', 'id']
 
+    def base_pool_size(self, preconfigured):
+        return self.template_pool_size if preconfigured else self.unconfigured_template_pool_size
+
+    def predicted_demand(self, preconfigured):
+        """Predicts how many appliances the users of the group request in the DEMAND_LEAD_TIME.
+
+        Averages the appliances requested by the pools of the group in the same time of the day
+        during the last DEMAND_HISTORY_DAYS days. The prediction is cached for
+        DEMAND_CACHE_TIMEOUT seconds.
+        """
+        key = "shepherd-demand-{}-{}".format(self.id, preconfigured)
+        demand = cache.get(key)
+        if demand is None:
+            now = timezone.now()
+            pools = AppliancePool.objects.filter(
+                group=self.template_group, owner__groups=self.user_group,
+                preconfigured=preconfigured,
+                created_on__gte=now - timedelta(days=self.DEMAND_HISTORY_DAYS),
+                created_on__lt=now - timedelta(days=1) + self.DEMAND_LEAD_TIME)
+            requested = sum(
+                total_count
+                for created_on, total_count in pools.values_list('created_on', 'total_count')
+                if (created_on - now) % timedelta(days=1) < self.DEMAND_LEAD_TIME)
+            # Rounding up, one appliance ready in vain is cheaper than one missing
+            demand = -(-requested // self.DEMAND_HISTORY_DAYS)
+            cache.set(key, demand, self.DEMAND_CACHE_TIMEOUT)
+        return demand
+
+    def wanted_pool_size(self, preconfigured):
+        """How many appliances to keep spinned, raised by the predicted demand.
+
+        Only the shepherds keeping some appliances are raised.
+        """
+        pool_size = self.base_pool_size(preconfigured)
+        if pool_size == 0:
+            return 0
+        return max(pool_size, min(self.predicted_demand(preconfigured), self.DEMAND_LIMIT))
+
     @property
     def appliances(self):
         return Appliance.objects.filter(
@@ -520,8 +630,7 @@ class GroupShepherd(MetadataMixin):
             self.appliances.filter(
                 template__preconfigured=preconfigured, appliance_pool=None,
                 marked_for_deletion=False))
-        wanted_pool_size = (
-            self.template_pool_size if preconfigured else self.unconfigured_template_pool_size)
+        wanted_pool_size = self.wanted_pool_size(preconfigured)
         if wanted_pool_size == 0:
             return 100
         return int(round((float(appliances_in_shepherd) / float(wanted_pool_size)) * 100.0))
@@ -1235,9 +1344,54 @@ class AppliancePool(MetadataMixin):
     template_type = models.CharField(max_length=24, choices=Template.TEMPLATE_TYPES,
                                      default=Template.DEFAULT_TEMPLATE_TYPE)
 
+    # The status is invalidated on every change, this only bounds the memory used by it
+    STATUS_CACHE_TIMEOUT = 3600
+
     class Meta:
         ordering = ['id']
 
+    @staticmethod
+    def _status_revision_key(pool_id):
+        return "pool-status-revision-{}".format(pool_id)
+
+    @classmethod
+    def status_revision(cls, pool_id):
+        """Returns the revision of the current status of the pool, None if it is not known."""
+        return cache.get(cls._status_revision_key(pool_id))
+
+    @classmethod
+    def touch_status(cls, pool_id):
+        """Marks the status of the pool as changed, returns the new revision."""
+        revision = uuid4().hex
+        cache.set(cls._status_revision_key(pool_id), revision, cls.STATUS_CACHE_TIMEOUT)
+        return revision
+
+    @property
+    def status(self):
+        """Status document of the pool, as returned by the ``request_check`` API call.
+
+        The document is cached until the pool or any of its appliances change, so the clients
+        polling the pool do not recompute the progress of the provisioning.
+        """
+        revision = self.status_revision(self.id)
+        if revision is not None:
+            status = cache.get("pool-status-{}-{}".format(self.id, revision))
+            if status is not None:
+                return status
+        else:
+            revision = self.touch_status(self.id)
+        status = {
+            "fulfilled": self.fulfilled,
+            "finished": self.finished,
+            "preconfigured": self.preconfigured,
+            "yum_update": self.yum_update,
+            "progress": int(round(self.percent_finished * 100)),
+            "appliances": [appliance.serialized for appliance in self.appliances],
+            "revision": revision,
+        }
+        cache.set("pool-status-{}-{}".format(self.id, revision), status, self.STATUS_CACHE_TIMEOUT)
+        return status
+
     def merge(self, source_pool):
         if not self.finished:
             raise Exception('Provisioning of the target pool has not finished yet.')
@@ -1416,8 +1570,10 @@ class AppliancePool(MetadataMixin):
 
     @property
     def possible_provisioning_templates(self):
+        templates = self.possible_templates
+        Provider.snapshot_capacity(tpl.provider for tpl in templates)
         return sorted(
-            [tpl for tpl in self.possible_templates if tpl.provider.free],
+            [tpl for tpl in templates if tpl.provider.free],
             # Sort by date and load to pick the best match (least loaded provider)
             key=lambda tpl: (tpl.date, 1.0 - tpl.provider.appliance_load), reverse=True)
 
@@ -1578,7 +1734,7 @@ class AppliancePool(MetadataMixin):
         for template in self.possible_templates:
             providers.add(template.provider)
         slots = 0
-        for provider in providers:
+        for provider in Provider.snapshot_capacity(providers):
             slots += provider.remaining_appliance_slots
         return slots
 
@@ -1597,6 +1753,41 @@ class AppliancePool(MetadataMixin):
             self.id, self.group.id, self.total_count)
 
 
+def touch_status_on_commit(pool_id):
+    """Touches the status of the pool once the current transaction is committed.
+
+    Clients woken by the new revision would otherwise build the status from the data which is not
+    committed yet and the status would be cached under the new revision.
+    """
+    transaction.on_commit(lambda: AppliancePool.touch_status(pool_id))
+
+
+@receiver(post_save, sender=AppliancePool)
+@receiver(post_delete, sender=AppliancePool)
+def touch_pool_status(sender, instance, **kwargs):
+    touch_status_on_commit(instance.id)
+
+
+@receiver(pre_save, sender=Appliance)
+def remember_appliance_pool(sender, instance, **kwargs):
+    # the appliance taken out of a pool changes the status of that pool as well
+    if instance.pk is None:
+        instance._previous_pool_id = None
+    else:
+        instance._previous_pool_id = Appliance.objects\
+            .filter(pk=instance.pk)\
+            .values_list('appliance_pool_id', flat=True)\
+            .first()
+
+
+@receiver(post_save, sender=Appliance)
+@receiver(post_delete, sender=Appliance)
+def touch_appliance_pool_status(sender, instance, **kwargs):
+    pool_ids = {instance.appliance_pool_id, getattr(instance, '_previous_pool_id', None)}
+    for pool_id in pool_ids - {None}:
+        touch_status_on_commit(pool_id)
+
+
 class MismatchVersionMailer(models.Model):
     provider = models.ForeignKey(Provider, on_delete=models.CASCADE)
     template_name = models.CharField(max_length=64)
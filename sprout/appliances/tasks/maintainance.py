@@ -6,12 +6,14 @@ from datetime import timedelta
 import command
 import yaml
 from celery import chord
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.mail import send_mail
 from django.db import transaction
 from django.utils import timezone
 from paramiko import SSHException
 from wrapanapi import Openshift
+from wrapanapi.exceptions import VMInstanceNotFound
 
 from . import parsedate, singleton_task, provider_error_logger
 from appliances.models import (Provider, Group, Template, Appliance, AppliancePool,
@@ -20,6 +22,71 @@ from cfme.utils.path import project_path
 from sprout import settings, redis
 from sprout.irc_bot import send_message
 
+# How long the maintenance tasks share a provider inventory, in seconds
+INVENTORY_TTL = 120
+
+InventoryVm = namedtuple('InventoryVm', ['name', 'uuid', 'state', 'is_appliance'])
+
+
+def provider_vm_inventory(provider, logger):
+    """Lists the VMs on the provider with their UUID and power state.
+
+    The listing is cached for INVENTORY_TTL seconds, so the maintenance tasks running in that time
+    share it instead of listing the VMs one after another. Returns None if the provider does not
+    have VMs. On openshift, projects which are not appliances are listed with no UUID or state.
+    """
+    return provider_vm_listing(provider, logger)[1]
+
+
+def provider_vm_listing(provider, logger):
+    """Returns the time the provider started to be listed and :py:func:`provider_vm_inventory`
+
+    Anything which changed after that time may be missing in the possibly cached inventory.
+    """
+    if not hasattr(provider.api, "list_vms"):
+        return None, None
+    key = 'provider-vm-listing-{}'.format(provider.id)
+    listing = cache.get(key)
+    if listing is not None:
+        return listing
+    listed_at = timezone.now()
+    inventory = []
+    for vm in provider.api.list_vms():
+        try:
+            if provider.provider_type == 'openshift':
+                if provider.api.is_appliance(vm):
+                    inventory.append(InventoryVm(
+                        name=vm, uuid=provider.api.get_appliance_uuid(vm),
+                        state=provider.api.vm_status(vm), is_appliance=True))
+                else:
+                    # there are some service projects in openshift
+                    inventory.append(InventoryVm(
+                        name=vm, uuid=None, state=None, is_appliance=False))
+            else:
+                inventory.append(InventoryVm(
+                    name=vm.name, uuid=vm.uuid, state=vm.state, is_appliance=True))
+        except Exception as e:
+            logger.error("Couldn't get vm {} on provider {} because of {}".format(
+                getattr(vm, 'name', vm), provider.id, e))
+            continue
+    cache.set(key, (listed_at, inventory), INVENTORY_TTL)
+    return listed_at, inventory
+
+
+def provider_template_inventory(provider):
+    """Lists the names of the templates on the provider, cached like provider_vm_inventory"""
+    key = 'provider-template-inventory-{}'.format(provider.id)
+    templates = cache.get(key)
+    if templates is not None:
+        return templates
+    # TODO: change after openshift wrapanapi refactor
+    if isinstance(provider.api, Openshift):
+        templates = list(map(str, provider.api.list_template()))
+    else:
+        templates = [tmpl.name for tmpl in provider.api.list_templates()]
+    cache.set(key, templates, INVENTORY_TTL)
+    return templates
+
 
 @singleton_task()
 def appliances_synchronize_metadata(self):
@@ -86,19 +153,20 @@ def synchronize_untracked_vms_in_provider(self, provider_id):
     """'re'-synchronizes any vms that might be lost during outages."""
     provider = Provider.objects.get(id=provider_id, working=True, disabled=False)
     provider_api = provider.api
-    if not hasattr(provider_api, 'list_vms'):
-        # This provider does not have VMs
+    inventory = provider_vm_inventory(provider, self.logger)
+    if inventory is None or provider.provider_type == 'openshift':
+        # This provider does not have VMs or they don't have metadata
         return
-    for vm in sorted(provider_api.list_vms(), key=lambda pvm: getattr(pvm, 'name', pvm)):
-        if (
-                Appliance.objects.filter(name=getattr(vm, 'name', vm),
-                                         template__provider=provider).count() != 0
-        ):
+    known_names = set(
+        Appliance.objects.filter(template__provider=provider).values_list('name', flat=True))
+    for vm_name in sorted(inv_vm.name for inv_vm in inventory):
+        if vm_name in known_names:
             continue
         # We have an untracked VM. Let's investigate
         try:
+            vm = provider_api.get_vm(vm_name)
             appliance_id = vm.get_meta_value('sprout_id')
-        except KeyError:
+        except (KeyError, VMInstanceNotFound):
             continue
         except (AttributeError, NotImplementedError):
             # Do not bother if not implemented in the VM object's API
@@ -473,11 +541,7 @@ def check_templates_in_provider(self, provider_id):
     provider = Provider.objects.get(id=provider_id, disabled=False)
     # Get templates and update metadata
     try:
-        # TODO: change after openshift wrapanapi refactor
-        if isinstance(provider.api, Openshift):
-            templates = list(map(str, provider.api.list_template()))
-        else:
-            templates = [tmpl.name for tmpl in provider.api.list_templates()]
+        templates = provider_template_inventory(provider)
     except Exception as err:
         self.logger.warning("Provider %s will be marked as not working because of %s",
                             provider_id, err)
@@ -493,12 +557,15 @@ def check_templates_in_provider(self, provider_id):
         return
     # Check Sprout template existence
     # expiration_time = (timezone.now() - timedelta(**settings.BROKEN_APPLIANCE_GRACE_TIME))
-    for template in Template.objects.filter(provider=provider):
-        with transaction.atomic():
-            tpl = Template.objects.get(pk=template.pk)
-            exists = tpl.name in templates
-            tpl.exists = exists
-            tpl.save(update_fields=['exists'])
+    template_names = set(templates)
+    with transaction.atomic():
+        changed = []
+        for tpl in Template.objects.select_for_update().filter(provider=provider):
+            exists = tpl.name in template_names
+            if tpl.exists != exists:
+                tpl.exists = exists
+                changed.append(tpl)
+        Template.objects.bulk_update(changed, ['exists'])
 
 
 @singleton_task()
@@ -515,55 +582,71 @@ def refresh_appliances_provider(self, provider_id):
     """
     self.logger.info("Refreshing appliances in {}".format(provider_id))
     provider = Provider.objects.get(id=provider_id, working=True, disabled=False)
-    if not hasattr(provider.api, "list_vms"):
+    listed_at, inventory = provider_vm_listing(provider, self.logger)
+    if inventory is None:
         # Ignore this provider
         return
-    vms = provider.api.list_vms()
     dict_vms = {}
     uuid_vms = {}
-    FakeVm = namedtuple('FakeVm', ['ip', 'name', 'uuid', 'state'])
-
-    for vm in vms:
-        try:
-            if provider.provider_type == 'openshift':
-                if not provider.api.is_appliance(vm):
-                    # there are some service projects in openshift which we need to skip here
-                    continue
-
-                vm_data = dict(ip=provider.api.get_appliance_url(vm),
-                               name=vm,
-                               uuid=provider.api.get_appliance_uuid(vm),
-                               state=provider.api.vm_status(vm))
-                vm = FakeVm(**vm_data)
-
-            dict_vms[vm.name] = vm
-            if vm.uuid:
-                uuid_vms[vm.uuid] = vm
-        except Exception as e:
-            self.logger.error("Couldn't refresh vm {} because of {}".format(vm.name, e.message))
+    for vm in inventory:
+        if not vm.is_appliance:
             continue
+        dict_vms[vm.name] = vm
+        if vm.uuid:
+            uuid_vms[vm.uuid] = vm
 
-    for appliance in Appliance.objects.filter(template__provider=provider):
-        if appliance.uuid is not None and appliance.uuid in uuid_vms:
-            vm = uuid_vms[appliance.uuid]
-            # Using the UUID and change the name if it changed
-            appliance.name = vm.name
-            appliance.set_power_state(Appliance.POWER_STATES_MAPPING.get(
-                vm.state, Appliance.Power.UNKNOWN))
-        elif appliance.name in dict_vms:
-            vm = dict_vms[appliance.name]
-            # Using the name, and then retrieve uuid
-            appliance.uuid = vm.uuid
-            appliance.set_power_state(Appliance.POWER_STATES_MAPPING.get(
-                vm.state, Appliance.Power.UNKNOWN))
-            self.logger.info("Retrieved UUID for appliance {}/{}: {}".format(
-                appliance.id, appliance.name, appliance.uuid))
-        else:
-            # Orphaned :(
-            appliance.set_power_state(Appliance.Power.ORPHANED)
-        with transaction.atomic():
-            appliance.save()
-        appliance.set_status('Appliance Refreshed')
+    refreshed_fields = ['name', 'uuid', 'power_state', 'power_state_changed', 'swap', 'ssh_failed']
+    with transaction.atomic():
+        appliances = list(
+            Appliance.objects.select_for_update().filter(template__provider=provider))
+        changed = []
+        refreshed = []
+        for appliance in appliances:
+            # The inventory may be older than the power state set directly by the power tasks,
+            # or than the appliance, whose VM may be still being created
+            if appliance.power_state_changed > listed_at or appliance.created_on > listed_at:
+                continue
+            old_values = [getattr(appliance, field) for field in refreshed_fields]
+            if appliance.uuid is not None and appliance.uuid in uuid_vms:
+                vm = uuid_vms[appliance.uuid]
+                # Using the UUID and change the name if it changed
+                appliance.name = vm.name
+                appliance.set_power_state(Appliance.POWER_STATES_MAPPING.get(
+                    vm.state, Appliance.Power.UNKNOWN))
+            elif appliance.name in dict_vms:
+                vm = dict_vms[appliance.name]
+                # Using the name, and then retrieve uuid
+                appliance.uuid = vm.uuid
+                appliance.set_power_state(Appliance.POWER_STATES_MAPPING.get(
+                    vm.state, Appliance.Power.UNKNOWN))
+                self.logger.info("Retrieved UUID for appliance {}/{}: {}".format(
+                    appliance.id, appliance.name, appliance.uuid))
+            elif appliance.status_changed > listed_at:
+                # Provisioning in progress, the VM may have appeared after the listing
+                continue
+            else:
+                # Orphaned :(
+                appliance.set_power_state(Appliance.Power.ORPHANED)
+            refreshed.append(appliance)
+            if [getattr(appliance, field) for field in refreshed_fields] != old_values:
+                appliance.modified_on = timezone.now()
+                changed.append(appliance)
+        Appliance.objects.bulk_update(changed, refreshed_fields + ['modified_on'])
+        Appliance.objects\
+            .filter(id__in=[appliance.id for appliance in refreshed])\
+            .exclude(status='Appliance Refreshed')\
+            .update(status='Appliance Refreshed', status_changed=timezone.now(),
+                    modified_on=timezone.now())
+    # Bulk updates do not send the signals which invalidate the pool status
+    touched_pools = {appliance.appliance_pool_id for appliance in changed}
+    touched_pools.update(
+        appliance.appliance_pool_id for appliance in refreshed
+        if appliance.status != 'Appliance Refreshed')
+    for pool_id in touched_pools - {None}:
+        AppliancePool.touch_status(pool_id)
+    self.logger.info("Refreshed {} appliances in {}, {} changed, {} skipped as newer than the "
+                     "listing".format(len(refreshed), provider_id, len(changed),
+                                      len(appliances) - len(refreshed)))
 
 
 @singleton_task()
@@ -608,22 +691,11 @@ def kill_lost_appliances_per_provider(self, provider_id):
     provider = Provider.objects.get(id=provider_id)
     self.logger.info("obtaining list of vms on provider {}".format(provider.id))
     try:
-        vms = provider.api.list_vms()
-        if provider.provider_type == 'openshift':
-            vm_names = vms
-        else:
-            vm_names = []
-            for vm in vms:
-                try:
-                    vm_names.append(vm.name)
-                except Exception as e:
-                    self.logger.exception("Couldn't get one prov's vm: {p} "
-                                          "because of exception {e}".format(p=provider_id,
-                                                                            e=e))
-                    continue
+        vm_names = [vm.name for vm in provider_vm_inventory(provider, self.logger) or []]
         # skipping appliances present in sprout db. those will be handled by another task
-        vm_names = [name for name in vm_names
-                    if not Appliance.objects.filter(name=name, template__provider=provider)]
+        known_names = set(
+            Appliance.objects.filter(template__provider=provider).values_list('name', flat=True))
+        vm_names = [name for name in vm_names if name not in known_names]
         # checking vm time
         for rule in rules:
             expiration_time = timezone.now() - timedelta(**rule['lifetime'])
@@ -721,16 +721,22 @@ def generic_shepherd(self, preconfigured):
         # If we then want to delete some templates, better kill the eldest. status_changed
         # says which one was provisioned when, because nothing else then touches that field.
         appliances.sort(key=lambda appliance: appliance.status_changed)
-        pool_size = gs.template_pool_size if preconfigured else gs.unconfigured_template_pool_size
+        pool_size = gs.wanted_pool_size(preconfigured)
         if len(appliances) < pool_size and possible_templates_for_provision:
             # There must be some templates in order to run the provisioning
             # Provision ONE appliance at time for each group, that way it is possible to maintain
             # reasonable balancing
+            # Appliances for the predicted demand must not take all the slots the pools need
+            reserved_slots = (
+                gs.DEMAND_RESERVED_SLOTS
+                if len(appliances) >= gs.base_pool_size(preconfigured) else 0)
             with transaction.atomic():
+                Provider.snapshot_capacity(tpl.provider for tpl in possible_templates_for_provision)
                 # Now look for templates that are on non-busy providers
                 tpl_free = [t for t
                             in possible_templates_for_provision
-                            if not t.provider.disabled and t.provider.free]
+                            if not t.provider.disabled and
+                            t.provider.remaining_provisioning_slots > reserved_slots]
                 if tpl_free:
                     chosen_template = sorted(tpl_free, key=lambda t: t.provider.appliance_load)[0]
                     new_appliance_name = gen_appliance_name(chosen_template.id)
@@ -327,7 +327,7 @@ def providers_for_date_group_and_version(request):
                 filters["date"] = parser.parse(date)
             providers = Template.objects.filter(**filters).values("provider").distinct()
             providers = sorted([list(p.values())[0] for p in providers])
-            providers = list(Provider.objects.filter(id__in=providers))
+            providers = Provider.snapshot_capacity(Provider.objects.filter(id__in=providers))
             if provider_type is None:
                 providers = list(providers)
             else:
@@ -18,6 +18,11 @@ BACKUP_DIR=${BACKUP_DIR:-"/tmp/sprout-backup"}
 PYTHONPATH="`pwd`:${PYTHONPATH}"
 export PYTHONPATH
 
+# Every waiting request_wait call holds a thread, see REQUEST_WAIT_SLOTS in sprout/settings.py
+GUNICORN_WORKERS=${GUNICORN_WORKERS:-4}
+GUNICORN_THREADS=${GUNICORN_THREADS:-20}
+export GUNICORN_THREADS
+
 ACTION="${1}"
 shift 1;
 PIDFILE_GUNICORN="./.sprout.gunicorn.pid"
@@ -27,7 +32,7 @@ PIDFILE_FLOWER="./.sprout.flower.pid"
 PIDFILE_LOGSERVER="./.sprout.logserver.pid"
 LOGFILE="./sprout-manager.log"
 UPDATE_LOG="./update.log"
-GUNICORN_CMD="gunicorn --bind 127.0.0.1:${DJANGO_PORT:-8000} -w ${GUNICORN_WORKERS:-4} --access-logfile access.log --error-logfile error.log sprout.wsgi:application"
+GUNICORN_CMD="gunicorn --bind 127.0.0.1:${DJANGO_PORT:-8000} -w ${GUNICORN_WORKERS} --threads ${GUNICORN_THREADS} --access-logfile access.log --error-logfile error.log sprout.wsgi:application"
 MEMCACHED_CMD="memcached -l 127.0.0.1 -p ${MEMCACHED_PORT:-23156}"
 
 MAX_WORKERS=$(nproc --all)
@@ -151,6 +151,13 @@ OPENSHIFT_APPLIANCE_FORMAT = "s-appl-{group}-{date}-{rnd}"
 GENERAL_REDIS = dict(host='127.0.0.1', port=REDIS_PORT, db=int(os.environ.get("REDIS_GENERAL", 2)))
 
 
+# Long-polling request_wait calls hold a Gunicorn thread each. Gunicorn runs GUNICORN_WORKERS
+# processes with GUNICORN_THREADS threads (sprout.sh), at most REQUEST_WAIT_SLOTS threads of each
+# process wait at once so the rest stays free for the other requests. The defaults of 4 workers
+# and 20 threads allow 64 waiting pollers, the extra pollers get the status immediately.
+GUNICORN_THREADS = int(os.environ.get("GUNICORN_THREADS", 20))
+REQUEST_WAIT_SLOTS = int(os.environ.get("REQUEST_WAIT_SLOTS", max(GUNICORN_THREADS - 4, 1)))
+
 ATOMIC_REQUESTS = False  # Turn off after moving to postgre
 
 HUBBER_URL = None
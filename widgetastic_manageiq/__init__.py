@@ -6,11 +6,13 @@ import os
 import re
 import time
 from collections import namedtuple
+from collections import OrderedDict
 from datetime import date
 from datetime import datetime
 from datetime import timedelta
 from math import ceil
 from tempfile import NamedTemporaryFile
+from uuid import uuid4
 
 from cached_property import cached_property
 from jsmin import jsmin
@@ -1692,20 +1694,109 @@ class ReportDataControllerMixin(object):
     This is helper mixin for several widgets which use Miq JS API
     """
 
-    def _invoke_cmd(self, cmd, data=None):
+    # Commands which do not change the displayed items, see entity_index
+    READ_ONLY_COMMANDS = {
+        "get_all_items",
+        "get_item",
+        "is_displayed",
+        "get_sorting",
+        "get_items_per_page",
+        "get_current_page",
+        "get_pages_amount",
+        "pagination_range",
+    }
+    ENTITY_INDEX = (
+        'sendDataWithRx({"controller": "reportDataController", "action": "get_all_items"}); '
+        "window.cfmeEntityIndexToken = arguments[0]; "
+        "return ManageIQ.qe.gtl.result"
+    )
+    ENTITY_INDEX_TOKEN = "return window.cfmeEntityIndexToken"
+
+    @property
+    def entity_index(self):
+        """Items of the current page by their ids.
+
+        All the items are obtained by a single JS call and cached by the browser plugin until
+        a GTL command changes the items, something is clicked or typed, or the page is reloaded.
+        """
+        plugin = self.browser.plugin
+        cached = getattr(plugin, "entity_index", None)
+        if cached is not None:
+            token, index = cached
+            if self.browser.execute_script(self.ENTITY_INDEX_TOKEN, silent=True) == token:
+                return index
+        token = uuid4().hex
+        self.logger.info("executed command: {cmd}".format(cmd=self.ENTITY_INDEX))
+        self._ensure_page_safe(read_only=True)
+        entities = self.browser.execute_script(self.ENTITY_INDEX, token, silent=True)
+        self._ensure_page_safe(read_only=True)
+        if not isinstance(entities, list):
+            # the result of other command is left in place if there are no items
+            entities = []
+        index = OrderedDict((str(entity["item"]["id"]), entity["item"]) for entity in entities)
+        if hasattr(plugin, "entity_index"):
+            plugin.entity_index = (token, index)
+        return index
+
+    def _ensure_page_safe(self, read_only=False):
+        # consecutive read-only commands may skip the check of an unchanged page
+        plugin = self.browser.plugin
+        if read_only and hasattr(plugin, "ensure_page_safe_to_read"):
+            plugin.ensure_page_safe_to_read()
+        else:
+            plugin.ensure_page_safe()
+
+    def _invalidate_entity_index(self):
+        if getattr(self.browser.plugin, "entity_index", None) is not None:
+            self.browser.plugin.entity_index = None
+
+    @staticmethod
+    def _cmd_data(cmd, data=None):
         raw_data = {"controller": "reportDataController", "action": cmd}
         if data:
             raw_data["data"] = [data]
-        json_data = json.dumps(raw_data)
+        return raw_data
+
+    def _invoke_cmd(self, cmd, data=None):
+        read_only = cmd in self.READ_ONLY_COMMANDS
+        if not read_only:
+            self._invalidate_entity_index()
+        json_data = json.dumps(self._cmd_data(cmd, data))
         js_cmd = "sendDataWithRx({data}); return ManageIQ.qe.gtl.result".format(data=json_data)
         self.logger.info("executed command: {cmd}".format(cmd=js_cmd))
         # command result is always stored in this global variable
-        self.browser.plugin.ensure_page_safe()
-        result = self.browser.execute_script(js_cmd)
-        self.browser.plugin.ensure_page_safe()
+        self._ensure_page_safe(read_only)
+        # read only commands don't change the page, so they don't need the page checked again
+        result = self.browser.execute_script(js_cmd, silent=read_only)
+        self._ensure_page_safe(read_only)
+        return result
+
+    def _invoke_cmds(self, *commands):
+        """Invokes several commands by a single JS call and returns the list of their results.
+
+        Commands are either names or (name, data) tuples. The page is not waited for between
+        the commands, so only the last one may load data (change the page, sorting etc.).
+        """
+        commands = [(cmd, None) if isinstance(cmd, str) else cmd for cmd in commands]
+        read_only = all(cmd in self.READ_ONLY_COMMANDS for cmd, _ in commands)
+        if not read_only:
+            self._invalidate_entity_index()
+        js_cmd = (
+            "var results = []; "
+            "arguments[0].forEach(function(cmd) {"
+            "sendDataWithRx(cmd); results.push(ManageIQ.qe.gtl.result);}); "
+            "return results"
+        )
+        raw_data = [self._cmd_data(cmd, data) for cmd, data in commands]
+        self.logger.info("executed commands: {cmds}".format(cmds=json.dumps(raw_data)))
+        self._ensure_page_safe(read_only)
+        result = self.browser.execute_script(js_cmd, raw_data, silent=read_only)
+        self._ensure_page_safe(read_only)
         return result
 
     def _call_item_method(self, method):
+        if method != "is_selected":
+            self._invalidate_entity_index()
         raw_data = {
             "controller": "reportDataController",
             "action": "get_item",
@@ -1751,7 +1842,7 @@ class PaginationPane(View, ReportDataControllerMixin):
     def is_displayed(self):
         # upstream sometimes shows old pagination page and sometime new one
         paginator = "return document.getElementsByTagName('miq-pagination').length != 0"
-        return self.browser.execute_script(paginator)
+        return self.browser.execute_script(paginator, silent=True)
 
     @property
     def exists(self):
@@ -1818,7 +1909,9 @@ class PaginationPane(View, ReportDataControllerMixin):
             # Adding 1 to pages_amount to include the last page in loop
             for page in range(1, self.pages_amount + 1):
                 yield self.cur_page
-                if self.cur_page == self.pages_amount:
+                cur_page, pages_amount = self._invoke_cmds("get_current_page", "get_pages_amount")
+                # pages amount is None from time to time, see pages_amount
+                if cur_page == (pages_amount or self.pages_amount):
                     # last or only page, stop looping
                     break
                 else:
@@ -3263,6 +3356,15 @@ class FileInput(BaseFileInput):
         return super(FileInput, self).fill(value)
 
 
+def entity_data(item):
+    """Flattens the cells of the GTL item into its data, keys are lowercase with underscores."""
+    data = {str(key).replace(" ", "_").lower(): value for key, value in item.items()
+            if key != "cells"}
+    data.update(
+        (str(key).replace(" ", "_").lower(), value) for key, value in item["cells"].items())
+    return data
+
+
 class JSBaseEntity(View, ReportDataControllerMixin):
     """ represents Entity, no matter what state it is in.
         It is implemented using ManageIQ JS API
@@ -3285,8 +3387,9 @@ class JSBaseEntity(View, ReportDataControllerMixin):
 
     @property
     def name(self):
-        if self.is_displayed:
-            return self.data["name"] if "name" in self.data else None
+        if self._indexed_item is not None or self.is_displayed:
+            data = self.data
+            return data["name"] if "name" in data else None
         else:
             return getattr(self, "_name", None)
 
@@ -3305,12 +3408,20 @@ class JSBaseEntity(View, ReportDataControllerMixin):
         which is different for each entity type.
         This is property which should hold such data.
         """
-        data = self._invoke_cmd("get_item", self.entity_id)["item"]
-        cells = data.pop("cells")
-        cells = {str(key).replace(" ", "_").lower(): value for key, value in cells.items()}
-        data = {str(key).replace(" ", "_").lower(): value for key, value in data.items()}
-        data.update(cells)
-        return data
+        data = self._indexed_item
+        if data is None:
+            data = self._invoke_cmd("get_item", self.entity_id)["item"]
+        return entity_data(data)
+
+    @property
+    def _indexed_item(self):
+        if self.browser.product_version < "5.9":
+            return None
+        try:
+            return self.entity_index.get(str(self.entity_id))
+        except WebDriverException:
+            # the page does not have the JS API
+            return None
 
     def read(self):
         return self.is_checked
@@ -3350,15 +3461,14 @@ class EntitiesConditionalView(View, ReportDataControllerMixin):
                 el_name = br.get_attribute("title", el)
                 elements.append({"name": el_name, "entity_id": el_id})
         else:
-            entities = self._invoke_cmd("get_all_items")
-            for entity in entities:
+            for item in self.entity_index.values():
                 try:
-                    name = entity["item"]["cells"]["Name"]
+                    name = item["cells"]["Name"]
                 except KeyError:
                     # Floating Ip view has an issue. it doesn't have Name though it should
-                    name = entity["item"]["cells"]["Instance name"]
+                    name = item["cells"]["Instance name"]
 
-                elements.append({"name": name, "entity_id": entity["item"]["id"]})
+                elements.append({"name": name, "entity_id": item["id"]})
         return elements
 
     @property
@@ -3374,11 +3484,25 @@ class EntitiesConditionalView(View, ReportDataControllerMixin):
         return [el["name"] for el in self._current_page_elements]
 
     def get_id_by_name(self, name):
+        if self.browser.product_version >= "5.9":
+            return self._entity_ids_by_name.get(name)
         for el in self._current_page_elements:
             if el["name"] == name:
                 return el["entity_id"]
         return None
 
+    @property
+    def _entity_ids_by_name(self):
+        """Maps names of the current page entities to their ids, first one wins."""
+        index = self.entity_index
+        cached = getattr(self, "_ids_by_name", None)
+        if cached is None or cached[0] is not index:
+            ids_by_name = {}
+            for el in self._current_page_elements:
+                ids_by_name.setdefault(el["name"], el["entity_id"])
+            cached = self._ids_by_name = (index, ids_by_name)
+        return cached[1]
+
     def get_entities_by_keys(self, **keys):
         # some fields aren't available in Tile or Grid View.
         # So, we decided to switch to List View mode if several keys are passed
@@ -3414,17 +3538,18 @@ class EntitiesConditionalView(View, ReportDataControllerMixin):
             elif "id" in keys:
                 # it turned out that there are some views which have entities with internal id
                 # which override entity id in JS code. this is workaround for such case
-                elements = self._current_page_elements
-                for el in elements:
-                    entity = self.parent.entity_class(parent=self, entity_id=el["entity_id"])
+                for item in self.entity_index.values():
+                    data = entity_data(item)
                     for key, value in keys.items():
                         try:
-                            if entity.data[key] != str(value):
+                            if data[key] != str(value):
                                 break
                         except KeyError:
                             break
                     else:
-                        found_entities.append(entity)
+                        found_entities.append(
+                            self.parent.entity_class(
+                                parent=self, entity_id=item["id"], name=data.get("name")))
             else:
                 entities = [
                     self.parent.entity_class(parent=self, entity_id=eid)
@@ -3492,7 +3617,8 @@ class EntitiesConditionalView(View, ReportDataControllerMixin):
                     pass
 
             if entity_id:
-                return self.parent.entity_class(parent=self, entity_id=entity_id)
+                return self.parent.entity_class(
+                    parent=self, entity_id=entity_id, name=keys.get("name"))
 
             if not surf_pages:
                 raise ItemNotFound("Entity {keys} isn't found on this page".format(keys=keys))
@@ -3586,14 +3712,9 @@ class BaseEntitiesView(View):
                     el_name = row.name.text if getattr(row, "name", None) else ""
                     elements.append({"name": el_name, "entity_id": el_id})
             else:
-                entities = self._invoke_cmd("get_all_items")
-                for entity in entities:
+                for item in self.entity_index.values():
                     elements.append(
-                        {
-                            "name": entity["item"]["cells"].get("Name", None),
-                            "entity_id": entity["item"]["id"],
-                        }
-                    )
+                        {"name": item["cells"].get("Name", None), "entity_id": item["id"]})
             return elements
 
     @entities.register("Tile View")
@@ -4025,11 +4146,8 @@ class BaseNonInteractiveEntitiesView(View, ReportDataControllerMixin):
                 el_name = br.get_attribute("title", el)
                 elements.append({"name": el_name, "entity_id": el_id})
         else:
-            entities = self._invoke_cmd("get_all_items")
-            for entity in entities:
-                elements.append(
-                    {"name": entity["item"]["cells"]["Name"], "entity_id": entity["item"]["id"]}
-                )
+            for item in self.entity_index.values():
+                elements.append({"name": item["cells"]["Name"], "entity_id": item["id"]})
         return elements
 
     @property